@@ -41,10 +41,15 @@ INSTALLED_APPS = [
     'drf_spectacular',
     'user',
     'note',
+    'ops',
 ]
 
 MIDDLEWARE = [
+    'ops.middleware.QueryContextMiddleware',
+    'ops.middleware.MetricsMiddleware',
+    'ops.middleware.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.BodySizeLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,6 +92,104 @@ DATABASES = {
     }
 }
 
+# Read replicas, one alias per host in DB_REPLICA_HOSTS. Without replica
+# hosts, `replica1` points at the primary and is only used by the tests.
+
+DB_REPLICA_HOSTS = [
+    host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host
+]
+
+for index, host in enumerate(DB_REPLICA_HOSTS or [None], start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host or DATABASES['default']['HOST'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [
+    f'replica{index}' for index in range(1, len(DB_REPLICA_HOSTS) + 1)
+]
+
+# Shards for the notes of each user: the primary, then one alias per host
+# in DB_SHARD_HOSTS. Only append hosts, the order sets the id range of
+# each shard. Without shard hosts, `shard1` is only used by the tests.
+
+DB_SHARD_HOSTS = [
+    host for host in os.environ.get('DB_SHARD_HOSTS', '').split(',') if host
+]
+
+for index, host in enumerate(DB_SHARD_HOSTS or [None], start=1):
+    DATABASES[f'shard{index}'] = {
+        **DATABASES['default'],
+        'HOST': host or DATABASES['default']['HOST'],
+        'TEST': {} if host else {'NAME': 'test_shard1'},
+    }
+
+DATABASE_SHARDS = ['default'] + [
+    f'shard{index}' for index in range(1, len(DB_SHARD_HOSTS) + 1)
+]
+
+DATABASE_ROUTERS = [
+    'core.db_routers.ShardRouter',
+    'core.db_routers.ReplicaRouter',
+]
+
+# Seconds the shard of a user is cached for the views.
+
+SHARD_CACHE_SECONDS = int(os.environ.get('SHARD_CACHE_SECONDS', 300))
+
+# Number of hash partitions of the note tables on PostgreSQL, 0 keeps
+# plain tables. Applied by the migrations, or `partition_notes` later.
+
+NOTE_PARTITIONS = int(os.environ.get('NOTE_PARTITIONS', 0))
+
+# Cache of the replica pins and the throttle counters, which must be
+# shared by all workers: set CACHE_BACKEND to a Django cache backend and
+# CACHE_LOCATION to its address, e.g. PyMemcacheCache and memcached:11211.
+# The default cache lives in the memory of each process and only fits a
+# single worker, it fails the `core.E001` check when replicas are set
+# and gets a `core.W001` warning from `check --deploy`.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a user reads from the primary after a write.
+
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+
+# Password hashing
+# The first hasher hashes new passwords; the others still verify
+# existing hashes, which are upgraded on the next login.
+
+PASSWORD_HASHERS = os.environ.get('PASSWORD_HASHERS', ','.join([
+    'core.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+])).split(',')
+
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 260000)
+)
+
+# Logins hashing at once across the workers sharing the default cache;
+# further logins get a 503 response. Management commands hash with
+# PASSWORD_HASH_WORKERS threads.
+
+PASSWORD_HASH_MAX_CONCURRENT = int(
+    os.environ.get('PASSWORD_HASH_MAX_CONCURRENT', 16)
+)
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -124,6 +227,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# OpenAPI schema file written at build time. When set, api/schema/
+# serves it instead of generating the schema on each request.
+
+API_SCHEMA_FILE = os.environ.get('API_SCHEMA_FILE', '')
+API_SCHEMA_MAX_AGE = int(os.environ.get('API_SCHEMA_MAX_AGE', 86400))
+
+# Seconds the project may take to import, checked by `import_time`.
+
+IMPORT_TIME_BUDGET = float(os.environ.get('IMPORT_TIME_BUDGET', 1.5))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -133,4 +246,133 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.UserSlidingWindowThrottle',
+        'core.throttling.TokenSlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.environ.get('THROTTLE_ANON', '300/min'),
+        'user_read': os.environ.get('THROTTLE_USER_READ', '1200/min'),
+        'user_write': os.environ.get('THROTTLE_USER_WRITE', '300/min'),
+        'token_read': os.environ.get('THROTTLE_TOKEN_READ', '600/min'),
+        'token_write': os.environ.get('THROTTLE_TOKEN_WRITE', '150/min'),
+    },
+}
+
+# Counter store for the throttles: CacheSlidingWindow shares counts
+# between workers through the default cache when CACHE_BACKEND is a
+# shared cache, LocalSlidingWindow keeps them in the memory of each
+# process.
+
+THROTTLE_BACKEND = os.environ.get(
+    'THROTTLE_BACKEND', 'core.throttling.CacheSlidingWindow'
+)
+
+# Background tasks
+
+TASK_BATCH_SIZE = 50
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_BACKOFF = 2
+TASK_RETRY_MAX_BACKOFF = 3600
+TASK_LEASE_SECONDS = 300
+TASK_POLL_INTERVAL = 1
+
+# Days failed tasks are kept for inspection before `clear_failed_tasks`
+# deletes them.
+
+TASK_FAILED_RETENTION_DAYS = int(
+    os.environ.get('TASK_FAILED_RETENTION_DAYS', 14)
+)
+
+# Notations at least this many bytes long are stored zlib compressed.
+
+COMPRESSED_TEXT_THRESHOLD = 1024
+COMPRESSED_TEXT_LEVEL = 1
+
+# Note revision history, listed NOTE_REVISION_PAGE_SIZE revisions a page.
+
+NOTE_REVISION_SNAPSHOT_INTERVAL = 20
+NOTE_REVISION_KEEP = 100
+NOTE_REVISION_PAGE_SIZE = 20
+
+# API tokens expire AUTH_TOKEN_TTL seconds after their last renewal.
+# A token in use is renewed once less than AUTH_TOKEN_RENEW_AFTER of its
+# lifetime is left. Validated tokens are cached for a short while.
+
+AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 7 * 24 * 3600))
+AUTH_TOKEN_RENEW_AFTER = 0.5
+AUTH_TOKEN_CACHE_SECONDS = 60
+
+# Signed tokens are verified without a database lookup. Revoked token
+# ids are reloaded from the database every SIGNED_TOKEN_REVOCATION_REFRESH
+# seconds in each process.
+
+SIGNED_TOKEN_TTL = int(os.environ.get('SIGNED_TOKEN_TTL', 3600))
+SIGNED_TOKEN_REVOCATION_REFRESH = 30
+
+# Tag and link autocomplete returns AUTOCOMPLETE_LIMIT matches by default.
+# Results are cached per user in each process for a few seconds.
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_CACHE_SECONDS = 10
+
+# Queries taking at least SLOW_QUERY_MS milliseconds are logged as JSON
+# to the `ops.queries` logger and listed by api/ops/queries/. 0 disables
+# the log.
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'ops.formatters.JsonFormatter'},
+    },
+    'handlers': {
+        'json': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'ops': {
+            'handlers': ['json'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# A PROFILE_SAMPLE_RATE fraction of the requests, and requests of staff
+# users to the note and profile APIs with an `X-Profile` header, are
+# sampled every PROFILE_INTERVAL seconds. The profiles are listed by
+# api/ops/profile/.
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL = 0.005
+
+# Prometheus metrics are served at /metrics. Set PROMETHEUS_MULTIPROC_DIR
+# to share them between the workers of a pre-fork server, and
+# METRICS_TOKEN to require `Authorization: Bearer <token>`. Without
+# METRICS_PUBLIC, /metrics is refused until a token is set.
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = True
+
+# Request bodies over REQUEST_BODY_MAX_SIZE bytes, or over the limit of
+# their URL name in REQUEST_BODY_LIMITS, get a 413 response before they
+# are read. The note APIs parse JSON while reading it and reject arrays
+# longer than STREAMING_JSON_MAX_ITEMS.
+
+REQUEST_BODY_MAX_SIZE = int(
+    os.environ.get('REQUEST_BODY_MAX_SIZE', 1024 * 1024)
+)
+REQUEST_BODY_LIMITS = {
+    'note:note-list': 8 * 1024 * 1024,
+    'note:note-detail': 8 * 1024 * 1024,
+    'note:note-notation': 8 * 1024 * 1024,
+    'note:note-bulk-delete': 2 * 1024 * 1024,
+    'note:note-bulk-tags': 2 * 1024 * 1024,
 }
+STREAMING_JSON_MAX_ITEMS = 10000
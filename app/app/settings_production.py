@@ -0,0 +1,54 @@
+"""
+Production settings for app project.
+
+Serves the API only: the admin, sessions, messages, static files and
+the live schema generator are left out, and the OpenAPI schema is served
+from the file written when the image is built.
+"""
+import os
+
+from app.settings import *  # noqa
+from app.settings import BASE_DIR, INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host
+]
+
+UNUSED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'drf_spectacular',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+
+UNUSED_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+MIDDLEWARE = [item for item in MIDDLEWARE if item not in UNUSED_MIDDLEWARE]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'user.authentication.ExpiringTokenAuthentication',
+        'user.authentication.SignedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.openapi.AutoSchema',
+}
+
+METRICS_PUBLIC = False
+
+API_SCHEMA_FILE = os.environ.get(
+    'API_SCHEMA_FILE',
+    str(BASE_DIR / 'schema.yml'),
+)
@@ -14,18 +14,36 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
-from drf_spectacular.views import (SpectacularAPIView,
-                                   SpectacularSwaggerView)
+
+from core.views import lazy_view, schema_file_view
+from ops.views import metrics_view
+
+if settings.API_SCHEMA_FILE:
+    schema_view = schema_file_view
+else:
+    schema_view = lazy_view('drf_spectacular.views.SpectacularAPIView')
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
-    path(
-        'api/docs/',
-        SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'
-    ),
+    path('api/schema/', schema_view, name='api-schema'),
     path('api/user/', include('user.urls')),
     path('api/note/', include('note.urls')),
+    path('api/ops/', include('ops.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+if 'drf_spectacular' in settings.INSTALLED_APPS:
+    urlpatterns.append(path(
+        'api/docs/',
+        lazy_view(
+            'drf_spectacular.views.SpectacularSwaggerView',
+            url_name='api-schema',
+        ),
+        name='api-docs',
+    ))
+
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
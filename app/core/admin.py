@@ -2,8 +2,11 @@
 Django admin customization.
 """
 from django.contrib import admin
-
+from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from core import models
@@ -44,7 +47,97 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses the planner estimate for unfiltered tables.
+
+    An exact COUNT(*) scans the whole table on PostgreSQL. For large
+    tables the row estimate from pg_class is close enough for the admin.
+    A partitioned table has no estimate of its own, the estimates of its
+    partitions are added up.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT CASE WHEN parent.relkind = 'p' THEN (
+                        SELECT SUM(GREATEST(child.reltuples, 0))
+                        FROM pg_inherits
+                        JOIN pg_class child ON child.oid = inhrelid
+                        WHERE inhparent = parent.oid
+                    ) ELSE parent.reltuples END
+                    FROM pg_class parent
+                    WHERE parent.oid = to_regclass(%s)
+                    """,
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and (row[0] or 0) >= self.estimate_threshold:
+                return int(row[0])
+
+        return super().count
+
+
+class OwnedModelAdmin(admin.ModelAdmin):
+    """Base admin pages for objects owned by a user.
+
+    Searches match the start of `name_field`, served by its prefix
+    index, or the exact email of the owner.
+    """
+    name_field = None
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    ordering = ['-id']
+
+    def get_list_display(self, request):
+        return ['id', self.name_field, 'user']
+
+    def get_search_fields(self, request):
+        return [f'^{self.name_field}', '=user__email']
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if '@' in search_term:
+            email = get_user_model().objects.normalize_email(search_term)
+            return queryset.filter(user__email=email), False
+
+        lookup = {f'{self.name_field}__startswith': search_term}
+        return queryset.filter(**lookup), False
+
+
+class NoteAdmin(OwnedModelAdmin):
+    """Define the admin pages for notes."""
+    name_field = 'title'
+    raw_id_fields = ['user', 'tags', 'todos', 'links']
+    readonly_fields = ['version']
+
+
+class TagAdmin(OwnedModelAdmin):
+    """Define the admin pages for tags."""
+    name_field = 'name'
+
+
+class TodoAdmin(OwnedModelAdmin):
+    """Define the admin pages for todos."""
+    name_field = 'title'
+
+
+class LinkAdmin(OwnedModelAdmin):
+    """Define the admin pages for links."""
+    name_field = 'name'
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Note)
-admin.site.register(models.Tag)
-admin.site.register(models.Todo)
+admin.site.register(models.Note, NoteAdmin)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Todo, TodoAdmin)
+admin.site.register(models.Link, LinkAdmin)
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.checks import Tags, register
+from django.db.models.signals import post_migrate, pre_delete
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core.checks import (check_replica_cache, check_shard_cache,
+                                 check_throttle_cache)
+        from core.db_routers import reserve_id_range
+        from core.models import delete_sharded_rows
+
+        post_migrate.connect(reserve_id_range, sender=self)
+        pre_delete.connect(
+            delete_sharded_rows, sender=settings.AUTH_USER_MODEL,
+        )
+        register(check_replica_cache, Tags.caches)
+        register(check_throttle_cache, Tags.caches, deploy=True)
+        register(check_shard_cache, Tags.caches, deploy=True)
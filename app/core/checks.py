@@ -0,0 +1,65 @@
+"""
+System checks of the cache configuration.
+"""
+from django.conf import settings
+from django.core.checks import Error, Warning
+
+PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def is_process_cache(alias='default'):
+    """Return whether the `alias` cache is not shared between processes."""
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_CACHES
+
+
+def check_replica_cache(app_configs, **kwargs):
+    """Replica pins written by one worker must be seen by the others."""
+    if settings.DATABASE_REPLICAS and is_process_cache():
+        return [Error(
+            'Read replicas are configured but the default cache is not '
+            'shared between workers.',
+            hint=(
+                'Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, '
+                'otherwise users may not read their own writes.'
+            ),
+            id='core.E001',
+        )]
+
+    return []
+
+
+def check_throttle_cache(app_configs, **kwargs):
+    """Throttle counts of CacheSlidingWindow must be shared by workers."""
+    backend = settings.THROTTLE_BACKEND
+    if backend == 'core.throttling.CacheSlidingWindow' and is_process_cache():
+        return [Warning(
+            'The throttle counters are kept in a cache that is not shared '
+            'between workers.',
+            hint=(
+                'Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, '
+                'otherwise each worker allows the full rate.'
+            ),
+            id='core.W001',
+        )]
+
+    return []
+
+
+def check_shard_cache(app_configs, **kwargs):
+    """Shard moves must reach the cached lookups of all workers."""
+    if len(settings.DATABASE_SHARDS) > 1 and is_process_cache():
+        return [Warning(
+            'Several shards are configured but the default cache is not '
+            'shared between workers.',
+            hint=(
+                'Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, '
+                'otherwise workers keep the old shard of a moved user for '
+                'SHARD_CACHE_SECONDS.'
+            ),
+            id='core.W002',
+        )]
+
+    return []
@@ -0,0 +1,259 @@
+"""
+Database routing for shards and read replicas.
+
+The notes of each user, with their tags, todos, links and revisions,
+live on one shard. Views switch to the shard of the request user and
+every query on those models follows it; users, tokens and the other
+tables stay on the primary.
+
+Reads go to a replica only while replica reads are switched on, which
+the views do for safe requests. Everything else, including reads made
+while handling a write, uses the primary.
+"""
+import bisect
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SHARDED_MODELS = {
+    'note',
+    'noterevision',
+    'tag',
+    'todo',
+    'link',
+    'note_tags',
+    'note_todos',
+    'note_links',
+}
+
+# Ids of each shard start at its position in DATABASE_SHARDS times this
+# offset, so rows keep their ids when moved between shards.
+SHARD_ID_OFFSET = 2 ** 40
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_current_shard = ContextVar('current_shard', default=DEFAULT_DB_ALIAS)
+
+
+def is_sharded(model):
+    """Return whether rows of `model` live on the shard of their user."""
+    meta = model._meta
+    return meta.app_label == 'core' and meta.model_name in SHARDED_MODELS
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+
+@lru_cache(maxsize=8)
+def _ring(shards, replicas=64):
+    """Return the sorted points and aliases of the hash ring."""
+    points = sorted(
+        (_hash(f'{alias}:{index}'), alias)
+        for alias in shards for index in range(replicas)
+    )
+    return [point for point, _ in points], [alias for _, alias in points]
+
+
+def pick_shard(user_id):
+    """Return the shard a new user is placed on by consistent hashing."""
+    points, aliases = _ring(tuple(settings.DATABASE_SHARDS))
+    index = bisect.bisect(points, _hash(str(user_id))) % len(points)
+    return aliases[index]
+
+
+def get_user_shard(user_id):
+    """Return the shard holding the data of a user.
+
+    Users without an entry in the lookup table predate sharding and live
+    on the primary.
+    """
+    if len(settings.DATABASE_SHARDS) == 1:
+        return settings.DATABASE_SHARDS[0]
+
+    from core.models import UserShard
+
+    alias = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id
+    ).values_list('alias', flat=True).first()
+    return alias or DEFAULT_DB_ALIAS
+
+
+def shard_key(user_id):
+    """Return the cache key of the shard lookup of a user."""
+    return f'db-shard:{user_id}'
+
+
+def lookup_shard(user_id):
+    """Return the shard of a user and the shard they are moving to.
+
+    Views call this on every request, so the lookup is kept in the
+    default cache for SHARD_CACHE_SECONDS. Changes to the lookup table
+    must call `forget_shard`, and only reach the other workers through a
+    shared cache, which the `core.W002` check asks for.
+    """
+    key = shard_key(user_id)
+    shard = cache.get(key)
+    if shard is None:
+        from core.models import UserShard
+
+        shard = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(
+            user_id=user_id
+        ).values_list('alias', 'moving_to').first()
+        shard = tuple(shard or (DEFAULT_DB_ALIAS, ''))
+        cache.set(key, shard, settings.SHARD_CACHE_SECONDS)
+
+    return shard
+
+
+def forget_shard(*user_ids):
+    """Drop the cached shard lookups of the users."""
+    cache.delete_many([shard_key(user_id) for user_id in user_ids])
+
+
+def current_shard():
+    """Return the shard used by the current context."""
+    return _current_shard.get()
+
+
+def start_shard(alias):
+    """Send the sharded queries of the current context to `alias`.
+
+    Return a token for `stop_shard`.
+    """
+    return _current_shard.set(alias)
+
+
+def stop_shard(token):
+    """Restore the shard in place before `start_shard`."""
+    _current_shard.reset(token)
+
+
+@contextmanager
+def use_shard(alias):
+    """Run the sharded queries of the block on `alias`."""
+    token = start_shard(alias)
+    try:
+        yield
+    finally:
+        stop_shard(token)
+
+
+def reserve_id_range(using, **kwargs):
+    """Move the id sequences of a PostgreSQL shard to its own range.
+
+    Connected to post_migrate. Shards must only be appended to
+    DATABASE_SHARDS so their ranges never change.
+    """
+    from django.apps import apps
+
+    connection = connections[using]
+    if connection.vendor != 'postgresql' or \
+            using not in settings.DATABASE_SHARDS:
+        return
+    start = settings.DATABASE_SHARDS.index(using) * SHARD_ID_OFFSET
+    if start == 0:
+        return
+
+    with connection.cursor() as cursor:
+        for model in apps.get_app_config('core').get_models(
+            include_auto_created=True,
+        ):
+            if not is_sharded(model):
+                continue
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                "GREATEST(nextval(pg_get_serial_sequence(%s, 'id')), %s))",
+                [model._meta.db_table, model._meta.db_table, start],
+            )
+
+
+def start_replica_reads():
+    """Send the reads of the current context to a replica.
+
+    Return a token for `stop_replica_reads`.
+    """
+    return _replica_reads.set(True)
+
+
+def stop_replica_reads(token):
+    """Restore the routing in place before `start_replica_reads`."""
+    _replica_reads.reset(token)
+
+
+def pin_key(user_id):
+    """Return the cache key pinning a user to the primary."""
+    return f'db-primary:{user_id}'
+
+
+def pin_to_primary(user):
+    """Read from the primary for `user` during REPLICA_PIN_SECONDS.
+
+    Covers the replication lag after a write so users read their own
+    writes. The pin is kept in the default cache and only applies to
+    the workers sharing it, so replicas require a shared CACHE_BACKEND,
+    enforced by the `core.E001` check.
+    """
+    if user and user.is_authenticated:
+        cache.set(pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    """Return whether reads for `user` must use the primary."""
+    if not (user and user.is_authenticated):
+        return False
+    return cache.get(pin_key(user.pk), False)
+
+
+class ShardRouter:
+    """Route the sharded models to the current shard.
+
+    Queries about an instance follow the database it was loaded from.
+    Reads on the primary are left to the next router.
+    """
+
+    def _instance_db(self, hints):
+        instance = hints.get('instance')
+        if instance is None or not is_sharded(type(instance)):
+            return None
+        db = instance._state.db
+        if db in settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return db
+
+    def db_for_read(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        db = self._instance_db(hints) or current_shard()
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        return db
+
+    def db_for_write(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        return self._instance_db(hints) or current_shard()
+
+
+class ReplicaRouter:
+    """Route reads to DATABASE_REPLICAS when replica reads are on."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are test mirrors and get their schema from the primary.
+        return settings.DATABASES[db].get('TEST', {}).get('MIRROR') is None
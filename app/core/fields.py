@@ -0,0 +1,88 @@
+"""
+Custom model fields.
+"""
+import json
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+RAW = b'\x00'
+ZLIB = b'\x01'
+
+
+def compress_text(value, threshold=None):
+    """Encode text, compressing it once it reaches the threshold."""
+    if threshold is None:
+        threshold = settings.COMPRESSED_TEXT_THRESHOLD
+    data = value.encode('utf-8')
+    if len(data) >= threshold:
+        compressed = zlib.compress(data, settings.COMPRESSED_TEXT_LEVEL)
+        if len(compressed) < len(data):
+            return ZLIB + compressed
+
+    return RAW + data
+
+
+def decompress_text(data):
+    """Decode text stored by `compress_text`."""
+    data = bytes(data)
+    if not data:
+        return ''
+    if data[:1] == ZLIB:
+        return zlib.decompress(data[1:]).decode('utf-8')
+
+    return data[1:].decode('utf-8')
+
+
+class CompressedTextField(models.TextField):
+    """Text field stored as zlib compressed binary when large.
+
+    Values below COMPRESSED_TEXT_THRESHOLD bytes are stored as is, with a
+    one byte marker. Only exact lookups work against the stored value.
+    """
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress_text(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decompress_text(value)
+        return super().to_python(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = self.get_prep_value(value)
+        if value is None:
+            return None
+        return connection.Database.Binary(compress_text(value))
+
+
+class CompressedJSONField(CompressedTextField):
+    """JSON value stored like CompressedTextField.
+
+    The value is serialized compactly and compressed once it reaches
+    COMPRESSED_TEXT_THRESHOLD bytes. There are no lookups into the JSON.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return json.loads(decompress_text(value))
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return json.loads(decompress_text(value))
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return json.dumps(value, separators=(',', ':'))
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
@@ -0,0 +1,76 @@
+"""
+Password hashing for users.
+
+The PBKDF2 work factor comes from settings and stored hashes are
+upgraded on login. Logins hold one of PASSWORD_HASH_MAX_CONCURRENT
+slots counted in the default cache, which bounds the hashing CPU work
+across all workers sharing the cache.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.cache import cache
+
+SLOTS_KEY = 'password-hash:running'
+
+# Seconds before the slot counter resets, releasing the slots of workers
+# that died while hashing.
+SLOTS_TTL = 60
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher with the work factor taken from settings.
+
+    Changing PASSWORD_HASH_ITERATIONS upgrades stored hashes the next
+    time each user logs in.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+class HashingBusy(Exception):
+    """Raised when every hashing slot is taken."""
+
+
+def _release():
+    try:
+        cache.decr(SLOTS_KEY)
+    except ValueError:
+        # The counter expired while the slot was held.
+        pass
+
+
+@contextmanager
+def hashing_slot():
+    """Hold a hashing slot for the block, or raise HashingBusy."""
+    cache.add(SLOTS_KEY, 0, SLOTS_TTL)
+    try:
+        running = cache.incr(SLOTS_KEY)
+    except ValueError:
+        cache.add(SLOTS_KEY, 1, SLOTS_TTL)
+        running = 1
+    try:
+        if running > settings.PASSWORD_HASH_MAX_CONCURRENT:
+            raise HashingBusy()
+        yield
+    finally:
+        _release()
+
+
+def make_password(password):
+    """Hash `password` with the preferred hasher."""
+    return hashers.make_password(password)
+
+
+def verify_password(password, encoded):
+    """Check `password` against the `encoded` hash.
+
+    Return whether it matches and whether the hash should be upgraded to
+    the preferred hasher.
+    """
+    upgrade = []
+    valid = hashers.check_password(password, encoded, upgrade.append)
+    return valid, bool(upgrade)
@@ -0,0 +1,39 @@
+"""
+Canonical form and hash of the links stored for notes.
+"""
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonical_url(value):
+    """Return the canonical form of a link.
+
+    URLs get a lower case scheme and host, no default port, no fragment
+    and no lone trailing slash. Other text is only stripped.
+    """
+    value = value.strip()
+    try:
+        parts = urlsplit(value)
+        port = parts.port
+    except ValueError:
+        return value
+    if parts.scheme not in DEFAULT_PORTS or not parts.hostname:
+        return value
+
+    host = parts.hostname
+    if ':' in host:
+        host = f'[{host}]'
+    if port is not None and port != DEFAULT_PORTS[parts.scheme]:
+        host = f'{host}:{port}'
+    if parts.username or parts.password:
+        host = parts.netloc.rsplit('@', 1)[0] + '@' + host
+    path = '' if parts.path == '/' else parts.path
+
+    return urlunsplit((parts.scheme, host, path, parts.query, ''))
+
+
+def url_hash(value):
+    """Return the 16 byte hash of a canonical link."""
+    return hashlib.blake2b(value.encode(), digest_size=16).digest()
@@ -0,0 +1,179 @@
+"""
+Django command to run micro benchmarks against the database.
+"""
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.request import Request
+
+from core import hashers, throttling
+from core.fields import compress_text
+from core.models import Note
+
+WORDS = (
+    'note study chapter reference summary idea todo link review draft '
+    'model query index cache table page author source quote example'
+).split()
+
+
+class Rollback(Exception):
+    """Raised to discard the rows written by a benchmark."""
+
+
+def sample_text(size):
+    """Return roughly `size` bytes of prose like text."""
+    words = []
+    length = 0
+    while length < size:
+        word = random.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+
+    return ' '.join(words)[:size]
+
+
+def timed(func, repeat):
+    """Return the mean run time of `func` in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def bench_notation_storage(command, options):
+    """Compare stored size and latency of raw and compressed notations."""
+    repeat = options['repeat']
+    command.stdout.write(
+        f'{"size":>8} {"stored":>8} {"ratio":>6} '
+        f'{"raw w/r ms":>14} {"zlib w/r ms":>14}'
+    )
+    try:
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email='benchmark@example.com'
+            )
+            for size in (1_000, 10_000, 100_000, 500_000):
+                text = sample_text(size)
+                stored = len(compress_text(text))
+                results = []
+                for threshold in (float('inf'), 0):
+                    with override_settings(
+                        COMPRESSED_TEXT_THRESHOLD=threshold
+                    ):
+                        note = Note.objects.create(
+                            user=user, title='Benchmark', notation=text
+                        )
+                        write = timed(note.save, repeat)
+                        read = timed(
+                            lambda: Note.objects.get(id=note.id), repeat
+                        )
+                    results.append(f'{write:6.2f}/{read:6.2f}')
+                command.stdout.write(
+                    f'{size:>8} {stored:>8} {stored / size:>6.2f} '
+                    f'{results[0]:>14} {results[1]:>14}'
+                )
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def bench_throttle(command, options):
+    """Measure the per request cost of the throttles."""
+    repeat = options['repeat'] * 1000
+    user = get_user_model()(id=1, email='benchmark@example.com')
+    factory = APIRequestFactory()
+    http_request = factory.get('/api/note/note/')
+    force_authenticate(http_request, user=user)
+    request = Request(http_request)
+    request.user = user
+
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = {'user_read': '1000000000/s'}
+
+    command.stdout.write(f'{"backend":>20} {"us/request":>12}')
+    with override_settings(REST_FRAMEWORK=rest_framework):
+        for name in ('LocalSlidingWindow', 'CacheSlidingWindow'):
+            throttling._backend = getattr(throttling, name)()
+            throttle = throttling.UserSlidingWindowThrottle()
+            cost = timed(
+                lambda: throttle.allow_request(request, None), repeat
+            )
+            command.stdout.write(f'{name:>20} {cost * 1000:>12.2f}')
+    throttling._backend = None
+
+
+def bench_login(command, options):
+    """Measure login throughput with concurrent clients."""
+    repeat = options['repeat']
+    password = 'benchmark-password'
+    try:
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email='benchmark@example.com',
+                password=password,
+            )
+            latency = timed(
+                lambda: authenticate(username=user.email, password=password),
+                repeat,
+            )
+            raise Rollback
+    except Rollback:
+        pass
+    command.stdout.write(f'authenticate(): {latency:.1f} ms per login')
+
+    cores = os.cpu_count() or 1
+    command.stdout.write(
+        f'{"clients":>8} {"logins/s":>10} {"per core":>10} '
+        f'({cores} cores)'
+    )
+    for clients in sorted({1, cores, cores * 2}):
+        logins = repeat * clients
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            start = time.perf_counter()
+            list(pool.map(
+                lambda _: hashers.verify_password(password, user.password),
+                range(logins),
+            ))
+            elapsed = time.perf_counter() - start
+        rate = logins / elapsed
+        busy = min(clients, cores)
+        command.stdout.write(
+            f'{clients:>8} {rate:>10.1f} {rate / busy:>10.1f}'
+        )
+
+
+BENCHMARKS = {
+    'login': bench_login,
+    'notation-storage': bench_notation_storage,
+    'throttle': bench_throttle,
+}
+
+
+class Command(BaseCommand):
+    """Django command to run benchmarks."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Number of timed runs per measurement.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+        self.stdout.write(
+            f'Running {options["benchmark"]} on {connection.vendor}.'
+        )
+        BENCHMARKS[options['benchmark']](self, options)
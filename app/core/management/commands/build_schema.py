@@ -0,0 +1,66 @@
+"""
+Django command to precompute the OpenAPI schema.
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+from core.views import schema_digest
+
+
+class Command(BaseCommand):
+    """Django command to render the OpenAPI schema to a file.
+
+    The file is only replaced when the schema digest changes, so servers
+    keep their cached copy and clients keep their ETag across deploys
+    that do not touch the API.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=None,
+            help='Output path, defaults to API_SCHEMA_FILE or schema.yml.',
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Fail if the file is missing or out of date.',
+        )
+
+    def render(self):
+        """Return the rendered schema."""
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        schema = generator.get_schema(request=None, public=True)
+
+        return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        path = options['file'] or settings.API_SCHEMA_FILE or \
+            os.path.join(settings.BASE_DIR, 'schema.yml')
+        content = self.render()
+        digest = schema_digest(content)
+
+        current = None
+        if os.path.exists(path):
+            with open(path, 'rb') as schema_file:
+                current = schema_digest(schema_file.read())
+
+        if current == digest:
+            self.stdout.write(f'Schema {digest[:12]} is up to date.')
+            return
+        if options['check']:
+            raise CommandError(f'Schema at {path} is out of date.')
+
+        # Replace the file in one step so servers never read it half written.
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wb') as schema_file:
+            schema_file.write(content)
+        os.replace(temp_path, path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote schema {digest[:12]} to {path}.'
+        ))
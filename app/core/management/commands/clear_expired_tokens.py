@@ -0,0 +1,43 @@
+"""
+Django command to delete expired API tokens and token revocations.
+"""
+import time
+
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from core.models import AuthToken, RevokedToken
+
+
+class Command(BaseCommand):
+    """Django command to delete expired tokens in small batches."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of tokens deleted per statement.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                AuthToken.objects.filter(expires_at__lte=now)
+                .values_list('key', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            count, _ = AuthToken.objects.filter(key__in=keys).delete()
+            deleted += count
+            time.sleep(options['pause'])
+        RevokedToken.objects.filter(expires_at__lte=now).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} expired tokens.')
+        )
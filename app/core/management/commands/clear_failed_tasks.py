@@ -0,0 +1,36 @@
+"""
+Django command to report and delete old failed background tasks.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from core.models import Task
+
+
+class Command(BaseCommand):
+    """Django command to apply the retention of failed tasks."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.TASK_FAILED_RETENTION_DAYS,
+            help='Keep tasks that failed less than this many days ago.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        failed = Task.objects.filter(status=Task.STATUS_FAILED)
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = failed.filter(run_at__lt=cutoff).delete()
+
+        for row in failed.values('name').annotate(count=Count('id')) \
+                .order_by('name'):
+            self.stdout.write(self.style.WARNING(
+                f'{row["count"]} failed {row["name"]} tasks kept.'
+            ))
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} old failed tasks.')
+        )
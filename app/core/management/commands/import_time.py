@@ -0,0 +1,89 @@
+"""
+Django command to report the import time of the project.
+"""
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imports what a worker loads before serving its first request.
+STARTUP_SCRIPT = '''
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+get_wsgi_application()
+get_resolver().url_patterns
+'''
+
+
+def parse_import_times(output):
+    """Return the self time of each module from `-X importtime` output,
+    in microseconds."""
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        if own.strip().isdigit():
+            times[name.strip()] = int(own)
+
+    return times
+
+
+class Command(BaseCommand):
+    """Django command to measure the startup imports in a fresh process.
+
+    Fails when the total goes over IMPORT_TIME_BUDGET so CI can catch
+    imports that slow down cold starts.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget', type=float, default=None,
+            help='Seconds allowed, defaults to IMPORT_TIME_BUDGET.',
+        )
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Number of packages to report.',
+        )
+
+    def measure(self):
+        """Return the self time of each module imported at startup."""
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.splitlines()[-1])
+
+        return parse_import_times(result.stderr)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        budget = options['budget']
+        if budget is None:
+            budget = settings.IMPORT_TIME_BUDGET
+
+        times = self.measure()
+        packages = Counter()
+        for name, own in times.items():
+            packages[name.split('.')[0]] += own
+
+        for package, own in packages.most_common(options['top']):
+            self.stdout.write(f'{own / 1000:10.1f} ms  {package}')
+
+        total = sum(times.values()) / 1e6
+        message = f'Imported {len(times)} modules in {total:.3f}s ' \
+            f'(budget {budget:.3f}s).'
+        if total > budget:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,102 @@
+"""
+Django command to move the notes of a user to another shard.
+"""
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.db_routers import forget_shard, get_user_shard
+from core.models import UserShard, copy_user, user_rows
+
+
+class Command(BaseCommand):
+    """Django command to move a user between shards while serving.
+
+    Writes of the user get a 503 while the rows are copied, reads keep
+    using the old shard until the lookup table switches to the new one.
+    Rows keep their ids, which are unique across shards. The cached
+    lookup is dropped after each change and again after the grace
+    period, in case a request in flight cached the old one.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_id', type=int)
+        parser.add_argument('target', help='Alias of the new shard.')
+        parser.add_argument(
+            '--grace', type=float, default=5,
+            help='Seconds to let requests in flight finish.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows copied per INSERT statement.',
+        )
+
+    def copy(self, source, target, user_id, batch_size):
+        """Copy the rows of the user, return how many."""
+        copied = 0
+        for queryset in user_rows(source, user_id):
+            rows = queryset.order_by('pk').iterator(chunk_size=batch_size)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                queryset.model.objects.using(target).bulk_create(batch)
+                copied += len(batch)
+
+        return copied
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        User = get_user_model()
+        target = options['target']
+        if target not in settings.DATABASE_SHARDS:
+            raise CommandError(f'{target} is not in DATABASE_SHARDS.')
+        try:
+            user = User.objects.using(DEFAULT_DB_ALIAS).get(
+                pk=options['user_id']
+            )
+        except User.DoesNotExist:
+            raise CommandError('User does not exist.')
+        source = get_user_shard(user.pk)
+        if source == target:
+            raise CommandError(f'User is already on {target}.')
+
+        shard = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user=user)
+        UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+            user=user,
+            defaults={'alias': source, 'moving_to': target},
+        )
+        forget_shard(user.pk)
+        time.sleep(options['grace'])
+        forget_shard(user.pk)
+        try:
+            with transaction.atomic(using=target):
+                if target != DEFAULT_DB_ALIAS:
+                    copy_user(user, target)
+                copied = self.copy(
+                    source, target, user.pk, options['batch_size']
+                )
+        except Exception:
+            shard.update(moving_to='')
+            forget_shard(user.pk)
+            raise
+        shard.update(alias=target, moving_to='')
+        forget_shard(user.pk)
+
+        # Let reads that started before the switch finish.
+        time.sleep(options['grace'])
+        forget_shard(user.pk)
+        with transaction.atomic(using=source):
+            for queryset in reversed(user_rows(source, user.pk)):
+                queryset.delete()
+            if source != DEFAULT_DB_ALIAS:
+                User.objects.using(source).filter(pk=user.pk).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {copied} rows of user {user.pk} '
+            f'from {source} to {target}.'
+        ))
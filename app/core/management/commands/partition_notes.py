@@ -0,0 +1,48 @@
+"""
+Django command to partition the note tables.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core import partitioning
+
+
+class Command(BaseCommand):
+    """Django command to switch the note tables to hash partitions.
+
+    For databases migrated before NOTE_PARTITIONS was set. The tables
+    are rewritten in one transaction, so run it in a maintenance window.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=settings.NOTE_PARTITIONS,
+            help='Number of partitions, defaults to NOTE_PARTITIONS.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias, for example a shard.',
+        )
+        parser.add_argument(
+            '--undo', action='store_true',
+            help='Turn the partitioned tables back into plain tables.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL.')
+        if not options['undo'] and options['partitions'] < 2:
+            raise CommandError('--partitions must be at least 2.')
+
+        with transaction.atomic(using=connection.alias):
+            if options['undo']:
+                partitioning.unpartition_notes(connection)
+            else:
+                partitioning.partition_notes(
+                    connection, options['partitions']
+                )
+
+        self.stdout.write(self.style.SUCCESS('Note tables updated.'))
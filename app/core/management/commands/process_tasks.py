@@ -0,0 +1,63 @@
+"""
+Django command to run background task workers.
+"""
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    """Django command to process queued tasks."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of worker processes to start.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.TASK_BATCH_SIZE,
+            help='Maximum number of tasks claimed at once.',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=settings.TASK_POLL_INTERVAL,
+            help='Seconds to sleep when the queue is empty.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process the due tasks and exit.',
+        )
+
+    def work(self, batch_size, poll, once):
+        """Process tasks until the queue is empty or forever."""
+        while True:
+            close_old_connections()
+            processed = tasks.run_tasks(batch_size)
+            if once and not processed:
+                return
+            if not processed:
+                time.sleep(poll)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        tasks.autodiscover()
+        args = (options['batch_size'], options['poll'], options['once'])
+
+        if options['workers'] <= 1:
+            self.work(*args)
+            return
+
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=self.work, args=args)
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {len(workers)} task workers.')
+        for worker in workers:
+            worker.join()
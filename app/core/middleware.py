@@ -0,0 +1,42 @@
+"""
+Middleware shared by the whole project.
+"""
+from django.conf import settings
+from django.http import JsonResponse
+
+from core.views import RequestBodyTooLarge
+
+
+def body_size_limit(view_name):
+    """Return the largest request body accepted by a URL name."""
+    return settings.REQUEST_BODY_LIMITS.get(
+        view_name, settings.REQUEST_BODY_MAX_SIZE
+    )
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over the limit of their endpoint.
+
+    The declared Content-Length is checked before the view runs, so an
+    oversized body is never read. The limit is kept on the request for
+    parsers reading bodies of unknown length.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limit = body_size_limit(request.resolver_match.view_name)
+        request.body_size_limit = limit
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > limit:
+            return JsonResponse(
+                {'detail': str(RequestBodyTooLarge.default_detail)},
+                status=RequestBodyTooLarge.status_code,
+            )
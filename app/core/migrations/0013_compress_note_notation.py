@@ -0,0 +1,66 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:10
+
+import core.fields
+from django.db import migrations, transaction
+
+BATCH_SIZE = 500
+
+
+def copy_notation(apps, schema_editor, source, target):
+    """Copy notations between columns in batches of BATCH_SIZE rows."""
+    Note = apps.get_model('core', 'Note')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        notes = list(
+            Note.objects.using(db)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', source)[:BATCH_SIZE]
+        )
+        if not notes:
+            break
+        for note in notes:
+            setattr(note, target, getattr(note, source))
+        with transaction.atomic(using=db):
+            Note.objects.using(db).bulk_update(notes, [target])
+        last_id = notes[-1].id
+
+
+def compress_notations(apps, schema_editor):
+    copy_notation(apps, schema_editor, 'notation', 'notation_data')
+
+
+def decompress_notations(apps, schema_editor):
+    copy_notation(apps, schema_editor, 'notation_data', 'notation')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_note_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='notation_data',
+            field=core.fields.CompressedTextField(blank=True, null=True),
+        ),
+        migrations.RunPython(compress_notations, decompress_notations),
+        migrations.RemoveField(
+            model_name='note',
+            name='notation',
+        ),
+        migrations.RenameField(
+            model_name='note',
+            old_name='notation_data',
+            new_name='notation',
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='notation',
+            field=core.fields.CompressedTextField(blank=True),
+        ),
+    ]
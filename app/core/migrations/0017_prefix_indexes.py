@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['name'], name='core_link_name_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['title'], name='core_note_title_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['name'], name='core_tag_name_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['title'], name='core_todo_title_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='core.user')),
+                ('alias', models.CharField(max_length=50)),
+                ('moving_to', models.CharField(blank=True, max_length=50)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:40
+
+from django.conf import settings
+from django.db import migrations
+
+from core import partitioning
+
+
+def partition(apps, schema_editor):
+    """Partition the note tables when NOTE_PARTITIONS is set."""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql' and settings.NOTE_PARTITIONS:
+        partitioning.partition_notes(connection, settings.NOTE_PARTITIONS)
+
+
+def unpartition(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        partitioning.unpartition_notes(connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_usershard'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:50
+
+from django.db import migrations, models, transaction
+from django.db.models import Count, Min
+
+from core.links import canonical_url, url_hash
+
+BATCH_SIZE = 500
+
+
+def hash_links(apps, schema_editor):
+    """Store the canonical names and their hashes in batches."""
+    Link = apps.get_model('core', 'Link')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        links = list(
+            Link.objects.using(db)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'name')[:BATCH_SIZE]
+        )
+        if not links:
+            break
+        for link in links:
+            link.name = canonical_url(link.name)
+            link.url_hash = url_hash(link.name)
+        with transaction.atomic(using=db):
+            Link.objects.using(db).bulk_update(links, ['name', 'url_hash'])
+        last_id = links[-1].id
+
+
+def merge_duplicates(apps, schema_editor):
+    """Point notes at the oldest of each set of duplicate links."""
+    Link = apps.get_model('core', 'Link')
+    Note = apps.get_model('core', 'Note')
+    through = Note.links.through
+    db = schema_editor.connection.alias
+
+    groups = (
+        Link.objects.using(db)
+        .values('user_id', 'url_hash')
+        .annotate(count=Count('id'), keep=Min('id'))
+        .filter(count__gt=1)
+        .values_list('user_id', 'url_hash', 'keep')
+    )
+    groups = list(groups)
+    for start in range(0, len(groups), BATCH_SIZE):
+        with transaction.atomic(using=db):
+            for user_id, hash_value, keep in groups[start:start + BATCH_SIZE]:
+                duplicates = list(
+                    Link.objects.using(db)
+                    .filter(user_id=user_id, url_hash=hash_value)
+                    .exclude(id=keep)
+                    .values_list('id', flat=True)
+                )
+                # Keep one row per note, preferring the kept link, so
+                # repointing creates no duplicate (note, link) pairs.
+                rows = (
+                    through.objects.using(db)
+                    .filter(link_id__in=[keep] + duplicates)
+                    .order_by('link_id', 'id')
+                    .values_list('id', 'note_id')
+                )
+                seen = set()
+                stale = []
+                for row_id, note_id in rows:
+                    if note_id in seen:
+                        stale.append(row_id)
+                    seen.add(note_id)
+                through.objects.using(db).filter(id__in=stale).delete()
+                through.objects.using(db).filter(
+                    link_id__in=duplicates,
+                ).update(link_id=keep)
+                Link.objects.using(db).filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0019_partition_notes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='url_hash',
+            field=models.BinaryField(max_length=16, null=True),
+        ),
+        migrations.RunPython(hash_links, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='link',
+            name='url_hash',
+            field=models.BinaryField(max_length=16),
+        ),
+        migrations.AddConstraint(
+            model_name='link',
+            constraint=models.UniqueConstraint(fields=('user', 'url_hash'), name='unique_link_user_url_hash'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-19 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_link_url_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['user', 'name'], name='core_link_user_name_prefix', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name'], name='core_tag_user_name_prefix', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
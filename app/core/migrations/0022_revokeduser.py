@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedUser',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('revoked_before', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:40
+
+import core.fields
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 500
+
+
+def copy_data(apps, schema_editor, source, target):
+    """Copy revision data between columns in batches of BATCH_SIZE rows."""
+    NoteRevision = apps.get_model('core', 'NoteRevision')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        revisions = list(
+            NoteRevision.objects.using(db)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', source)[:BATCH_SIZE]
+        )
+        if not revisions:
+            break
+        for revision in revisions:
+            setattr(revision, target, getattr(revision, source))
+        with transaction.atomic(using=db):
+            NoteRevision.objects.using(db).bulk_update(revisions, [target])
+        last_id = revisions[-1].id
+
+
+def compress_data(apps, schema_editor):
+    copy_data(apps, schema_editor, 'data', 'compressed_data')
+
+
+def decompress_data(apps, schema_editor):
+    copy_data(apps, schema_editor, 'compressed_data', 'data')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0022_revokeduser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noterevision',
+            name='compressed_data',
+            field=core.fields.CompressedJSONField(null=True),
+        ),
+        migrations.RunPython(compress_data, decompress_data),
+        migrations.AlterField(
+            model_name='noterevision',
+            name='data',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RemoveField(
+            model_name='noterevision',
+            name='data',
+        ),
+        migrations.RenameField(
+            model_name='noterevision',
+            old_name='compressed_data',
+            new_name='data',
+        ),
+        migrations.AlterField(
+            model_name='noterevision',
+            name='data',
+            field=core.fields.CompressedJSONField(),
+        ),
+    ]
@@ -1,10 +1,20 @@
+import binascii
+import os
+from collections import defaultdict
+
 from django.conf import settings
 
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
 from django.contrib.auth.models import (AbstractBaseUser,
                                         BaseUserManager,
                                         PermissionsMixin)
 
+from core import db_routers, hashers
+from core.fields import CompressedJSONField, CompressedTextField
+from core.links import canonical_url, url_hash
+
 
 class UserManager(BaseUserManager):
     """Manager for users."""
@@ -16,17 +26,19 @@ class UserManager(BaseUserManager):
         user = self.model(email=self.normalize_email(email), **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
+        if len(settings.DATABASE_SHARDS) > 1:
+            UserShard.place(user)
 
         return user
 
     def create_superuser(self, email, password):
         """Create and return a new superuser."""
-        user = self.create_user(email, password)
-        user.is_staff = True
-        user.is_superuser = True
-        user.save(using=self._db)
-
-        return user
+        return self.create_user(
+            email,
+            password,
+            is_staff=True,
+            is_superuser=True,
+        )
 
 
 class User(AbstractBaseUser, PermissionsMixin):
@@ -40,6 +52,198 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._was_active = user.__dict__.get('is_active')
+        return user
+
+    def save(self, *args, **kwargs):
+        """Save the user, revoking its signed tokens when the password
+        changes or the user is deactivated."""
+        revoke = self.pk is not None and (
+            self._password is not None
+            or (getattr(self, '_was_active', None) and not self.is_active)
+        )
+        super().save(*args, **kwargs)
+        self._was_active = self.is_active
+        if revoke:
+            RevokedUser.revoke(self.pk)
+
+    def set_password(self, raw_password):
+        """Hash the password with the preferred hasher."""
+        self.password = hashers.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Check the password, upgrading old hashes."""
+        valid, upgrade = hashers.verify_password(raw_password, self.password)
+        if valid and upgrade:
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes.
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return valid
+
+
+class UserShard(models.Model):
+    """Shard holding the notes of a user.
+
+    Users without a row live on the primary. `moving_to` is set while
+    the data of the user is copied to another shard.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard',
+    )
+    alias = models.CharField(max_length=50)
+    moving_to = models.CharField(max_length=50, blank=True)
+
+    @classmethod
+    def place(cls, user, alias=None):
+        """Assign `user` to a shard, by consistent hashing by default."""
+        alias = alias or db_routers.pick_shard(user.pk)
+        if alias != DEFAULT_DB_ALIAS:
+            copy_user(user, alias)
+        shard = cls.objects.using(DEFAULT_DB_ALIAS).create(
+            user=user,
+            alias=alias,
+        )
+        db_routers.forget_shard(user.pk)
+        return shard
+
+    @classmethod
+    def place_many(cls, users, batch_size=None):
+        """Assign `users` to shards by consistent hashing, in bulk."""
+        shards = [cls(user=user, alias=db_routers.pick_shard(user.pk))
+                  for user in users]
+        by_alias = defaultdict(list)
+        for shard in shards:
+            by_alias[shard.alias].append(shard.user)
+        for alias, placed in by_alias.items():
+            if alias == DEFAULT_DB_ALIAS:
+                continue
+            User = type(placed[0])
+            User.objects.using(alias).bulk_create(
+                [
+                    User(id=user.pk, email=user.email, name=user.name,
+                         password='!')
+                    for user in placed
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+        cls.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            shards, batch_size=batch_size,
+        )
+        db_routers.forget_shard(*(shard.user_id for shard in shards))
+        return shards
+
+    def __str__(self):
+        return f'{self.user_id} on {self.alias}'
+
+
+def copy_user(user, alias):
+    """Store a copy of `user` on a shard for the foreign keys there.
+
+    The copy has no usable password, logins always use the primary.
+    """
+    User = type(user)
+    User.objects.using(alias).get_or_create(
+        id=user.pk,
+        defaults={'email': user.email, 'name': user.name, 'password': '!'},
+    )
+
+
+def user_rows(alias, user_id):
+    """Return the sharded rows of a user on `alias`, parents first."""
+    of_notes = {'note__user_id': user_id}
+    return [
+        Tag.objects.using(alias).filter(user_id=user_id),
+        Todo.objects.using(alias).filter(user_id=user_id),
+        Link.objects.using(alias).filter(user_id=user_id),
+        Note.objects.using(alias).filter(user_id=user_id),
+        Note.tags.through.objects.using(alias).filter(**of_notes),
+        Note.todos.through.objects.using(alias).filter(**of_notes),
+        Note.links.through.objects.using(alias).filter(**of_notes),
+        NoteRevision.objects.using(alias).filter(**of_notes),
+    ]
+
+
+def delete_sharded_rows(sender, instance, using, **kwargs):
+    """Delete the rows of a user deleted from the primary on their shard.
+
+    Connected to pre_delete of the user, while the lookup table still
+    names the shard. The shard rows and the copy of the user are deleted
+    once the deletion is committed on the primary.
+    """
+    if using != DEFAULT_DB_ALIAS:
+        return
+    user_id = instance.pk
+    alias = db_routers.get_user_shard(user_id)
+    if alias == DEFAULT_DB_ALIAS:
+        return
+
+    def delete():
+        with transaction.atomic(using=alias):
+            for queryset in reversed(user_rows(alias, user_id)):
+                queryset.delete()
+            type(instance).objects.using(alias).filter(pk=user_id).delete()
+
+    transaction.on_commit(delete, using=DEFAULT_DB_ALIAS)
+
+
+class AuthToken(models.Model):
+    """Expiring API token of a user."""
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = binascii.hexlify(os.urandom(20)).decode()
+        return super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.key
+
+
+class RevokedToken(models.Model):
+    """Signed token revoked before its expiry."""
+    jti = models.CharField(max_length=32, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class RevokedUser(models.Model):
+    """User whose signed tokens issued before `revoked_before` are refused.
+
+    Keyed by the user id, so it outlives a deleted user.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    revoked_before = models.DateTimeField(db_index=True)
+
+    @classmethod
+    def revoke(cls, user_id):
+        """Refuse the signed tokens issued to the user until now."""
+        return cls.objects.update_or_create(
+            user_id=user_id,
+            defaults={'revoked_before': timezone.now()},
+        )[0]
+
+    def __str__(self):
+        return str(self.user_id)
+
 
 class Note(models.Model):
     """Note object."""
@@ -49,18 +253,56 @@ class Note(models.Model):
     )
     title = models.CharField(max_length=100)
     description = models.CharField(max_length=280)
-    notation = models.TextField(blank=True)
+    notation = CompressedTextField(blank=True)
     ref = models.CharField(max_length=700, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
     tags = models.ManyToManyField('Tag')
     todos = models.ManyToManyField('Todo')
     links = models.ManyToManyField('Link')
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['title'],
+                name='core_note_title_prefix',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
 
+class NoteRevision(models.Model):
+    """Past version of a note, stored as a snapshot or a delta."""
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+    )
+    version = models.PositiveIntegerField()
+    depth = models.PositiveIntegerField(default=0)
+    data = CompressedJSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['note', 'version'],
+                name='unique_note_revision_version',
+            ),
+        ]
+
+    @property
+    def is_snapshot(self):
+        return self.depth == 0
+
+    def __str__(self):
+        return f'{self.note_id} v{self.version}'
+
+
 class Tag(models.Model):
     """Tag for filtering notes."""
     name = models.CharField(max_length=50)
@@ -69,6 +311,20 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['name'],
+                name='core_tag_name_prefix',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['user', 'name'],
+                name='core_tag_user_name_prefix',
+                opclasses=['int8_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -83,17 +339,125 @@ class Todo(models.Model):
     # description = models.CharField(max_length=255)
     # completed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['title'],
+                name='core_todo_title_prefix',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
 
+# Sent with the model as sender and `user_id` after named rows of a user
+# were created in bulk, since bulk_create sends no post_save.
+names_created = Signal()
+
+
+class LinkManager(models.Manager):
+    """Manager for links."""
+
+    def get_or_create_urls(self, user, urls):
+        """Return a mapping of canonical url to link of `user`.
+
+        Missing links are created in bulk. Lookups use the hash index.
+        """
+        by_hash = {url_hash(url): url for url in map(canonical_url, urls)}
+        if not by_hash:
+            return {}
+
+        queryset = self.filter(user=user, url_hash__in=list(by_hash))
+        found = {bytes(link.url_hash): link for link in queryset}
+        missing = by_hash.keys() - found.keys()
+        if missing:
+            self.bulk_create(
+                [
+                    self.model(user=user, name=by_hash[key], url_hash=key)
+                    for key in missing
+                ],
+                ignore_conflicts=True,
+            )
+            names_created.send(sender=self.model, user_id=user.pk)
+            found = {bytes(link.url_hash): link for link in queryset.all()}
+
+        return {by_hash[key]: link for key, link in found.items()}
+
+
 class Link(models.Model):
-    """Links and references useded."""
+    """Links and references useded.
+
+    Names are stored in canonical form, unique per user through the hash
+    of the name.
+    """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=700)
+    url_hash = models.BinaryField(max_length=16)
+
+    objects = LinkManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['name'],
+                name='core_link_name_prefix',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['user', 'name'],
+                name='core_link_user_name_prefix',
+                opclasses=['int8_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'url_hash'],
+                name='unique_link_user_url_hash',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.name = canonical_url(self.name)
+        self.url_hash = url_hash(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'url_hash'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class Task(models.Model):
+    """Background task waiting to be run by a worker."""
+    STATUS_PENDING = 'pending'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
 
     def __str__(self):
         return self.name
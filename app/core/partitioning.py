@@ -0,0 +1,173 @@
+"""
+PostgreSQL partitioning of the note tables.
+
+`core_note` is hash partitioned by `user_id`, so the queries of one user
+only touch one partition. The note relation tables are hash partitioned
+by `note_id` with the same number of partitions, which splits them
+along the notes, and keep their unique (note, other) constraint.
+
+Unique constraints of a partitioned table must include the partition
+key, so the primary keys become (id, key). Ids still come from the
+original sequences and stay unique. The foreign keys to `core_note`
+from the relation and revision tables are dropped, Django deletes
+those rows itself when a note is deleted.
+"""
+NOTE_TABLE = 'core_note'
+
+# Tables partitioned along the notes, with their partition key.
+NOTE_CHILD_TABLES = [
+    ('core_note_tags', 'note_id'),
+    ('core_note_todos', 'note_id'),
+    ('core_note_links', 'note_id'),
+]
+
+# Tables whose `note_id` foreign key is dropped while partitioned.
+NOTE_REFERENCES = [table for table, _ in NOTE_CHILD_TABLES] + \
+    ['core_noterevision']
+
+
+def is_partitioned(cursor, table):
+    """Return whether `table` is a partitioned table."""
+    cursor.execute(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+        [table],
+    )
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def references_notes(cursor, table):
+    """Return whether `table` has a foreign key to `core_note`."""
+    cursor.execute(
+        """
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+            AND confrelid = %s::regclass
+        """,
+        [table, NOTE_TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def _definitions(cursor, table):
+    """Return the index and constraint definitions to recreate."""
+    cursor.execute(
+        """
+        SELECT indexdef FROM pg_indexes
+        WHERE tablename = %s AND indexname NOT IN (
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = %s::regclass
+        )
+        """,
+        [table, table],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('u', 'f')
+            AND confrelid <> %s::regclass
+        """,
+        [table, NOTE_TABLE],
+    )
+    constraints = cursor.fetchall()
+
+    return indexes, constraints
+
+
+def _rebuild(cursor, table, create, primary_key, fill_partitions=None):
+    """Replace `table` by a new table keeping its rows and indexes.
+
+    `create` is the CREATE TABLE statement of the new table, run after
+    the old one was renamed to `<table>_old`.
+    """
+    old = f'{table}_old'
+    indexes, constraints = _definitions(cursor, table)
+
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    cursor.execute(create)
+    if fill_partitions:
+        fill_partitions()
+    cursor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    cursor.execute(
+        f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id"
+    )
+    cursor.execute(f'DROP TABLE {old} CASCADE')
+
+    cursor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey '
+        f'PRIMARY KEY ({primary_key})'
+    )
+    for index in indexes:
+        cursor.execute(index)
+    for name, definition in constraints:
+        cursor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+        )
+
+
+def _partition(cursor, table, key, partitions):
+    if is_partitioned(cursor, table):
+        return
+
+    def fill_partitions():
+        for remainder in range(partitions):
+            cursor.execute(
+                f'CREATE TABLE {table}_p{remainder} PARTITION OF {table} '
+                f'FOR VALUES WITH (MODULUS {partitions}, '
+                f'REMAINDER {remainder})'
+            )
+
+    _rebuild(
+        cursor,
+        table,
+        f'CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS '
+        f'INCLUDING CONSTRAINTS) PARTITION BY HASH ({key})',
+        f'id, {key}',
+        fill_partitions,
+    )
+
+
+def _unpartition(cursor, table):
+    """Rebuild `table` as a plain table, return whether it was needed."""
+    if not is_partitioned(cursor, table):
+        return False
+
+    _rebuild(
+        cursor,
+        table,
+        f'CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS '
+        f'INCLUDING CONSTRAINTS)',
+        'id',
+    )
+    return True
+
+
+def partition_notes(connection, partitions):
+    """Partition the note tables into `partitions` partitions."""
+    with connection.cursor() as cursor:
+        _partition(cursor, NOTE_TABLE, 'user_id', partitions)
+        for table, key in NOTE_CHILD_TABLES:
+            _partition(cursor, table, key, partitions)
+
+
+def unpartition_notes(connection):
+    """Turn the note tables back into plain tables.
+
+    The foreign keys to `core_note` are only added back when a table was
+    unpartitioned, and are skipped for tables that still have one.
+    """
+    with connection.cursor() as cursor:
+        unpartitioned = _unpartition(cursor, NOTE_TABLE)
+        for table, _ in NOTE_CHILD_TABLES:
+            unpartitioned = _unpartition(cursor, table) or unpartitioned
+        if not unpartitioned:
+            return
+        for table in NOTE_REFERENCES:
+            if references_notes(cursor, table):
+                continue
+            cursor.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {table}_note_id_fk '
+                f'FOREIGN KEY (note_id) REFERENCES {NOTE_TABLE} (id) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
@@ -0,0 +1,28 @@
+"""
+OpenAPI annotations of the API views.
+
+The drf_spectacular decorators are only applied when the app is
+installed. Servers without the schema generator, like production which
+serves the schema built with the image, never import it.
+"""
+from django.conf import settings
+
+if 'drf_spectacular' in settings.INSTALLED_APPS:
+    from drf_spectacular.types import OpenApiTypes  # noqa: F401
+    from drf_spectacular.utils import (OpenApiParameter,  # noqa: F401
+                                       extend_schema,
+                                       extend_schema_view)
+else:
+    class OpenApiTypes:
+        """Stand-in for the drf_spectacular types."""
+        STR = str
+        INT = int
+
+    def OpenApiParameter(*args, **kwargs):
+        return None
+
+    def extend_schema(*args, **kwargs):
+        return lambda view: view
+
+    def extend_schema_view(**kwargs):
+        return lambda view: view
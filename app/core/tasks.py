@@ -0,0 +1,145 @@
+"""
+Lightweight database backed task queue.
+
+Handlers are registered with the ``task`` decorator inside a ``tasks.py``
+module of any installed app and always receive a list of payloads, so
+tasks of the same type are processed in one batch.
+
+Handlers must be idempotent. When a batch fails, each of its payloads is
+run again on its own and only the failing ones are retried later, and a
+task whose worker stops before deleting it runs again after its lease.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register the decorated function as the handler for `name`."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_handler(name):
+    """Return the handler registered for `name`."""
+    return _registry.get(name)
+
+
+def autodiscover():
+    """Import the tasks module of every installed app."""
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, delay=0, using=None):
+    """Queue a task once the current transaction of `using` commits."""
+    def _create():
+        Task.objects.create(
+            name=name,
+            payload=payload or {},
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+
+    transaction.on_commit(_create, using=using)
+
+
+def retry_delay(attempts):
+    """Return the backoff in seconds before retrying a task."""
+    delay = settings.TASK_RETRY_BACKOFF * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.TASK_RETRY_MAX_BACKOFF)
+
+
+def claim_tasks(limit):
+    """Lease up to `limit` due tasks to the calling worker."""
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.TASK_LEASE_SECONDS)
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.STATUS_PENDING, run_at__lte=now)
+            .order_by('run_at')[:limit]
+        )
+        for item in tasks:
+            item.attempts += 1
+            item.run_at = lease
+        Task.objects.bulk_update(tasks, ['attempts', 'run_at'])
+
+    return tasks
+
+
+def _fail(tasks, error):
+    """Reschedule failed tasks or give up after too many attempts.
+
+    Tasks given up keep their failure time in `run_at`, until
+    `clear_failed_tasks` deletes them.
+    """
+    now = timezone.now()
+    for item in tasks:
+        item.last_error = error
+        if item.attempts >= settings.TASK_MAX_ATTEMPTS:
+            item.status = Task.STATUS_FAILED
+            item.run_at = now
+            logger.error(
+                'Task %s gave up after %d attempts.',
+                item.name,
+                item.attempts,
+                extra={'data': {'task_id': item.id, 'payload': item.payload}},
+            )
+        else:
+            item.run_at = now + timedelta(seconds=retry_delay(item.attempts))
+    Task.objects.bulk_update(tasks, ['last_error', 'status', 'run_at'])
+
+
+def _run(handler, name, group):
+    """Run a group of tasks, return the failed ones with their error.
+
+    A failing group of several tasks is split, so the tasks that succeed
+    on their own are not retried.
+    """
+    try:
+        handler([item.payload for item in group])
+    except Exception:
+        logger.exception('Task %s failed.', name)
+        if len(group) == 1:
+            return [(group, traceback.format_exc())]
+        failed = []
+        for item in group:
+            failed += _run(handler, name, [item])
+        return failed
+
+    return []
+
+
+def run_tasks(limit=None):
+    """Claim and run a batch of due tasks, return how many were run."""
+    tasks = claim_tasks(limit or settings.TASK_BATCH_SIZE)
+    groups = {}
+    for item in tasks:
+        groups.setdefault(item.name, []).append(item)
+
+    for name, group in groups.items():
+        handler = get_handler(name)
+        if handler is None:
+            _fail(group, f'No handler registered for task {name!r}.')
+            continue
+        failed_ids = set()
+        for items, error in _run(handler, name, group):
+            _fail(items, error)
+            failed_ids.update(item.id for item in items)
+        Task.objects.filter(
+            id__in=[item.id for item in group if item.id not in failed_ids]
+        ).delete()
+
+    return len(tasks)
@@ -1,10 +1,17 @@
 """
 Test for the Django admin modifications.
 """
+from unittest.mock import MagicMock, patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core import models
+from core.admin import EstimatedCountPaginator
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -44,3 +51,78 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_owned_objects_lists(self):
+        """Test the note, tag, todo and link lists work."""
+        tag = models.Tag.objects.create(user=self.user, name='Python')
+        note = models.Note.objects.create(
+            user=self.user,
+            title='Sample note',
+            description='Sample description',
+        )
+        note.tags.add(tag)
+        models.Todo.objects.create(user=self.user, title='Read docs')
+        models.Link.objects.create(user=self.user, name='https://x.com')
+
+        for name in ['note', 'tag', 'todo', 'link']:
+            url = reverse(f'admin:core_{name}_changelist')
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertContains(res, self.user.email)
+
+    def test_owned_objects_list_queries(self):
+        """Test the list loads owners without a query per row."""
+        url = reverse('admin:core_note_changelist')
+        counts = []
+        for user in [self.user, self.admin_user]:
+            for i in range(3):
+                models.Note.objects.create(
+                    user=user,
+                    title=f'Note {i}',
+                    description='Sample description',
+                )
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_owned_objects_search(self):
+        """Test searching by name prefix and by owner email."""
+        models.Tag.objects.create(user=self.user, name='Python')
+        models.Tag.objects.create(user=self.admin_user, name='Rustlang')
+        url = reverse('admin:core_tag_changelist')
+
+        res = self.client.get(url, {'q': 'Pyt'})
+        self.assertContains(res, 'Python')
+        self.assertNotContains(res, 'Rustlang')
+
+        res = self.client.get(url, {'q': self.admin_user.email})
+        self.assertContains(res, 'Rustlang')
+        self.assertNotContains(res, 'Python')
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Tests for the planner estimate of the admin lists."""
+
+    def count(self, estimate):
+        postgresql = MagicMock(vendor='postgresql')
+        cursor = postgresql.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (estimate,)
+        with patch('core.admin.connections', {'default': postgresql}):
+            paginator = EstimatedCountPaginator(models.Note.objects.all(), 10)
+            return paginator.count, cursor
+
+    def test_large_table_estimate(self):
+        """Test the estimate, summed over partitions, is used."""
+        count, cursor = self.count(25000.0)
+
+        self.assertEqual(count, 25000)
+        self.assertIn('pg_inherits', cursor.execute.call_args.args[0])
+
+    def test_missing_estimate(self):
+        """Test a table without an estimate is counted."""
+        count, cursor = self.count(None)
+
+        self.assertEqual(count, 0)
@@ -0,0 +1,74 @@
+"""
+Tests for the system checks of the cache configuration.
+"""
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import (check_replica_cache, check_shard_cache,
+                         check_throttle_cache)
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+MEMCACHED = {'default': {
+    'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'LOCATION': 'memcached:11211',
+}}
+
+
+class CacheCheckTests(SimpleTestCase):
+    """Test the checks requiring a cache shared by workers."""
+
+    @override_settings(DATABASE_REPLICAS=['replica1'], CACHES=LOCMEM)
+    def test_replicas_with_process_cache(self):
+        """Replicas with a process cache are an error."""
+        errors = check_replica_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'], CACHES=MEMCACHED)
+    def test_replicas_with_shared_cache(self):
+        """Replicas with a shared cache pass."""
+        self.assertEqual(check_replica_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS=[], CACHES=LOCMEM)
+    def test_no_replicas_with_process_cache(self):
+        """A process cache is fine without replicas."""
+        self.assertEqual(check_replica_cache(None), [])
+
+    @override_settings(
+        THROTTLE_BACKEND='core.throttling.CacheSlidingWindow', CACHES=LOCMEM,
+    )
+    def test_cache_throttle_with_process_cache(self):
+        """Cache throttle counters in a process cache get a warning."""
+        errors = check_throttle_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.W001'])
+
+    @override_settings(
+        THROTTLE_BACKEND='core.throttling.CacheSlidingWindow',
+        CACHES=MEMCACHED,
+    )
+    def test_cache_throttle_with_shared_cache(self):
+        """Cache throttle counters in a shared cache pass."""
+        self.assertEqual(check_throttle_cache(None), [])
+
+    @override_settings(
+        THROTTLE_BACKEND='core.throttling.LocalSlidingWindow', CACHES=LOCMEM,
+    )
+    def test_local_throttle(self):
+        """The local throttle backend does not use the cache."""
+        self.assertEqual(check_throttle_cache(None), [])
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard1'], CACHES=LOCMEM)
+    def test_shards_with_process_cache(self):
+        """Shards with a process cache get a warning."""
+        errors = check_shard_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.W002'])
+
+    @override_settings(
+        DATABASE_SHARDS=['default', 'shard1'], CACHES=MEMCACHED,
+    )
+    def test_shards_with_shared_cache(self):
+        """Shards with a shared cache pass."""
+        self.assertEqual(check_shard_cache(None), [])
@@ -1,13 +1,21 @@
 """
 Test custom Django management commands.
 """
-from unittest.mock import patch
+from io import StringIO
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import partitioning
+from core.db_routers import lookup_shard, pick_shard, use_shard
+from core.models import Note, NoteRevision, Tag, UserShard
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -31,3 +39,239 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BulkCreateUsersTests(TestCase):
+    """Test the bulk_create_users command."""
+    databases = {'default', 'shard1'}
+
+    def write_csv(self, content):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as csv_file:
+            csv_file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_bulk_create_users(self):
+        """Test users are created and existing emails are skipped."""
+        get_user_model().objects.create_user('old@example.com', 'pass123')
+        path = self.write_csv(
+            'email,name,password\n'
+            'new@EXAMPLE.com,New User,newpass123\n'
+            'old@example.com,Old User,oldpass123\n'
+            'nopass@example.com,,\n'
+        )
+
+        call_command('bulk_create_users', path, stdout=StringIO())
+
+        users = get_user_model().objects
+        self.assertEqual(users.count(), 3)
+        new = users.get(email='new@example.com')
+        self.assertEqual(new.name, 'New User')
+        self.assertTrue(new.check_password('newpass123'))
+        self.assertFalse(
+            users.get(email='nopass@example.com').has_usable_password()
+        )
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard1'])
+    def test_bulk_created_users_placed(self):
+        """Test new users get a shard and a copy on it."""
+        path = self.write_csv(
+            'email\n' + ''.join(f'user{i}@example.com\n' for i in range(20))
+        )
+
+        call_command('bulk_create_users', path, stdout=StringIO())
+
+        users = get_user_model().objects.all()
+        on_shard = get_user_model().objects.using('shard1')
+        for user in users:
+            alias = pick_shard(user.pk)
+            self.assertEqual(UserShard.objects.get(user=user).alias, alias)
+            self.assertEqual(
+                on_shard.filter(pk=user.pk).exists(), alias == 'shard1',
+            )
+
+
+class ImportTimeTests(SimpleTestCase):
+    """Test the import_time command."""
+
+    def test_import_time_within_budget(self):
+        """Test the report passes with a generous budget."""
+        out = StringIO()
+        call_command('import_time', budget=60, stdout=out)
+
+        self.assertIn('django', out.getvalue())
+
+    def test_import_time_over_budget(self):
+        """Test the command fails when imports exceed the budget."""
+        with self.assertRaises(CommandError):
+            call_command('import_time', budget=0, stdout=StringIO())
+
+
+class BuildSchemaTests(SimpleTestCase):
+    """Test the build_schema command."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'schema.yml')
+
+    def test_build_schema_writes_file(self):
+        """Test the schema is rendered to the file."""
+        call_command('build_schema', file=self.path, stdout=StringIO())
+
+        with open(self.path) as schema:
+            self.assertIn('openapi:', schema.read())
+
+    def test_build_schema_unchanged_keeps_file(self):
+        """Test the file is not rewritten when the schema is unchanged."""
+        call_command('build_schema', file=self.path, stdout=StringIO())
+        os.utime(self.path, ns=(0, 0))
+
+        out = StringIO()
+        call_command('build_schema', file=self.path, stdout=out)
+
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertIn('up to date', out.getvalue())
+
+    def test_build_schema_check(self):
+        """Test --check fails for a stale file without replacing it."""
+        with open(self.path, 'w') as schema:
+            schema.write('openapi: 3.0.3\n')
+
+        with self.assertRaises(CommandError):
+            call_command('build_schema', file=self.path, check=True)
+
+        with open(self.path) as schema:
+            self.assertEqual(schema.read(), 'openapi: 3.0.3\n')
+
+
+@override_settings(DATABASE_SHARDS=['default', 'shard1'])
+class MoveUserShardTests(TestCase):
+    """Test the move_user_shard command."""
+    databases = {'default', 'shard1'}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        UserShard.objects.filter(user=self.user).delete()
+        UserShard.place(self.user, 'default')
+        self.tag = Tag.objects.create(user=self.user, name='Python')
+        self.note = Note.objects.create(
+            user=self.user,
+            title='Sample note',
+            description='Sample description',
+        )
+        self.note.tags.add(self.tag)
+        NoteRevision.objects.create(note=self.note, version=1, data={})
+
+    def move(self, target):
+        call_command(
+            'move_user_shard', self.user.pk, target,
+            grace=0, stdout=StringIO(),
+        )
+
+    def test_move_user_shard(self):
+        """Test the rows move with their ids and the lookup switches."""
+        self.move('shard1')
+
+        self.assertEqual(UserShard.objects.get(user=self.user).alias, 'shard1')
+        self.assertFalse(Note.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+        with use_shard('shard1'):
+            note = Note.objects.get(id=self.note.id)
+            self.assertEqual(list(note.tags.all()), [self.tag])
+            self.assertEqual(note.revisions.count(), 1)
+
+        self.move('default')
+
+        self.assertEqual(Note.objects.get().id, self.note.id)
+        self.assertFalse(Note.objects.using('shard1').exists())
+        self.assertFalse(
+            get_user_model().objects.using('shard1').exists()
+        )
+
+    def test_move_updates_cached_shard(self):
+        """Test a move replaces the cached shard of the user."""
+        self.assertEqual(lookup_shard(self.user.pk), ('default', ''))
+
+        self.move('shard1')
+
+        self.assertEqual(lookup_shard(self.user.pk), ('shard1', ''))
+
+    def test_move_to_same_shard(self):
+        """Test moving a user to its own shard fails."""
+        with self.assertRaises(CommandError):
+            self.move('default')
+
+
+class PartitionNotesTests(SimpleTestCase):
+    """Test the partition_notes command."""
+
+    def call(self, vendor, **options):
+        connection = MagicMock(vendor=vendor, alias='default')
+        with patch(
+            'core.management.commands.partition_notes.connections',
+            {'default': connection},
+        ), patch('core.management.commands.partition_notes.transaction'), \
+                patch('core.partitioning.partition_notes') as patched:
+            call_command('partition_notes', stdout=StringIO(), **options)
+        return patched, connection
+
+    def test_partition_notes(self):
+        """Test the note tables are partitioned on PostgreSQL."""
+        patched, connection = self.call('postgresql', partitions=8)
+
+        patched.assert_called_once_with(connection, 8)
+
+    def test_partition_notes_needs_postgresql(self):
+        """Test the command refuses other databases."""
+        with self.assertRaises(CommandError):
+            self.call('sqlite', partitions=8)
+
+    def test_partition_notes_needs_partitions(self):
+        """Test at least two partitions are required."""
+        with self.assertRaises(CommandError):
+            self.call('postgresql', partitions=1)
+
+
+@patch('core.partitioning._rebuild')
+class UnpartitionNotesTests(SimpleTestCase):
+    """Test turning the note tables back into plain tables."""
+
+    def unpartition(self, partitioned, referencing=()):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        with patch(
+            'core.partitioning.is_partitioned',
+            side_effect=lambda cursor, table: table in partitioned,
+        ), patch(
+            'core.partitioning.references_notes',
+            side_effect=lambda cursor, table: table in referencing,
+        ):
+            partitioning.unpartition_notes(connection)
+        return [
+            call.args[0] for call in cursor.execute.call_args_list
+            if 'ADD CONSTRAINT' in call.args[0]
+        ]
+
+    def test_unpartition_restores_foreign_keys(self, patched_rebuild):
+        """Test the note foreign keys are added back once."""
+        tables = [partitioning.NOTE_TABLE] + [
+            table for table, _ in partitioning.NOTE_CHILD_TABLES
+        ]
+
+        added = self.unpartition(tables, referencing=['core_note_tags'])
+
+        self.assertEqual(patched_rebuild.call_count, len(tables))
+        self.assertEqual(len(added), len(partitioning.NOTE_REFERENCES) - 1)
+        self.assertFalse(any('core_note_tags ' in sql for sql in added))
+
+    def test_unpartition_plain_tables(self, patched_rebuild):
+        """Test nothing is changed when no table is partitioned."""
+        added = self.unpartition([])
+
+        patched_rebuild.assert_not_called()
+        self.assertEqual(added, [])
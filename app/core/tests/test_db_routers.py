@@ -0,0 +1,273 @@
+"""
+Tests for the read replica routing.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.db_routers import (ReplicaRouter,
+                             ShardRouter,
+                             forget_shard,
+                             is_sharded,
+                             lookup_shard,
+                             pick_shard,
+                             start_replica_reads,
+                             stop_replica_reads,
+                             use_shard)
+from core.models import Note, Tag, UserShard
+
+NOTES_URL = reverse('note:note-list')
+TAGS_URL = reverse('note:tag-list')
+ME_URL = reverse('user:me')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the router decisions."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads use the primary unless replica reads are on."""
+        self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+
+    def test_replica_reads(self):
+        """Test reads use a replica while replica reads are on."""
+        token = start_replica_reads()
+        try:
+            self.assertEqual(self.router.db_for_read(Note), 'replica1')
+            self.assertEqual(self.router.db_for_write(Note), DEFAULT_DB_ALIAS)
+        finally:
+            stop_replica_reads(token)
+
+        self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """Test reads use the primary without replicas."""
+        token = start_replica_reads()
+        try:
+            self.assertEqual(self.router.db_for_read(Note), DEFAULT_DB_ALIAS)
+        finally:
+            stop_replica_reads(token)
+
+    def test_migrations_only_on_primary(self):
+        """Test only the primary is migrated."""
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'core'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=60)
+class ReplicaApiTests(TransactionTestCase):
+    """Test which database the API requests read from.
+
+    Runs outside a test transaction so the replica connection, a mirror
+    of the primary, sees the committed rows.
+    """
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_replica_queries(self, url):
+        with CaptureQueriesContext(connections['replica1']) as queries:
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def test_list_reads_from_replica(self):
+        """Test safe list requests read from the replica."""
+        self.assertGreater(self.get_replica_queries(NOTES_URL), 0)
+        self.assertGreater(self.get_replica_queries(TAGS_URL), 0)
+
+    def test_profile_reads_from_replica(self):
+        """Test the profile of a signed token user is read from replica."""
+        self.client.force_authenticate(
+            get_user_model().from_db(DEFAULT_DB_ALIAS, ['id'], [self.user.pk])
+        )
+
+        self.assertEqual(self.get_replica_queries(ME_URL), 1)
+
+    def test_other_actions_read_from_primary(self):
+        """Test actions outside list and retrieve use the primary."""
+        note = Note.objects.create(
+            user=self.user,
+            title='Sample note',
+            description='Sample description',
+        )
+        url = reverse('note:note-revisions', args=[note.id])
+
+        self.assertEqual(self.get_replica_queries(url), 0)
+
+    def test_reads_after_write_use_primary(self):
+        """Test users read their own writes from the primary."""
+        payload = {'title': 'Sample note', 'description': 'Sample'}
+        with CaptureQueriesContext(connections['replica1']) as queries:
+            res = self.client.post(NOTES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(len(queries), 0)
+
+        self.assertEqual(self.get_replica_queries(NOTES_URL), 0)
+        res = self.client.get(NOTES_URL)
+        self.assertEqual(len(res.data), 1)
+
+        cache.clear()
+        self.assertGreater(self.get_replica_queries(NOTES_URL), 0)
+
+
+@override_settings(DATABASE_SHARDS=['default', 'shard1'])
+class ShardRouterTests(SimpleTestCase):
+    """Test the shard router decisions."""
+
+    def setUp(self):
+        self.router = ShardRouter()
+
+    def test_sharded_models(self):
+        """Test the notes and their relations are sharded, users not."""
+        self.assertTrue(is_sharded(Note))
+        self.assertTrue(is_sharded(Note.tags.through))
+        self.assertFalse(is_sharded(get_user_model()))
+        self.assertFalse(is_sharded(UserShard))
+
+    def test_queries_follow_current_shard(self):
+        """Test sharded queries use the shard of the context."""
+        with use_shard('shard1'):
+            self.assertEqual(self.router.db_for_read(Note), 'shard1')
+            self.assertEqual(self.router.db_for_write(Note), 'shard1')
+            self.assertIsNone(self.router.db_for_write(get_user_model()))
+
+        self.assertIsNone(self.router.db_for_read(Note))
+        self.assertEqual(self.router.db_for_write(Note), DEFAULT_DB_ALIAS)
+
+    def test_queries_follow_instance(self):
+        """Test queries about a sharded instance use its database."""
+        note = Note.from_db('shard1', ['id'], [1])
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, ['id'], [1])
+
+        self.assertEqual(
+            self.router.db_for_write(Tag, instance=note), 'shard1'
+        )
+        with use_shard('shard1'):
+            self.assertEqual(
+                self.router.db_for_write(Note, instance=user), 'shard1'
+            )
+
+    def test_pick_shard_spreads_users(self):
+        """Test new users are spread over all shards."""
+        shards = {pick_shard(user_id) for user_id in range(100)}
+
+        self.assertEqual(shards, {'default', 'shard1'})
+        self.assertEqual(pick_shard(42), pick_shard(42))
+
+
+@override_settings(DATABASE_SHARDS=['default', 'shard1'])
+class ShardApiTests(TestCase):
+    """Test the API requests run on the shard of the user."""
+    databases = {'default', 'shard1'}
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        UserShard.objects.filter(user=self.user).delete()
+        UserShard.place(self.user, 'shard1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_new_user_placed(self):
+        """Test new users get a shard."""
+        user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+
+        shard = UserShard.objects.get(user=user)
+        self.assertEqual(shard.alias, pick_shard(user.pk))
+
+    def test_shard_lookup_cached(self):
+        """Test the shard of the user is looked up once."""
+        self.client.get(NOTES_URL)
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            res = self.client.get(NOTES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse([sql for sql in queries if 'core_usershard' in sql])
+        self.assertEqual(lookup_shard(self.user.pk), ('shard1', ''))
+
+    def test_create_note_on_user_shard(self):
+        """Test notes and their tags are written to the user shard."""
+        payload = {
+            'title': 'Sample note',
+            'description': 'Sample description',
+            'tags': [{'name': 'Python'}],
+        }
+        res = self.client.post(NOTES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertFalse(Note.objects.exists())
+        note = Note.objects.using('shard1').get(id=res.data['id'])
+        self.assertEqual(note.user_id, self.user.pk)
+        self.assertEqual(
+            list(note.tags.values_list('name', flat=True)), ['Python']
+        )
+
+        res = self.client.get(NOTES_URL)
+        self.assertEqual([item['id'] for item in res.data], [note.id])
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([item['name'] for item in res.data], ['Python'])
+
+    def test_deleted_user_removed_from_shard(self):
+        """Test deleting a user deletes their rows on the shard."""
+        payload = {
+            'title': 'Sample note',
+            'description': 'Sample description',
+            'tags': [{'name': 'Python'}],
+        }
+        res = self.client.post(NOTES_URL, payload, format='json')
+        self.assertEqual(res.status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertFalse(Note.objects.using('shard1').exists())
+        self.assertFalse(Tag.objects.using('shard1').exists())
+        self.assertFalse(Note.tags.through.objects.using('shard1').exists())
+        self.assertFalse(
+            get_user_model().objects.using('shard1').exists()
+        )
+
+    def test_writes_rejected_while_moving(self):
+        """Test writes get a 503 while the user changes shard."""
+        UserShard.objects.filter(user=self.user).update(moving_to='default')
+        forget_shard(self.user.pk)
+        payload = {'title': 'Sample note', 'description': 'Sample'}
+
+        res = self.client.post(NOTES_URL, payload, format='json')
+        self.assertEqual(res.status_code, 503)
+
+        res = self.client.get(NOTES_URL)
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,75 @@
+"""
+Tests for password hashing.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+TOKEN_URL = reverse('user:token')
+
+
+class HashersTests(TestCase):
+    """Test hashing passwords."""
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_password_uses_configured_iterations(self):
+        """Test new hashes use the configured work factor."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(user.check_password('testpass123'))
+        self.assertFalse(user.check_password('wrong'))
+
+    def test_login_upgrades_hash(self):
+        """Test logging in rehashes passwords with an old work factor."""
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            user = get_user_model().objects.create_user(
+                email='user@example.com',
+                password='testpass123',
+            )
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            payload = {'email': user.email, 'password': 'testpass123'}
+            res = APIClient().post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_no_free_slot_returns_503(self):
+        """Test logins are shed while every hashing slot is taken."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        payload = {'email': user.email, 'password': 'testpass123'}
+
+        with override_settings(PASSWORD_HASH_MAX_CONCURRENT=1), \
+                hashers.hashing_slot():
+            res = APIClient().post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(cache.get(hashers.SLOTS_KEY), 0)
+
+        res = APIClient().post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(PASSWORD_HASH_MAX_CONCURRENT=0)
+    def test_model_layer_not_bounded(self):
+        """Test saving users outside of logins never needs a slot."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+        self.assertTrue(user.check_password('testpass123'))
@@ -0,0 +1,47 @@
+"""
+Tests for the shared middleware.
+"""
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+NOTES_URL = reverse('note:note-list')
+TAGS_URL = reverse('note:tag-list')
+
+
+@override_settings(
+    REQUEST_BODY_MAX_SIZE=100,
+    REQUEST_BODY_LIMITS={'note:note-list': 1000},
+)
+class BodySizeLimitMiddlewareTests(SimpleTestCase):
+    """Test rejecting oversized request bodies."""
+
+    def test_rejected_before_view(self):
+        """Test an oversized body gets 413 before authentication."""
+        res = self.client.post(
+            NOTES_URL, 'x' * 2000, content_type='application/json',
+        )
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertEqual(res.json(), {'detail': 'Request body is too large.'})
+
+    def test_default_limit(self):
+        """Test URL names without a limit use the default one."""
+        res = self.client.post(
+            TAGS_URL, 'x' * 200, content_type='application/json',
+        )
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    def test_body_under_limit_reaches_view(self):
+        """Test bodies within the limit are passed to the view."""
+        res = self.client.post(
+            NOTES_URL, 'x' * 500, content_type='application/json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,97 @@
+"""
+Tests for data migrations.
+"""
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase, override_settings
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Run a data migration against rows created before it."""
+    migrate_from = None
+    migrate_to = None
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def setUp(self):
+        self.apps = self.migrate(self.migrate_from)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+class LinkUrlHashMigrationTests(MigrationTestCase):
+    """Test merging links that share a canonical url."""
+    migrate_from = ('core', '0019_partition_notes')
+    migrate_to = ('core', '0020_link_url_hash')
+
+    def test_note_linked_to_several_duplicates(self):
+        """Test a note linked to two copies, but not the kept one."""
+        User = self.apps.get_model('core', 'User')
+        Link = self.apps.get_model('core', 'Link')
+        Note = self.apps.get_model('core', 'Note')
+        user = User.objects.create(email='user@example.com')
+        kept = Link.objects.create(user=user, name='https://x.com')
+        first = Link.objects.create(user=user, name='http://X.com')
+        dup = Link.objects.create(user=user, name='HTTPS://x.com/')
+        copy = Link.objects.create(user=user, name='https://X.com/')
+        other = Link.objects.create(user=user, name='http://x.com/')
+        note = Note.objects.create(user=user, title='A', description='a')
+        note.links.add(first, other, dup, copy)
+        both = Note.objects.create(user=user, title='B', description='b')
+        both.links.add(kept, copy)
+
+        apps = self.migrate(self.migrate_to)
+
+        Link = apps.get_model('core', 'Link')
+        Note = apps.get_model('core', 'Note')
+        self.assertEqual(
+            sorted(Link.objects.values_list('id', 'name')),
+            [(kept.id, 'https://x.com'), (first.id, 'http://x.com')],
+        )
+        self.assertEqual(
+            sorted(Note.objects.get(id=note.id).links.values_list(
+                'id', flat=True
+            )),
+            [kept.id, first.id],
+        )
+        self.assertEqual(
+            list(Note.objects.get(id=both.id).links.values_list(
+                'id', flat=True
+            )),
+            [kept.id],
+        )
+
+
+@override_settings(COMPRESSED_TEXT_THRESHOLD=100)
+class CompressRevisionDataMigrationTests(MigrationTestCase):
+    """Test compressing the stored revision data."""
+    migrate_from = ('core', '0022_revokeduser')
+    migrate_to = ('core', '0023_compress_revision_data')
+
+    def test_revision_data_compressed(self):
+        """Test existing snapshots are compressed and read back."""
+        User = self.apps.get_model('core', 'User')
+        Note = self.apps.get_model('core', 'Note')
+        NoteRevision = self.apps.get_model('core', 'NoteRevision')
+        user = User.objects.create(email='user@example.com')
+        note = Note.objects.create(user=user, title='A', description='a')
+        data = {'title': 'A', 'notation': 'Repeated study notes. ' * 100}
+        revision = NoteRevision.objects.create(note=note, version=1, data=data)
+
+        apps = self.migrate(self.migrate_to)
+
+        NoteRevision = apps.get_model('core', 'NoteRevision')
+        self.assertEqual(NoteRevision.objects.get(id=revision.id).data, data)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT data FROM core_noterevision WHERE id = %s',
+                [revision.id],
+            )
+            stored = bytes(cursor.fetchone()[0])
+        self.assertLess(len(stored), len(data['notation']) / 5)
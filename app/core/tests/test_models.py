@@ -2,9 +2,11 @@
 Test for models.
 """
 from core import models
+from core.links import url_hash
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
 
 
 def create_user(email='user@example.com', password='testpass123'):
@@ -84,3 +86,88 @@ class ModelTests(TestCase):
         user = create_user()
         link = models.Link.objects.create(user=user, name='Ref one')
         self.assertEqual(str(link), link.name)
+
+    def test_link_stored_canonical(self):
+        """Test links are stored canonical with their hash."""
+        user = create_user()
+        link = models.Link.objects.create(
+            user=user,
+            name=' HTTPS://Example.com:443/a?b=1#top ',
+        )
+
+        link.refresh_from_db()
+        self.assertEqual(link.name, 'https://example.com/a?b=1')
+        self.assertEqual(bytes(link.url_hash), url_hash(link.name))
+        self.assertEqual(len(link.url_hash), 16)
+
+    def test_get_or_create_urls(self):
+        """Test links are looked up by hash and created once."""
+        user = create_user()
+        other = create_user(email='other@example.com')
+        models.Link.objects.create(user=other, name='https://example.com')
+
+        links = models.Link.objects.get_or_create_urls(
+            user, ['https://example.com/', 'https://EXAMPLE.com', 'Ref'],
+        )
+
+        self.assertEqual(set(links), {'https://example.com', 'Ref'})
+        self.assertEqual(models.Link.objects.filter(user=user).count(), 2)
+        again = models.Link.objects.get_or_create_urls(user, ['Ref'])
+        self.assertEqual(again['Ref'].id, links['Ref'].id)
+
+    @override_settings(COMPRESSED_TEXT_THRESHOLD=100)
+    def test_note_notation_compressed(self):
+        """Test large notations are stored compressed and read back."""
+        user = create_user()
+        notation = 'Repeated study notes. ' * 100
+        note = models.Note.objects.create(
+            user=user,
+            title='Large note',
+            notation=notation,
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT notation FROM core_note WHERE id = %s', [note.id]
+            )
+            stored = bytes(cursor.fetchone()[0])
+        note.refresh_from_db()
+        self.assertLess(len(stored), len(notation) / 5)
+        self.assertEqual(note.notation, notation)
+
+    @override_settings(COMPRESSED_TEXT_THRESHOLD=100)
+    def test_revision_data_compressed(self):
+        """Test large revision snapshots are stored compressed."""
+        note = models.Note.objects.create(user=create_user(), title='Note')
+        data = {'title': 'Note', 'notation': 'Repeated study notes. ' * 100}
+        revision = models.NoteRevision.objects.create(
+            note=note, version=1, data=data,
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT data FROM core_noterevision WHERE id = %s',
+                [revision.id],
+            )
+            stored = bytes(cursor.fetchone()[0])
+        revision.refresh_from_db()
+        self.assertLess(len(stored), len(data['notation']) / 5)
+        self.assertEqual(revision.data, data)
+
+    @override_settings(COMPRESSED_TEXT_THRESHOLD=100)
+    def test_note_small_notation_not_compressed(self):
+        """Test notations below the threshold are stored as is."""
+        user = create_user()
+        note = models.Note.objects.create(
+            user=user,
+            title='Small note',
+            notation='Short',
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT notation FROM core_note WHERE id = %s', [note.id]
+            )
+            stored = bytes(cursor.fetchone()[0])
+        self.assertEqual(stored, b'\x00Short')
+        self.assertTrue(models.Note.objects.filter(notation='Short').exists())
@@ -0,0 +1,144 @@
+"""
+Tests for the background task queue.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+
+class TaskQueueTests(TestCase):
+    """Test enqueueing and running tasks."""
+
+    def setUp(self):
+        self.calls = []
+        patcher = patch.dict(tasks._registry, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        @tasks.task('record')
+        def record(payloads):
+            self.calls.append(payloads)
+
+    def test_enqueue_waits_for_commit(self):
+        """Test tasks are only created once the transaction commits."""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            tasks.enqueue('record', {'note_id': 1})
+            self.assertFalse(Task.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'record')
+        self.assertEqual(task.payload, {'note_id': 1})
+
+    def test_run_tasks_batches_same_type(self):
+        """Test tasks of the same type are handled in one call."""
+        Task.objects.create(name='record', payload={'id': 1})
+        Task.objects.create(name='record', payload={'id': 2})
+
+        processed = tasks.run_tasks()
+
+        self.assertEqual(processed, 2)
+        self.assertEqual(len(self.calls), 1)
+        self.assertCountEqual(self.calls[0], [{'id': 1}, {'id': 2}])
+        self.assertFalse(Task.objects.exists())
+
+    def test_future_tasks_not_run(self):
+        """Test tasks scheduled in the future are left alone."""
+        Task.objects.create(
+            name='record',
+            run_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        self.assertEqual(tasks.run_tasks(), 0)
+        self.assertEqual(self.calls, [])
+
+    def test_failed_task_retried_with_backoff(self):
+        """Test a failing task is rescheduled with a growing delay."""
+        @tasks.task('broken')
+        def broken(payloads):
+            raise RuntimeError('boom')
+
+        task = Task.objects.create(name='broken')
+        before = timezone.now()
+        tasks.run_tasks()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS_PENDING)
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('boom', task.last_error)
+        self.assertGreaterEqual(
+            task.run_at, before + timedelta(seconds=tasks.retry_delay(1))
+        )
+        self.assertLess(tasks.retry_delay(1), tasks.retry_delay(3))
+
+    def test_failed_batch_retries_failed_payloads(self):
+        """Test only the payloads failing on their own are retried."""
+        @tasks.task('picky')
+        def picky(payloads):
+            if any(payload['id'] == 2 for payload in payloads):
+                raise RuntimeError('boom')
+            self.calls.append(payloads)
+
+        Task.objects.create(name='picky', payload={'id': 1})
+        failing = Task.objects.create(name='picky', payload={'id': 2})
+        Task.objects.create(name='picky', payload={'id': 3})
+
+        tasks.run_tasks()
+
+        self.assertCountEqual(self.calls, [[{'id': 1}], [{'id': 3}]])
+        task = Task.objects.get()
+        self.assertEqual(task.id, failing.id)
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('boom', task.last_error)
+
+    @override_settings(TASK_MAX_ATTEMPTS=1)
+    def test_task_marked_failed_after_max_attempts(self):
+        """Test a task gives up after the maximum attempts."""
+        task = Task.objects.create(name='unknown')
+
+        with self.assertLogs('core.tasks', 'ERROR') as logs:
+            tasks.run_tasks()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS_FAILED)
+        self.assertIn("Task unknown gave up", logs.output[0])
+        self.assertEqual(tasks.run_tasks(), 0)
+
+    def test_clear_failed_tasks_command(self):
+        """Test old failed tasks are deleted and recent ones reported."""
+        old = Task.objects.create(
+            name='record',
+            status=Task.STATUS_FAILED,
+            run_at=timezone.now() - timedelta(days=30),
+        )
+        recent = Task.objects.create(name='record', status=Task.STATUS_FAILED)
+        pending = Task.objects.create(
+            name='record', run_at=timezone.now() - timedelta(days=30),
+        )
+        out = StringIO()
+
+        call_command('clear_failed_tasks', days=7, stdout=out)
+
+        self.assertEqual(
+            sorted(Task.objects.values_list('id', flat=True)),
+            [recent.id, pending.id],
+        )
+        self.assertFalse(Task.objects.filter(id=old.id).exists())
+        self.assertIn('1 failed record tasks kept.', out.getvalue())
+
+    def test_process_tasks_command(self):
+        """Test the worker command drains the queue."""
+        Task.objects.create(name='record', payload={'id': 1})
+
+        with patch('core.tasks.autodiscover'):
+            call_command('process_tasks', once=True)
+
+        self.assertEqual(self.calls, [[{'id': 1}]])
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,109 @@
+"""
+Tests for the API throttles.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+
+
+class SlidingWindowTests(SimpleTestCase):
+    """Test the sliding window counter backends."""
+
+    def check_backend(self, backend):
+        """Run the same scenario against a backend."""
+        # Two requests fit the window, the third has to wait.
+        self.assertIsNone(backend.hit('key', 2, 60, now=600))
+        self.assertIsNone(backend.hit('key', 2, 60, now=610))
+        wait = backend.hit('key', 2, 60, now=620)
+        self.assertAlmostEqual(wait, 70)
+
+        # Halfway into the next window the old requests count half.
+        self.assertIsNone(backend.hit('key', 2, 60, now=690))
+        self.assertIsNotNone(backend.hit('key', 2, 60, now=691))
+
+        # Other keys have their own counters.
+        self.assertIsNone(backend.hit('other', 2, 60, now=620))
+
+        # Two windows later the counts are gone.
+        self.assertIsNone(backend.hit('key', 2, 60, now=800))
+
+    def test_local_backend(self):
+        """Test the in process counters."""
+        self.check_backend(throttling.LocalSlidingWindow())
+
+    def test_cache_backend(self):
+        """Test the shared cache counters."""
+        backend = throttling.CacheSlidingWindow()
+        backend.clear()
+        self.check_backend(backend)
+
+    def test_local_backend_prunes_stale_keys(self):
+        """Test old counters are dropped once the key limit is hit."""
+        backend = throttling.LocalSlidingWindow()
+        backend.max_keys = 2
+        backend.hit('a', 5, 60, now=0)
+        backend.hit('b', 5, 60, now=0)
+        backend.hit('c', 5, 60, now=300)
+
+        self.assertEqual(list(backend._counts), ['c'])
+
+    def test_wait_at_least_one_second(self):
+        """Test the wait is rounded up to whole seconds, at least one."""
+        throttle = throttling.UserSlidingWindowThrottle()
+        waits = []
+        for wait_time in [0, 0.2, 2.1]:
+            throttle.wait_time = wait_time
+            waits.append(throttle.wait())
+
+        self.assertEqual(waits, [1, 1, 3])
+
+
+class ThrottleApiTests(TestCase):
+    """Test throttling of API requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        throttling.get_backend().clear()
+        self.addCleanup(throttling.get_backend().clear)
+
+    def test_read_limit_returns_retry_after(self):
+        """Test exceeding the read rate returns 429 with Retry-After."""
+        url = reverse('note:note-list')
+        rates = {'user_read': '2/min', 'user_write': '100/min'}
+
+        with patch.dict(
+            throttling.api_settings.DEFAULT_THROTTLE_RATES, rates
+        ):
+            responses = [self.client.get(url) for _ in range(3)]
+
+        self.assertEqual(responses[1].status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            responses[2].status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertGreater(int(responses[2]['Retry-After']), 0)
+
+    def test_read_and_write_scopes_separate(self):
+        """Test reads do not use up the write rate."""
+        url = reverse('note:note-list')
+        rates = {'user_read': '1/min', 'user_write': '1/min'}
+
+        with patch.dict(
+            throttling.api_settings.DEFAULT_THROTTLE_RATES, rates
+        ):
+            read = self.client.get(url)
+            write = self.client.post(url, {'title': 'T', 'description': 'D'})
+
+        self.assertEqual(read.status_code, status.HTTP_200_OK)
+        self.assertEqual(write.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,123 @@
+"""
+Tests for the shared views.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.views import lazy_view, schema_digest, schema_file_view
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaViewTests(SimpleTestCase):
+    """Test serving the OpenAPI schema."""
+
+    def test_schema_generated(self):
+        """Test the schema is generated when no file is configured."""
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'openapi:', res.content)
+
+    def write_schema(self, content):
+        handle, path = tempfile.mkstemp(suffix='.yml')
+        with os.fdopen(handle, 'wb') as schema:
+            schema.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def get_schema(self, path, **headers):
+        request = RequestFactory().get(SCHEMA_URL, **headers)
+        with override_settings(API_SCHEMA_FILE=path, API_SCHEMA_MAX_AGE=60):
+            return schema_file_view(request)
+
+    def test_schema_file_served(self):
+        """Test the precomputed schema file is served with cache headers."""
+        path = self.write_schema(b'openapi: 3.0.3\n')
+
+        res = self.get_schema(path)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'openapi: 3.0.3\n')
+        self.assertEqual(res['ETag'], f'"{schema_digest(res.content)}"')
+        self.assertIn('max-age=60', res['Cache-Control'])
+        self.assertIn('public', res['Cache-Control'])
+
+    def test_schema_file_not_modified(self):
+        """Test a matching ETag gets an empty 304 response."""
+        path = self.write_schema(b'openapi: 3.0.3\n')
+        etag = self.get_schema(path)['ETag']
+
+        res = self.get_schema(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_schema_file_reloaded_when_changed(self):
+        """Test a rebuilt schema file is served with a new ETag."""
+        path = self.write_schema(b'openapi: 3.0.3\n')
+        etag = self.get_schema(path)['ETag']
+        with open(path, 'wb') as schema:
+            schema.write(b'openapi: 3.0.3\ninfo: {}\n')
+        os.utime(path, ns=(0, 0))
+
+        res = self.get_schema(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_lazy_view_imports_on_first_request(self):
+        """Test the view class is only imported when first called."""
+        view = lazy_view('drf_spectacular.views.SpectacularAPIView')
+
+        self.assertTrue(view.csrf_exempt)
+        res = view(RequestFactory().get(SCHEMA_URL))
+        self.assertEqual(res.status_code, 200)
+
+    def test_startup_skips_schema_views(self):
+        """Test loading the URLs does not import the schema views."""
+        script = (
+            'import sys, django\n'
+            'django.setup()\n'
+            'from django.urls import get_resolver\n'
+            'get_resolver().url_patterns\n'
+            'print("drf_spectacular.views" in sys.modules)\n'
+        )
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        output = subprocess.check_output(
+            [sys.executable, '-c', script],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+
+        self.assertEqual(output.strip(), b'False')
+
+    def test_production_startup_skips_drf_spectacular(self):
+        """Test production workers never import drf_spectacular."""
+        script = (
+            'import sys, django\n'
+            'django.setup()\n'
+            'from django.urls import get_resolver\n'
+            'for module in ("note.views", "user.views", "ops.views"):\n'
+            '    __import__(module)\n'
+            'get_resolver().url_patterns\n'
+            'print(any(name.startswith("drf_spectacular")'
+            ' for name in sys.modules))\n'
+        )
+        env = dict(os.environ)
+        env['DJANGO_SETTINGS_MODULE'] = 'app.settings_production'
+        output = subprocess.check_output(
+            [sys.executable, '-c', script],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+
+        self.assertEqual(output.strip(), b'False')
@@ -0,0 +1,188 @@
+"""
+Request throttling for the APIs.
+
+Limits use a sliding window counter: the count of the current fixed
+window plus the count of the previous one weighted by how much of it
+still overlaps the sliding window.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+def retry_after(limit, window, elapsed, previous, current):
+    """Return the seconds until one more request fits in the window.
+
+    `previous` and `current` are the counts of the previous and current
+    fixed windows, not including the rejected request.
+    """
+    if current + 1 > limit:
+        wait = window - elapsed + window * (1 - (limit - 1) / max(current, 1))
+    else:
+        wait = window * (1 - (limit - current - 1) / previous) - elapsed
+
+    return max(wait, 0)
+
+
+class LocalSlidingWindow:
+    """Sliding window counters kept in the memory of this process."""
+    max_keys = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def _prune(self, now):
+        """Drop counters whose windows have fully passed."""
+        self._counts = {
+            key: counts for key, counts in self._counts.items()
+            if counts[3] > now
+        }
+
+    def hit(self, key, limit, window, now=None):
+        """Count a request, return None if allowed or the seconds to wait."""
+        now = time.time() if now is None else now
+        index = int(now // window)
+        elapsed = now - index * window
+        expires = (index + 2) * window
+        with self._lock:
+            if len(self._counts) >= self.max_keys:
+                self._prune(now)
+            counts = self._counts.get(key)
+            if counts is None or counts[0] < index - 1:
+                counts = [index, 0, 0, expires]
+            elif counts[0] == index - 1:
+                counts = [index, counts[2], 0, expires]
+            previous, current = counts[1], counts[2]
+
+            if previous * (1 - elapsed / window) + current + 1 > limit:
+                self._counts[key] = counts
+                return retry_after(limit, window, elapsed, previous, current)
+            counts[2] += 1
+            self._counts[key] = counts
+
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class CacheSlidingWindow:
+    """Sliding window counters shared through a Django cache.
+
+    Counting relies on the atomic `incr` of the cache backend. Workers
+    only share the limits when CACHE_BACKEND is a shared cache, the
+    default process cache counts per worker (`core.W001` check).
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def hit(self, key, limit, window, now=None):
+        """Count a request, return None if allowed or the seconds to wait."""
+        now = time.time() if now is None else now
+        index = int(now // window)
+        elapsed = now - index * window
+        current_key = f'throttle:{key}:{index}'
+        previous_key = f'throttle:{key}:{index - 1}'
+
+        self.cache.add(current_key, 0, timeout=math.ceil(window * 2))
+        current = self.cache.incr(current_key)
+        previous = self.cache.get(previous_key, 0)
+
+        if previous * (1 - elapsed / window) + current > limit:
+            self.cache.decr(current_key)
+            return retry_after(limit, window, elapsed, previous, current - 1)
+
+        return None
+
+    def clear(self):
+        self.cache.clear()
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the counter backend configured in THROTTLE_BACKEND."""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.THROTTLE_BACKEND)()
+    return _backend
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Base throttle with separate read and write rates.
+
+    The rate is looked up in DEFAULT_THROTTLE_RATES under
+    `<scope_prefix>_read` or `<scope_prefix>_write`.
+    """
+    scope_prefix = None
+
+    def get_cache_key(self, request, view):
+        """Return the key identifying the client or None to skip."""
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def get_scope(self, request):
+        """Return the rate scope of the request."""
+        kind = 'read' if request.method in SAFE_METHODS else 'write'
+        return f'{self.scope_prefix}_{kind}'
+
+    def get_rate(self, scope):
+        """Return the number of requests and the window in seconds."""
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return None, None
+        num, period = rate.split('/')
+        window = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+
+        return int(num), window
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request)
+        limit, window = self.get_rate(scope)
+        key = self.get_cache_key(request, view)
+        if limit is None or key is None:
+            return True
+
+        self.wait_time = get_backend().hit(f'{scope}:{key}', limit, window)
+        return self.wait_time is None
+
+    def wait(self):
+        # Retry-After is whole seconds, and 0 would invite an instant retry.
+        return max(1, math.ceil(self.wait_time))
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottle):
+    """Throttle authenticated users, and anonymous clients by address."""
+    scope_prefix = 'user'
+
+    def get_scope(self, request):
+        if request.user and request.user.is_authenticated:
+            return super().get_scope(request)
+        return 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'anon:{self.get_ident(request)}'
+
+
+class TokenSlidingWindowThrottle(SlidingWindowThrottle):
+    """Throttle each auth token on its own."""
+    scope_prefix = 'token'
+
+    def get_cache_key(self, request, view):
+        key = getattr(request.auth, 'key', None)
+        if key is None:
+            return None
+        return f'token:{key}'
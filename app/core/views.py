@@ -0,0 +1,162 @@
+"""
+Views shared by the whole project.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control)
+from django.utils.http import quote_etag
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db_routers import (is_pinned,
+                             lookup_shard,
+                             pin_to_primary,
+                             start_replica_reads,
+                             start_shard,
+                             stop_replica_reads,
+                             stop_shard)
+
+SCHEMA_CONTENT_TYPE = 'application/vnd.oai.openapi; charset=utf-8'
+
+_schema_files = {}
+
+
+def lazy_view(path, **initkwargs):
+    """Return a view that imports the class view at `path` on first use.
+
+    Keeps rarely used views, like the schema generator, out of the
+    imports done at startup.
+    """
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    # Class based API views are exempt, the middleware checks the
+    # attribute before the view is loaded.
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+class ShardMoving(APIException):
+    """Raised for writes while the data of the user changes shard."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Your notes are being moved, please retry shortly.')
+    default_code = 'shard_moving'
+
+
+class RequestBodyTooLarge(APIException):
+    """Raised for request bodies over the limit of their endpoint."""
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Request body is too large.')
+    default_code = 'request_body_too_large'
+
+
+class ShardRoutingMixin:
+    """Run the queries of an API view on the shard of the request user."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if len(settings.DATABASE_SHARDS) == 1:
+            return
+
+        alias, moving_to = lookup_shard(request.user.pk)
+        if moving_to and request.method not in SAFE_METHODS:
+            raise ShardMoving()
+        self.shard_token = start_shard(alias)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.shard_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.shard_token is not None:
+                stop_shard(self.shard_token)
+
+
+class ReplicaReadMixin:
+    """Serve the safe `replica_actions` of an API view from a replica.
+
+    Users are pinned to the primary for a while after each write so they
+    read their own writes. Views without actions use the replica for all
+    safe methods.
+    """
+    replica_actions = ['list', 'retrieve']
+
+    def use_replica(self, request):
+        """Return whether the reads of `request` may use a replica."""
+        if request.method not in SAFE_METHODS:
+            return False
+        action = getattr(self, 'action', None)
+        if action is not None and action not in self.replica_actions:
+            return False
+        return not is_pinned(request.user)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request.user)
+        elif self.use_replica(request):
+            self.replica_token = start_replica_reads()
+
+    def dispatch(self, request, *args, **kwargs):
+        self.replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.replica_token is not None:
+                stop_replica_reads(self.replica_token)
+
+
+def schema_digest(content):
+    """Return the hash identifying a rendered schema."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def load_schema_file(path):
+    """Return the content and digest of the schema file at `path`.
+
+    The file is read again only when its modification time changes.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    cached = _schema_files.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as schema_file:
+            content = schema_file.read()
+        cached = (mtime, content, schema_digest(content))
+        _schema_files[path] = cached
+
+    return cached[1], cached[2]
+
+
+def schema_file_view(request):
+    """Serve the OpenAPI schema written at build time.
+
+    Clients revalidate with the ETag, which is the schema digest, and may
+    cache the schema for API_SCHEMA_MAX_AGE seconds.
+    """
+    content, digest = load_schema_file(settings.API_SCHEMA_FILE)
+    etag = quote_etag(digest)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=SCHEMA_CONTENT_TYPE)
+    response['ETag'] = etag
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.API_SCHEMA_MAX_AGE,
+    )
+
+    return response
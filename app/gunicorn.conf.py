@@ -0,0 +1,39 @@
+"""
+Gunicorn settings for the API, read by `gunicorn app.wsgi` run from
+this directory.
+
+The hooks keep the Prometheus worker metrics of PROMETHEUS_MULTIPROC_DIR
+in step with the workers: the directory is emptied before the first
+worker starts, each worker counts itself once forked, and the files of
+exited workers stop counting as live.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(
+    os.environ.get('GUNICORN_WORKERS', (os.cpu_count() or 1) * 2 + 1)
+)
+
+
+def on_starting(server):
+    """Remove the metrics files left by a previous run."""
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory:
+        return
+    for name in os.listdir(directory):
+        if name.endswith('.db'):
+            os.remove(os.path.join(directory, name))
+
+
+def post_fork(server, worker):
+    """Count the new worker, also when the app is preloaded."""
+    from ops.metrics import mark_worker_started
+
+    mark_worker_started()
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of an exited worker."""
+    from ops.metrics import mark_worker_dead
+
+    mark_worker_dead(worker.pid)
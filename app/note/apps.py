@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class NoteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'note'
+
+    def ready(self):
+        from core.models import Link, Tag, names_created
+        from note.autocomplete import names_changed
+
+        for model in (Tag, Link):
+            post_save.connect(names_changed, sender=model)
+            post_delete.connect(names_changed, sender=model)
+            names_created.connect(names_changed, sender=model)
@@ -0,0 +1,110 @@
+"""
+Prefix search over the names of the user's tags and links.
+
+Results are ranked by the number of notes using each item. Recent
+results are kept per user in the memory of the process, and a longer
+prefix is answered from a shorter one when that result was complete,
+so typing a word usually costs one query. The results of a user are
+forgotten whenever one of their items is saved, deleted or created in
+bulk.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count
+
+from ops.metrics import record_cache
+
+
+def search(queryset, field, prefix, limit):
+    """Return the `limit` items of `queryset` starting with `prefix`."""
+    return list(
+        queryset.filter(**{f'{field}__startswith': prefix})
+        .values('id', field)
+        .annotate(uses=Count('note'))
+        .order_by('-uses', field)[:limit]
+    )
+
+
+class PrefixCache:
+    """Recent prefix search results per user, kept in process memory."""
+    max_users = 1000
+    max_prefixes = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key, prefix, limit, field):
+        """Return the cached result for `prefix` or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                return None
+            results = entry[1]
+            for end in range(len(prefix), -1, -1):
+                cached = results.get((prefix[:end], limit))
+                if cached is None:
+                    continue
+                items, complete = cached
+                if end == len(prefix):
+                    return items
+                if complete:
+                    return [
+                        item for item in items
+                        if item[field].startswith(prefix)
+                    ]
+
+        return None
+
+    def set(self, key, prefix, limit, items):
+        """Store the result for `prefix`."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if len(self._entries) >= self.max_users:
+                    self._entries = {
+                        k: v for k, v in self._entries.items() if v[0] > now
+                    }
+                entry = (now + settings.AUTOCOMPLETE_CACHE_SECONDS, {})
+                self._entries[key] = entry
+            if len(entry[1]) < self.max_prefixes:
+                entry[1][(prefix, limit)] = (items, len(items) < limit)
+
+    def invalidate(self, key):
+        """Forget the results of `key`."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+prefix_cache = PrefixCache()
+
+
+def names_changed(sender, instance=None, user_id=None, **kwargs):
+    """Forget the cached results of the user owning the changed items.
+
+    Connected to post_save, post_delete and names_created of the models
+    offering autocomplete.
+    """
+    if instance is not None:
+        user_id = instance.user_id
+    prefix_cache.invalidate((sender._meta.label_lower, user_id))
+
+
+def autocomplete(queryset, user, field, prefix, limit):
+    """Return the items of `user` starting with `prefix`, cached."""
+    key = (queryset.model._meta.label_lower, user.pk)
+    items = prefix_cache.get(key, prefix, limit, field)
+    record_cache('autocomplete', items is not None)
+    if items is None:
+        items = search(queryset.filter(user=user), field, prefix, limit)
+        prefix_cache.set(key, prefix, limit, items)
+
+    return items
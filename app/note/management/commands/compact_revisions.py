@@ -0,0 +1,59 @@
+"""
+Django command to drop old note revisions.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.db_routers import use_shard
+from core.models import NoteRevision
+from note.revisions import compact_revisions
+
+
+class Command(BaseCommand):
+    """Django command to apply the revision retention policy."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=settings.NOTE_REVISION_KEEP,
+            help='Number of most recent revisions kept per note.',
+        )
+        parser.add_argument(
+            '--days', type=int,
+            help='Also drop revisions older than this many days.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        keep = options['keep']
+        if keep < 1:
+            raise CommandError('--keep must be at least 1.')
+        since = None
+        condition = Q(revision_count__gt=keep)
+        if options['days'] is not None:
+            since = timezone.now() - timedelta(days=options['days'])
+            condition |= Q(oldest_revision__lt=since)
+
+        deleted = 0
+        for alias in settings.DATABASE_SHARDS:
+            with use_shard(alias):
+                note_ids = (
+                    NoteRevision.objects.values('note_id')
+                    .annotate(
+                        revision_count=Count('id'),
+                        oldest_revision=Min('created_at'),
+                    )
+                    .filter(condition)
+                    .values_list('note_id', flat=True)
+                )
+                for note_id in list(note_ids):
+                    with transaction.atomic(using=alias):
+                        deleted += compact_revisions(note_id, keep, since)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} old revisions.')
+        )
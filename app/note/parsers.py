@@ -0,0 +1,102 @@
+"""
+Parsers for the note APIs.
+"""
+import ijson
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.views import RequestBodyTooLarge
+
+
+class LimitedReader:
+    """Read a stream, ending it once more than `limit` bytes were read."""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.size = 0
+
+    @property
+    def exceeded(self):
+        return self.size > self.limit
+
+    def read(self, size=-1):
+        if self.exceeded:
+            return b''
+        data = self.stream.read(size)
+        self.size += len(data)
+        if self.exceeded:
+            return b''
+
+        return data
+
+
+def build(events, max_items):
+    """Return the value described by ijson basic parse `events`.
+
+    Arrays with more than `max_items` items are rejected as soon as the
+    item past the limit is read.
+    """
+    stack = []
+    root = empty = object()
+    for event, value in events:
+        if event == 'map_key':
+            stack[-1][1] = value
+            continue
+        if event == 'start_map':
+            stack.append([{}, None])
+            continue
+        if event == 'start_array':
+            stack.append([[], None])
+            continue
+        if event in ('end_map', 'end_array'):
+            value = stack.pop()[0]
+        if not stack:
+            root = value
+            continue
+
+        container, key = stack[-1]
+        if isinstance(container, list):
+            if len(container) >= max_items:
+                raise ParseError(
+                    f'JSON parse error - more than {max_items} items.'
+                )
+            container.append(value)
+        else:
+            container[key] = value
+
+    if root is empty:
+        raise ParseError('JSON parse error - empty body.')
+
+    return root
+
+
+class StreamingJSONParser(JSONParser):
+    """Parse JSON request bodies while they are read.
+
+    The body is never held in memory as a whole. Bodies over the size
+    limit of the endpoint and arrays with more than
+    STREAMING_JSON_MAX_ITEMS items are rejected as soon as they are
+    seen.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        limit = getattr(
+            request, 'body_size_limit', settings.REQUEST_BODY_MAX_SIZE
+        )
+        reader = LimitedReader(stream, limit)
+        events = ijson.basic_parse(reader, use_float=True)
+        try:
+            return build(events, settings.STREAMING_JSON_MAX_ITEMS)
+        except ijson.JSONError as exc:
+            if reader.exceeded:
+                raise RequestBodyTooLarge()
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MergePatchParser(StreamingJSONParser):
+    """Parse JSON Merge Patch (RFC 7396) request bodies."""
+    media_type = 'application/merge-patch+json'
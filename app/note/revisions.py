@@ -0,0 +1,118 @@
+"""
+Revision history for notes.
+
+Each revision stores the tracked fields either as a full snapshot or as
+patches against the previous revision. A snapshot is written at least
+every NOTE_REVISION_SNAPSHOT_INTERVAL revisions, so rebuilding any
+version applies fewer deltas than that.
+
+Once the version passes NOTE_REVISION_KEEP, each new snapshot after the
+first queues a background task dropping the revisions of the note past
+the most recent NOTE_REVISION_KEEP ones. Versions only bound the number
+of revisions, edits of the relations bump them without a revision.
+"""
+from django.conf import settings
+
+from core.db_routers import current_shard
+from core.models import NoteRevision
+from core.tasks import enqueue
+from note.textdiff import apply_patch, make_patch
+
+TRACKED_FIELDS = ['title', 'description', 'notation']
+
+
+def snapshot(note):
+    """Return the tracked fields of `note`."""
+    return {field: getattr(note, field) for field in TRACKED_FIELDS}
+
+
+def record_revision(note, previous=None, patches=None):
+    """Store the current state of `note` as a new revision.
+
+    `previous` holds the tracked fields before the edit. `patches` may
+    provide ready made patches per field instead of diffing them.
+    """
+    last = None
+    if previous is not None:
+        last = note.revisions.only('depth').order_by('-version').first()
+
+    interval = settings.NOTE_REVISION_SNAPSHOT_INTERVAL
+    if last is None or last.depth + 1 >= interval:
+        if last is not None and \
+                note.version > settings.NOTE_REVISION_KEEP:
+            alias = current_shard()
+            enqueue(
+                'note.compact_revisions',
+                {'note_id': note.id, 'shard': alias},
+                using=alias,
+            )
+        return NoteRevision.objects.create(
+            note=note,
+            version=note.version,
+            data=snapshot(note),
+        )
+
+    patches = dict(patches or {})
+    for field in TRACKED_FIELDS:
+        old, new = previous[field], getattr(note, field)
+        if field not in patches and old != new:
+            patches[field] = make_patch(old, new)
+
+    return NoteRevision.objects.create(
+        note=note,
+        version=note.version,
+        depth=last.depth + 1,
+        data=patches,
+    )
+
+
+def rebuild(revision):
+    """Return the tracked fields as they were at `revision`."""
+    if revision.is_snapshot:
+        return dict(revision.data)
+
+    base = revision.note.revisions.filter(
+        version__lt=revision.version,
+        depth=0,
+    ).order_by('-version').first()
+    deltas = revision.note.revisions.filter(
+        version__gt=base.version,
+        version__lte=revision.version,
+    ).order_by('version')
+
+    fields = dict(base.data)
+    for delta in deltas:
+        for field, patch in delta.data.items():
+            fields[field] = apply_patch(fields[field], patch)
+
+    return fields
+
+
+def compact_revisions(note_id, keep, since=None):
+    """Drop the revisions of a note before its `keep` most recent ones.
+
+    With `since`, revisions created before it are dropped too. The oldest
+    revision left becomes a snapshot. Return how many were dropped.
+    """
+    revisions = list(
+        NoteRevision.objects.filter(note_id=note_id)
+        .order_by('-version')
+        .defer('data')
+    )
+    kept = revisions[:keep]
+    if since is not None:
+        kept = [rev for rev in kept if rev.created_at >= since]
+    if len(kept) == len(revisions):
+        return 0
+    oldest = (kept or revisions[:1])[-1]
+
+    if not oldest.is_snapshot:
+        oldest.data = rebuild(oldest)
+        oldest.depth = 0
+        oldest.save(update_fields=['data', 'depth'])
+    deleted, _ = NoteRevision.objects.filter(
+        note_id=note_id,
+        version__lt=oldest.version,
+    ).delete()
+
+    return deleted
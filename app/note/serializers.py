@@ -1,9 +1,16 @@
 """
 Serializers for recipe APIs
 """
+from django.conf import settings
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
 
-from core.models import Note, Tag, Todo, Link
+from core.links import canonical_url, url_hash
+from core.models import Note, NoteRevision, Tag, Todo, Link
+from note.revisions import TRACKED_FIELDS, record_revision, snapshot
+from note.textdiff import check_patch
+from note.unitofwork import UnitOfWork
 
 
 class TodoSerializer(serializers.ModelSerializer):
@@ -32,6 +39,42 @@ class LinkSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
         read_only_fields = ['id']
 
+    def validate_name(self, value):
+        """Reject renaming a link to another link of the user."""
+        if self.instance is None:
+            return value
+        links = Link.objects.filter(
+            user=self.instance.user_id,
+            url_hash=url_hash(canonical_url(value)),
+        ).exclude(id=self.instance.id)
+        if links.exists():
+            raise serializers.ValidationError(_('Link already exists.'))
+
+        return value
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Serializer for the query of a prefix search."""
+    q = serializers.CharField(
+        required=False,
+        default='',
+        allow_blank=True,
+        trim_whitespace=False,
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        default=settings.AUTOCOMPLETE_LIMIT,
+        min_value=1,
+        max_value=settings.AUTOCOMPLETE_MAX_LIMIT,
+    )
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    """Serializer for a prefix search match."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    uses = serializers.IntegerField()
+
 
 class NoteSerializer(serializers.ModelSerializer):
     """Serializer for notes."""
@@ -39,77 +82,105 @@ class NoteSerializer(serializers.ModelSerializer):
     todos = TodoSerializer(many=True, required=False)
     links = LinkSerializer(many=True, required=False)
 
+    related_fields = {
+        'tags': (Tag, 'name'),
+        'todos': (Todo, 'title'),
+        'links': (Link, 'name'),
+    }
+
     class Meta:
         model = Note
         fields = [
-            'id', 'title', 'ref', 'created_at', 'edited_at',
+            'id', 'title', 'ref', 'created_at', 'edited_at', 'version',
             'description', 'notation', 'tags', 'todos', 'links'
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'version']
 
-    def _get_or_create_tags(self, tags, note):
-        """Handle gettin or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            note.tags.add(tag_obj)
-
-    def _get_or_create_todos(self, todos, note):
-        """Handle creating todos as needed. """
-        auth_user = self.context['request'].user
-        for todo in todos:
-            todo_obj, created = Todo.objects.get_or_create(
-                user=auth_user,
-                **todo,
-            )
-            note.todos.add(todo_obj)
-
-    def _create_links(self, links, note):
-        auth_user = self.context['request'].user
-        for link in links:
-            link_obj, created = Link.objects.get_or_create(
-                user=auth_user,
-                **link,
+    @property
+    def unit_of_work(self):
+        """Return the unit of work of the request."""
+        return UnitOfWork.for_request(self.context['request'])
+
+    def save(self, **kwargs):
+        """Save the note and insert its new relation rows."""
+        note = super().save(**kwargs)
+        self.unit_of_work.flush()
+
+        return note
+
+    def _set_related(self, note, name, items, created=False):
+        """Point a note relation at `items`, writing only what changed.
+
+        New relation rows are queued on the unit of work. Return whether
+        the relation was modified.
+        """
+        model, field = self.related_fields[name]
+        unit = self.unit_of_work
+        objs = unit.resolve(model, field, [item[field] for item in items])
+        manager = getattr(note, name)
+        through = manager.through
+        note_field = f'{manager.source_field_name}_id'
+        item_field = f'{manager.target_field_name}_id'
+
+        current = set()
+        if not created:
+            current = set(
+                through.objects.filter(**{note_field: note.id})
+                .values_list(item_field, flat=True)
             )
-            note.links.add(link_obj)
+        wanted = {obj.id for obj in objs.values()}
+
+        stale = current - wanted
+        if stale:
+            through.objects.filter(**{
+                note_field: note.id,
+                f'{item_field}__in': stale,
+            }).delete()
+        new = wanted - current
+        unit.add(through, [
+            through(**{note_field: note.id, item_field: item_id})
+            for item_id in new
+        ])
+
+        return bool(stale or new)
 
     def create(self, validated_data):
         """Create a note."""
-        tags = validated_data.pop('tags', [])
-        todos = validated_data.pop('todos', [])
-        links = validated_data.pop('links', [])
+        related = {
+            name: validated_data.pop(name, [])
+            for name in self.related_fields
+        }
         note = Note.objects.create(**validated_data)
-        self._get_or_create_tags(tags, note)
-        self._get_or_create_todos(todos, note)
-        self._create_links(links, note)
+        for name, items in related.items():
+            self._set_related(note, name, items, created=True)
+        record_revision(note)
 
         return note
 
     def update(self, instance, validated_data):
         """Update recipe."""
-        tags = validated_data.pop('tags', None)
-        todos = validated_data.pop('todos', None)
-        links = validated_data.pop('links', None)
-
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
-
-        if todos is not None:
-            instance.todos.clear()
-            self._get_or_create_todos(todos, instance)
-
-        if links is not None:
-            instance.links.clear()
-            self._create_links(links, instance)
+        related = {
+            name: validated_data.pop(name, None)
+            for name in self.related_fields
+        }
+        related_changed = False
+        for name, items in related.items():
+            if items is not None:
+                related_changed |= self._set_related(instance, name, items)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        changed = [
+            attr for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        previous = snapshot(instance)
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
 
-        instance.save()
+        if changed or related_changed:
+            instance.version += 1
+            instance.save(update_fields=changed + ['edited_at', 'version'])
+        if set(changed) & set(TRACKED_FIELDS):
+            record_revision(instance, previous)
         return instance
 
 
@@ -117,6 +188,97 @@ class NoteDetailSerializer(NoteSerializer):
     """Serializer for note detail view."""
 
     class Meta(NoteSerializer.Meta):
-        fields = NoteSerializer.Meta.fields + [
-            'description', 'notation', 'todos'
+        fields = NoteSerializer.Meta.fields
+
+
+class NoteBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for deleting many notes at once."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+    )
+
+    def validate(self, attrs):
+        """Require at least one way of selecting notes."""
+        if not attrs.get('ids') and not attrs.get('tags'):
+            msg = _('Provide note ids or tags to select notes.')
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+
+class NoteBulkTagSerializer(serializers.Serializer):
+    """Serializer for adding and removing tags on many notes."""
+    ids = serializers.ListField(child=serializers.IntegerField())
+    add = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+    )
+    remove = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+    )
+
+    def validate(self, attrs):
+        """Require at least one tag change."""
+        if not attrs.get('add') and not attrs.get('remove'):
+            msg = _('Provide tags to add or remove.')
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+
+class NotationEditSerializer(serializers.Serializer):
+    """Serializer for a single edit of a notation patch."""
+    start = serializers.IntegerField(min_value=0)
+    end = serializers.IntegerField(min_value=0)
+    text = serializers.CharField(
+        allow_blank=True,
+        trim_whitespace=False,
+        default='',
+    )
+
+
+class NotationPatchSerializer(serializers.Serializer):
+    """Serializer for patching a notation against a known version."""
+    base_version = serializers.IntegerField(min_value=1)
+    edits = NotationEditSerializer(many=True)
+
+    def validate_edits(self, value):
+        """Check the edits are ordered and do not overlap."""
+        try:
+            check_patch(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+        return value
+
+
+class NoteRevisionSerializer(serializers.ModelSerializer):
+    """Serializer for note revisions."""
+    is_snapshot = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = NoteRevision
+        fields = ['version', 'created_at', 'is_snapshot']
+        read_only_fields = fields
+
+
+class NoteRevisionDetailSerializer(NoteRevisionSerializer):
+    """Serializer for the note content at a revision."""
+    title = serializers.CharField(source='fields.title', read_only=True)
+    description = serializers.CharField(
+        source='fields.description',
+        read_only=True,
+    )
+    notation = serializers.CharField(source='fields.notation', read_only=True)
+
+    class Meta(NoteRevisionSerializer.Meta):
+        fields = NoteRevisionSerializer.Meta.fields + [
+            'title', 'description', 'notation'
         ]
+        read_only_fields = fields
@@ -0,0 +1,23 @@
+"""
+Background tasks of the note app.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from core.db_routers import use_shard
+from core.tasks import task
+from note.revisions import compact_revisions
+
+
+@task('note.compact_revisions')
+def compact_note_revisions(payloads):
+    """Apply the revision retention policy to recently edited notes."""
+    notes = {}
+    for payload in payloads:
+        notes.setdefault(payload['shard'], set()).add(payload['note_id'])
+
+    for alias, note_ids in notes.items():
+        with use_shard(alias):
+            for note_id in sorted(note_ids):
+                with transaction.atomic(using=alias):
+                    compact_revisions(note_id, settings.NOTE_REVISION_KEEP)
@@ -8,10 +8,13 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from note.autocomplete import prefix_cache
 from note.serializers import LinkSerializer
-from core.models import Link
+from core.models import Link, Note
 
 LINKS_URL = reverse('note:link-list')
+AUTOCOMPLETE_URL = reverse('note:link-autocomplete')
+NOTES_URL = reverse('note:note-list')
 
 
 def detail_url(link_id):
@@ -44,6 +47,7 @@ class PrivateLinksApiTests(TestCase):
     """Test authenticated API request."""
 
     def setUp(self):
+        prefix_cache.clear()
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -88,6 +92,17 @@ class PrivateLinksApiTests(TestCase):
         link.refresh_from_db()
         self.assertEqual(link.name, payload['name'])
 
+    def test_update_link_to_existing_rejected(self):
+        """Test renaming a link to another link of the user fails."""
+        Link.objects.create(user=self.user, name='https://doc.com/a')
+        link = Link.objects.create(user=self.user, name='https://doc.com/b')
+
+        res = self.client.patch(
+            detail_url(link.id), {'name': 'HTTPS://DOC.COM/a'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_delete_link(self):
         """Test deleting a link."""
         link = Link.objects.create(user=self.user, name='https://some.com')
@@ -98,3 +113,37 @@ class PrivateLinksApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         links = Link.objects.filter(user=self.user)
         self.assertFalse(links.exists())
+
+    def test_autocomplete_links(self):
+        """Test autocomplete returns links starting with the prefix."""
+        docs = Link.objects.create(user=self.user, name='https://docs.com')
+        Link.objects.create(user=self.user, name='https://dev.to')
+        Link.objects.create(user=self.user, name='https://web.dev')
+        note = Note.objects.create(
+            title='Reading', description='Links', user=self.user,
+        )
+        note.links.add(docs)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'https://d'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(link['name'], link['uses']) for link in res.data],
+            [('https://docs.com', 1), ('https://dev.to', 0)],
+        )
+
+    def test_autocomplete_cache_cleared_on_create(self):
+        """Test links created with a note clear the cached results."""
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'https://d'})
+        payload = {
+            'title': 'Reading',
+            'description': 'Links',
+            'links': [{'name': 'https://docs.com'}],
+        }
+        self.client.post(NOTES_URL, payload, format='json')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'https://d'})
+
+        self.assertEqual(
+            [link['name'] for link in res.data], ['https://docs.com'],
+        )
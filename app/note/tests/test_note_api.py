@@ -1,19 +1,28 @@
 """
 test for note APIs.
 """
+import json
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from core.models import Tag, Note, Todo, Link
+from core.models import Tag, Note, NoteRevision, Todo, Link
 
+from note.views import NoteViewSet
 from note.serializers import (NoteSerializer,
                               NoteDetailSerializer)
 
 NOTES_URL = reverse('note:note-list')
+BULK_DELETE_URL = reverse('note:note-bulk-delete')
+BULK_TAGS_URL = reverse('note:note-bulk-tags')
 
 
 def detail_url(note_id):
@@ -21,6 +30,20 @@ def detail_url(note_id):
     return reverse('note:note-detail', args=[note_id])
 
 
+def notation_url(note_id):
+    """Create and return a notation patch URL."""
+    return reverse('note:note-notation', args=[note_id])
+
+
+def merge_patch(client, url, payload):
+    """Send a JSON merge patch request."""
+    return client.patch(
+        url,
+        json.dumps(payload),
+        content_type='application/merge-patch+json',
+    )
+
+
 def create_note(user, **params):
     """Create and return a sample note."""
     defaults = {
@@ -409,6 +432,31 @@ class PrivateNoteApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_note_with_equivalent_refs(self):
+        """Test equivalent urls share one canonical link."""
+        existing = Link.objects.create(
+            user=self.user, name='https://example.com/docs'
+        )
+        payload = {
+            'title': 'Note',
+            'description': 'Something',
+            'links': [
+                {'name': 'HTTPS://Example.com:443/docs'},
+                {'name': 'https://example.com/docs#intro'},
+                {'name': 'https://example.com/'},
+            ]
+        }
+        res = self.client.post(NOTES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        note = Note.objects.get(id=res.data['id'])
+        self.assertEqual(
+            sorted(note.links.values_list('name', flat=True)),
+            ['https://example.com', 'https://example.com/docs'],
+        )
+        self.assertIn(existing, note.links.all())
+        self.assertEqual(Link.objects.filter(user=self.user).count(), 2)
+
     def test_create_ref_on_update(self):
         """Test creating an ref when updating a note."""
         note = create_note(user=self.user)
@@ -437,3 +485,379 @@ class PrivateNoteApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(note.links.count(), 0)
+
+    def test_bulk_delete_by_ids(self):
+        """Test deleting several notes by id."""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        note1 = create_note(user=self.user)
+        note2 = create_note(user=self.user)
+        note3 = create_note(user=self.user)
+        note1.tags.add(tag)
+        NoteRevision.objects.create(note=note1, version=1, data={})
+
+        payload = {'ids': [note1.id, note2.id]}
+        res = self.client.post(BULK_DELETE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        notes = Note.objects.filter(user=self.user)
+        self.assertEqual(list(notes), [note3])
+        self.assertTrue(Tag.objects.filter(id=tag.id).exists())
+        self.assertFalse(Note.tags.through.objects.exists())
+        self.assertFalse(NoteRevision.objects.exists())
+
+    def test_bulk_delete_by_tags(self):
+        """Test deleting the notes with a given tag."""
+        tag = Tag.objects.create(user=self.user, name='Draft')
+        note1 = create_note(user=self.user)
+        note2 = create_note(user=self.user)
+        note1.tags.add(tag)
+
+        payload = {'tags': [tag.id]}
+        res = self.client.post(BULK_DELETE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(Note.objects.filter(id=note1.id).exists())
+        self.assertTrue(Note.objects.filter(id=note2.id).exists())
+
+    def test_bulk_delete_limited_to_user(self):
+        """Test bulk delete ignores other users notes."""
+        other_user = create_user(email='other@example.com', password='test123')
+        note = create_note(user=other_user)
+
+        payload = {'ids': [note.id]}
+        res = self.client.post(BULK_DELETE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 0)
+        self.assertTrue(Note.objects.filter(id=note.id).exists())
+
+    def test_bulk_delete_requires_selection(self):
+        """Test bulk delete without ids or tags returns an error."""
+        create_note(user=self.user)
+
+        res = self.client.post(BULK_DELETE_URL, {}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_bulk_delete_constant_queries(self):
+        """Test bulk delete query count does not grow with the notes."""
+        def count_queries(notes):
+            payload = {'ids': [note.id for note in notes]}
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(BULK_DELETE_URL, payload, format='json')
+            return len(ctx)
+
+        few = count_queries([create_note(user=self.user) for _ in range(2)])
+        many = count_queries([create_note(user=self.user) for _ in range(8)])
+
+        self.assertEqual(few, many)
+
+    def test_bulk_tags_add_and_remove(self):
+        """Test adding and removing tags across notes."""
+        tag_old = Tag.objects.create(user=self.user, name='Old')
+        tag_new = Tag.objects.create(user=self.user, name='New')
+        note1 = create_note(user=self.user)
+        note2 = create_note(user=self.user)
+        note1.tags.add(tag_old, tag_new)
+
+        payload = {
+            'ids': [note1.id, note2.id],
+            'add': ['New', 'Fresh'],
+            'remove': ['Old'],
+        }
+        res = self.client.post(BULK_TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 2)
+        tag_fresh = Tag.objects.get(user=self.user, name='Fresh')
+        for note in (note1, note2):
+            self.assertCountEqual(note.tags.all(), [tag_new, tag_fresh])
+
+    def test_bulk_tags_limited_to_user(self):
+        """Test bulk tagging ignores other users notes."""
+        other_user = create_user(email='other@example.com', password='test123')
+        note = create_note(user=other_user)
+
+        payload = {'ids': [note.id], 'add': ['Mine']}
+        res = self.client.post(BULK_TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 0)
+        self.assertEqual(note.tags.count(), 0)
+
+    def test_update_unchanged_tags_writes_nothing(self):
+        """Test resending the same relations does not touch them."""
+        note = create_note(user=self.user)
+        note.tags.add(Tag.objects.create(user=self.user, name='Same'))
+        note.todos.add(Todo.objects.create(user=self.user, title='Task'))
+        note.links.add(Link.objects.create(user=self.user, name='Ref'))
+
+        payload = {
+            'tags': [{'name': 'Same'}],
+            'todos': [{'title': 'Task'}],
+            'links': [{'name': 'Ref'}],
+        }
+        url = detail_url(note.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_create_repeated_names_resolved_once(self):
+        """Test repeated names are looked up once and linked in batch."""
+        payload = {
+            'title': 'Note',
+            'description': 'Something',
+            'tags': [{'name': 'Dinner'}, {'name': 'Dinner'}],
+            'todos': [{'title': 'Cook'}, {'title': 'Cook'}],
+            'links': [{'name': 'https://a.com'}, {'name': 'HTTPS://A.COM/'}],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(NOTES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        note = Note.objects.get(id=res.data['id'])
+        self.assertEqual(note.tags.count(), 1)
+        self.assertEqual(note.todos.count(), 1)
+        self.assertEqual(note.links.count(), 1)
+        tables = ['core_note_tags', 'core_note_todos', 'core_note_links']
+        for table in tables:
+            inserts = [
+                query['sql'] for query in ctx.captured_queries
+                if query['sql'].startswith('INSERT')
+                and f'INTO "{table}"' in query['sql']
+            ]
+            self.assertEqual(len(inserts), 1)
+
+    def test_update_changed_tag_writes_only_difference(self):
+        """Test swapping one tag issues one delete and one insert."""
+        tag_keep = Tag.objects.create(user=self.user, name='Keep')
+        tag_drop = Tag.objects.create(user=self.user, name='Drop')
+        note = create_note(user=self.user)
+        note.tags.add(tag_keep, tag_drop)
+
+        payload = {'tags': [{'name': 'Keep'}, {'name': 'Add'}]}
+        url = detail_url(note.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        through_writes = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+            and 'core_note_tags' in query['sql']
+        ]
+        self.assertEqual(len(through_writes), 2)
+        tag_add = Tag.objects.get(user=self.user, name='Add')
+        self.assertCountEqual(note.tags.all(), [tag_keep, tag_add])
+
+    def test_update_saves_only_changed_fields(self):
+        """Test a partial update only writes the changed columns."""
+        note = create_note(user=self.user, title='Old', notation='Body')
+
+        payload = {'title': 'New', 'notation': 'Body'}
+        url = detail_url(note.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        updates = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertNotIn('"notation"', updates[0])
+
+    def test_update_without_changes_skips_save(self):
+        """Test an update that changes nothing does not write."""
+        note = create_note(user=self.user)
+
+        payload = {'title': note.title}
+        url = detail_url(note.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        updates = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(updates, [])
+
+    def test_merge_patch_adds_and_removes_tags(self):
+        """Test a merge patch edits single tags without the full list."""
+        tag_keep = Tag.objects.create(user=self.user, name='Keep')
+        tag_drop = Tag.objects.create(user=self.user, name='Drop')
+        note = create_note(user=self.user)
+        note.tags.add(tag_keep, tag_drop)
+
+        payload = {'title': 'Merged', 'tags': {'Drop': None, 'New': {}}}
+        res = merge_patch(self.client, detail_url(note.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        note.refresh_from_db()
+        self.assertEqual(note.title, 'Merged')
+        tag_new = Tag.objects.get(user=self.user, name='New')
+        self.assertCountEqual(note.tags.all(), [tag_keep, tag_new])
+
+    def test_merge_patch_removes_link_by_any_spelling(self):
+        """Test merge patch link names are compared in canonical form."""
+        link = Link.objects.create(user=self.user, name='http://example.com')
+        note = create_note(user=self.user)
+        note.links.add(link)
+
+        payload = {'links': {'HTTP://Example.com/': None}}
+        res = merge_patch(self.client, detail_url(note.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(note.links.count(), 0)
+
+    def test_merge_patch_null_clears_field(self):
+        """Test null removes optional values in a merge patch."""
+        todo = Todo.objects.create(user=self.user, title='Task')
+        note = create_note(user=self.user, ref='http://example.com')
+        note.todos.add(todo)
+
+        payload = {'ref': None, 'todos': None}
+        res = merge_patch(self.client, detail_url(note.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        note.refresh_from_db()
+        self.assertEqual(note.ref, '')
+        self.assertEqual(note.todos.count(), 0)
+
+    def test_merge_patch_requires_object(self):
+        """Test a merge patch body that is not an object is rejected."""
+        note = create_note(user=self.user)
+
+        res = merge_patch(self.client, detail_url(note.id), ['title'])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_increments_version(self):
+        """Test changing a note bumps its version."""
+        note = create_note(user=self.user)
+
+        url = detail_url(note.id)
+        res = self.client.patch(url, {'title': 'Changed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['version'], 2)
+
+    def test_patch_notation(self):
+        """Test applying text edits to a notation."""
+        note = create_note(user=self.user, notation='Hello world')
+
+        payload = {
+            'base_version': 1,
+            'edits': [
+                {'start': 0, 'end': 5, 'text': 'Goodbye'},
+                {'start': 11, 'end': 11, 'text': '!'},
+            ],
+        }
+        res = self.client.patch(notation_url(note.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['version'], 2)
+        note.refresh_from_db()
+        self.assertEqual(note.notation, 'Goodbye world!')
+        self.assertEqual(note.version, 2)
+
+    def test_patch_notation_stale_version(self):
+        """Test patching against an old version is rejected."""
+        note = create_note(user=self.user, notation='Text', version=3)
+
+        payload = {
+            'base_version': 2,
+            'edits': [{'start': 0, 'end': 4, 'text': 'Lost'}],
+        }
+        res = self.client.patch(notation_url(note.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['version'], 3)
+        note.refresh_from_db()
+        self.assertEqual(note.notation, 'Text')
+
+    def test_patch_notation_invalid_edits(self):
+        """Test overlapping or out of range edits are rejected."""
+        note = create_note(user=self.user, notation='Short')
+        bad_edits = [
+            [{'start': 2, 'end': 4}, {'start': 3, 'end': 5}],
+            [{'start': 4, 'end': 2}],
+            [{'start': 0, 'end': 50, 'text': 'x'}],
+        ]
+
+        for edits in bad_edits:
+            payload = {'base_version': 1, 'edits': edits}
+            res = self.client.patch(
+                notation_url(note.id), payload, format='json'
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        note.refresh_from_db()
+        self.assertEqual(note.notation, 'Short')
+
+    def test_patch_other_users_notation(self):
+        """Test patching another users notation returns not found."""
+        other_user = create_user(email='other@example.com', password='test123')
+        note = create_note(user=other_user, notation='Private')
+
+        payload = {'base_version': 1, 'edits': []}
+        res = self.client.patch(notation_url(note.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_returns_notation(self):
+        """Test the note list returns compressed notations in full."""
+        notation = 'Long body ' * 500
+        create_note(user=self.user, notation=notation)
+
+        res = self.client.get(NOTES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['notation'], notation)
+
+    @override_settings(REQUEST_BODY_LIMITS={'note:note-list': 100})
+    def test_create_note_body_too_large(self):
+        """Test bodies over the endpoint limit are rejected."""
+        payload = {'title': 'Note', 'description': 'x' * 200}
+
+        res = self.client.post(NOTES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, 413)
+        self.assertFalse(Note.objects.exists())
+
+    @override_settings(STREAMING_JSON_MAX_ITEMS=2)
+    def test_bulk_delete_too_many_ids(self):
+        """Test bulk requests with too many items are rejected."""
+        res = self.client.post(
+            BULK_DELETE_URL, {'ids': [1, 2, 3]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_keeps_concurrent_version_bump(self):
+        """Test an update after a concurrent edit bumps the new version."""
+        note = create_note(user=self.user)
+        get_object = NoteViewSet.get_object
+
+        def stale_get_object(view):
+            obj = get_object(view)
+            Note.objects.filter(id=obj.id).update(version=F('version') + 1)
+            return obj
+
+        with patch.object(NoteViewSet, 'get_object', stale_get_object):
+            res = self.client.patch(detail_url(note.id), {'title': 'New'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        note.refresh_from_db()
+        self.assertEqual(note.version, 3)
+        self.assertEqual(res.data['version'], 3)
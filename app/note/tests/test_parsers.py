@@ -0,0 +1,67 @@
+"""
+Tests for the note parsers.
+"""
+import io
+
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework.exceptions import ParseError
+
+from core.views import RequestBodyTooLarge
+from note.parsers import StreamingJSONParser
+
+
+def parse(body, limit=None):
+    """Parse `body` with the streaming parser."""
+    context = {}
+    if limit is not None:
+        context['request'] = type('Request', (), {'body_size_limit': limit})
+    return StreamingJSONParser().parse(
+        io.BytesIO(body), parser_context=context,
+    )
+
+
+class StreamingJSONParserTests(SimpleTestCase):
+    """Test parsing JSON while reading it."""
+
+    def test_parse_nested(self):
+        """Test documents are rebuilt with their types."""
+        body = (
+            b'{"title": "Note", "tags": [{"name": "a"}, {"name": "b"}], '
+            b'"version": 2, "ratio": 0.5, "ref": null, "done": false}'
+        )
+
+        self.assertEqual(parse(body), {
+            'title': 'Note',
+            'tags': [{'name': 'a'}, {'name': 'b'}],
+            'version': 2,
+            'ratio': 0.5,
+            'ref': None,
+            'done': False,
+        })
+
+    def test_parse_scalar_and_empty_containers(self):
+        """Test top level scalars and empty containers are parsed."""
+        self.assertEqual(parse(b'"text"'), 'text')
+        self.assertEqual(parse(b'{"a": [], "b": {}}'), {'a': [], 'b': {}})
+
+    def test_invalid_json(self):
+        """Test malformed and trailing content is rejected."""
+        for body in [b'{"a": ', b'{"a": 1} {"b": 2}', b'']:
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                parse(body)
+
+    @override_settings(STREAMING_JSON_MAX_ITEMS=3)
+    def test_too_many_items(self):
+        """Test arrays over the item limit are rejected."""
+        self.assertEqual(parse(b'{"ids": [1, 2, 3]}'), {'ids': [1, 2, 3]})
+        with self.assertRaises(ParseError):
+            parse(b'{"ids": [1, 2, 3, 4]}')
+
+    def test_body_over_limit(self):
+        """Test reading stops once the body goes over the limit."""
+        body = b'{"notation": "' + b'x' * 1000 + b'"}'
+
+        self.assertEqual(len(parse(body, limit=2000)['notation']), 1000)
+        with self.assertRaises(RequestBodyTooLarge):
+            parse(body, limit=500)
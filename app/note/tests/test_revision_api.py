@@ -0,0 +1,247 @@
+"""
+Tests for the note revision APIs.
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import tasks
+from core.models import Note, NoteRevision, Task
+from note.views import RevisionPagination
+
+NOTES_URL = reverse('note:note-list')
+
+
+def detail_url(note_id):
+    """Create and return a note detail URL."""
+    return reverse('note:note-detail', args=[note_id])
+
+
+def revisions_url(note_id):
+    """Create and return a note revisions URL."""
+    return reverse('note:note-revisions', args=[note_id])
+
+
+def revision_url(note_id, version):
+    """Create and return a note revision detail URL."""
+    return reverse('note:note-revision-detail', args=[note_id, version])
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class PrivateRevisionApiTests(TestCase):
+    """Test authenticated revision API requests."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_note(self, **params):
+        """Create a note through the API and return it."""
+        payload = {
+            'title': 'Sample note',
+            'description': 'Sample description',
+            'notation': 'First line\nSecond line',
+        }
+        payload.update(params)
+        res = self.client.post(NOTES_URL, payload, format='json')
+        return Note.objects.get(id=res.data['id'])
+
+    def test_create_note_records_snapshot(self):
+        """Test creating a note stores a first snapshot."""
+        note = self.create_note()
+
+        res = self.client.get(revisions_url(note.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['results'][0]['version'], 1)
+        self.assertTrue(res.data['results'][0]['is_snapshot'])
+
+    def test_update_records_delta(self):
+        """Test updating a note stores a delta and keeps old versions."""
+        note = self.create_note()
+
+        payload = {'notation': 'First line\nChanged line'}
+        self.client.patch(detail_url(note.id), payload, format='json')
+
+        revision = NoteRevision.objects.get(note=note, version=2)
+        self.assertFalse(revision.is_snapshot)
+        self.assertEqual(list(revision.data), ['notation'])
+        res = self.client.get(revision_url(note.id, 1))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['notation'], 'First line\nSecond line')
+        res = self.client.get(revision_url(note.id, 2))
+        self.assertEqual(res.data['notation'], payload['notation'])
+        self.assertEqual(res.data['title'], 'Sample note')
+
+    def test_update_without_text_change_records_nothing(self):
+        """Test relation only updates do not add revisions."""
+        note = self.create_note()
+
+        payload = {'tags': [{'name': 'Tag'}]}
+        self.client.patch(detail_url(note.id), payload, format='json')
+
+        self.assertEqual(note.revisions.count(), 1)
+
+    @override_settings(NOTE_REVISION_SNAPSHOT_INTERVAL=3)
+    def test_snapshots_bound_reconstruction(self):
+        """Test snapshots are written periodically and every version
+        can be rebuilt."""
+        note = self.create_note(title='v1')
+        for number in range(2, 9):
+            payload = {'title': f'v{number}'}
+            self.client.patch(detail_url(note.id), payload, format='json')
+
+        depths = list(
+            note.revisions.order_by('version').values_list('depth', flat=True)
+        )
+        self.assertEqual(depths, [0, 1, 2, 0, 1, 2, 0, 1])
+        for number in range(1, 9):
+            res = self.client.get(revision_url(note.id, number))
+            self.assertEqual(res.data['title'], f'v{number}')
+
+    def test_notation_patch_records_revision(self):
+        """Test the notation patch endpoint stores its edits."""
+        note = self.create_note(notation='Hello')
+
+        payload = {
+            'base_version': 1,
+            'edits': [{'start': 5, 'end': 5, 'text': ' world'}],
+        }
+        url = reverse('note:note-notation', args=[note.id])
+        self.client.patch(url, payload, format='json')
+
+        res = self.client.get(revision_url(note.id, 2))
+        self.assertEqual(res.data['notation'], 'Hello world')
+
+    def test_missing_revision_not_found(self):
+        """Test requesting an unknown revision returns not found."""
+        note = self.create_note()
+
+        res = self.client.get(revision_url(note.id, 5))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch.object(RevisionPagination, 'page_size', 2)
+    def test_revisions_paginated(self):
+        """Test revisions are listed a page at a time, without data."""
+        note = Note.objects.create(user=self.user, title='Paged')
+        for version in range(1, 4):
+            NoteRevision.objects.create(
+                note=note, version=version, data={'title': 'x' * 100},
+            )
+
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            res = self.client.get(revisions_url(note.id))
+        second = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(
+            [item['version'] for item in res.data['results']], [3, 2]
+        )
+        self.assertEqual(
+            [item['version'] for item in second.data['results']], [1]
+        )
+        revision_queries = [
+            sql for sql in queries if 'FROM "core_noterevision"' in sql
+        ]
+        self.assertTrue(revision_queries)
+        self.assertFalse(
+            any('"core_noterevision"."data"' in sql
+                for sql in revision_queries)
+        )
+
+    def test_other_users_revisions_not_found(self):
+        """Test revisions of another users note are not returned."""
+        other_user = create_user(email='other@example.com')
+        note = Note.objects.create(user=other_user, title='Private')
+        NoteRevision.objects.create(note=note, version=1, data={})
+
+        res = self.client.get(revisions_url(note.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_delete_removes_revisions(self):
+        """Test bulk deleting notes removes their history too."""
+        note = self.create_note()
+
+        url = reverse('note:note-bulk-delete')
+        self.client.post(url, {'ids': [note.id]}, format='json')
+
+        self.assertFalse(NoteRevision.objects.exists())
+
+    @override_settings(
+        NOTE_REVISION_SNAPSHOT_INTERVAL=3,
+        NOTE_REVISION_KEEP=2,
+    )
+    def test_updates_queue_revision_compaction(self):
+        """Test edits queue a task dropping the old revisions."""
+        tasks.autodiscover()
+        note = self.create_note(title='v1')
+        payloads = [
+            {'title': 'v2'},
+            {'tags': [{'name': 'First'}]},
+            {'title': 'v4'},
+            {'title': 'v5'},
+            {'tags': [{'name': 'Second'}]},
+            {'title': 'v7'},
+        ]
+        for payload in payloads:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    detail_url(note.id), payload, format='json',
+                )
+
+        queued = Task.objects.filter(name='note.compact_revisions')
+        self.assertEqual(
+            [task.payload for task in queued],
+            [{'note_id': note.id, 'shard': 'default'}],
+        )
+        tasks.run_tasks()
+
+        self.assertFalse(Task.objects.exists())
+        versions = list(
+            note.revisions.order_by('version')
+            .values_list('version', flat=True)
+        )
+        self.assertEqual(versions, [5, 7])
+        res = self.client.get(revision_url(note.id, 7))
+        self.assertEqual(res.data['title'], 'v7')
+
+    @override_settings(NOTE_REVISION_SNAPSHOT_INTERVAL=10)
+    def test_compact_revisions_command(self):
+        """Test compaction keeps recent versions rebuildable."""
+        note = self.create_note(title='v1')
+        for number in range(2, 7):
+            payload = {'title': f'v{number}'}
+            self.client.patch(detail_url(note.id), payload, format='json')
+
+        call_command('compact_revisions', keep=2, stdout=StringIO())
+
+        versions = list(
+            note.revisions.order_by('version')
+            .values_list('version', flat=True)
+        )
+        self.assertEqual(versions, [5, 6])
+        self.assertTrue(note.revisions.get(version=5).is_snapshot)
+        res = self.client.get(revision_url(note.id, 6))
+        self.assertEqual(res.data['title'], 'v6')
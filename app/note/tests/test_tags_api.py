@@ -8,11 +8,14 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from note.autocomplete import prefix_cache
 from note.serializers import TagSerializer
 from core.models import Tag, Note
 
 
 TAGS_URL = reverse('note:tag-list')
+AUTOCOMPLETE_URL = reverse('note:tag-autocomplete')
+NOTES_URL = reverse('note:note-list')
 
 
 def detail_url(tag_id):
@@ -45,6 +48,7 @@ class PrivateTagsApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        prefix_cache.clear()
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -135,3 +139,85 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_autocomplete_ranked_by_usage(self):
+        """Test autocomplete returns matching tags, most used first."""
+        python = Tag.objects.create(user=self.user, name='Python')
+        Tag.objects.create(user=self.user, name='Pyramid')
+        Tag.objects.create(user=self.user, name='Rust')
+        Tag.objects.create(user=create_user('other@example.com'), name='Py')
+        note = Note.objects.create(
+            title='Typing', description='Hints', user=self.user,
+        )
+        note.tags.add(python)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'Py'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [
+                {'id': python.id, 'name': 'Python', 'uses': 1},
+                {'id': res.data[1]['id'], 'name': 'Pyramid', 'uses': 0},
+            ],
+        )
+
+    def test_autocomplete_limit(self):
+        """Test autocomplete returns at most `limit` tags."""
+        for name in ['Data', 'Database', 'Datetime']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'Da', 'limit': 2})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_autocomplete_invalid_limit(self):
+        """Test autocomplete rejects a limit out of range."""
+        res = self.client.get(AUTOCOMPLETE_URL, {'limit': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_longer_prefix_cached(self):
+        """Test a longer prefix is answered from a complete result."""
+        Tag.objects.create(user=self.user, name='Cloud')
+        Tag.objects.create(user=self.user, name='Code')
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'C'})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(AUTOCOMPLETE_URL, {'q': 'Cl'})
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Cloud'])
+
+    def test_autocomplete_cache_cleared_on_update(self):
+        """Test renaming a tag clears the cached results."""
+        tag = Tag.objects.create(user=self.user, name='Cloud')
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'C'})
+
+        self.client.patch(detail_url(tag.id), {'name': 'Sky'})
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'C'})
+
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_cache_cleared_on_create(self):
+        """Test tags created with a note clear the cached results."""
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'C'})
+        payload = {
+            'title': 'Weather',
+            'description': 'Forecast',
+            'tags': [{'name': 'Cloud'}],
+        }
+        self.client.post(NOTES_URL, payload, format='json')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'C'})
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Cloud'])
+
+    def test_autocomplete_cache_cleared_on_delete(self):
+        """Test deleting a tag clears the cached results."""
+        tag = Tag.objects.create(user=self.user, name='Cloud')
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'C'})
+
+        tag.delete()
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'C'})
+
+        self.assertEqual(res.data, [])
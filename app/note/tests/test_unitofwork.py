@@ -0,0 +1,58 @@
+"""
+Tests for the request unit of work.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import Link, Note, Tag
+from note.unitofwork import UnitOfWork
+
+
+class UnitOfWorkTests(TestCase):
+    """Test resolving and queuing through a unit of work."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.unit = UnitOfWork(self.user)
+
+    def test_resolve_each_name_once(self):
+        """Test names already resolved do not query again."""
+        Tag.objects.create(user=self.user, name='Known')
+        tags = self.unit.resolve(Tag, 'name', ['Known', 'New'])
+
+        with self.assertNumQueries(0):
+            again = self.unit.resolve(Tag, 'name', ['New', 'Known'])
+
+        self.assertEqual(again, tags)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_resolve_links_by_canonical_url(self):
+        """Test equivalent urls resolve to the same link."""
+        first = self.unit.resolve(Link, 'name', ['https://Example.com/'])
+
+        with self.assertNumQueries(0):
+            second = self.unit.resolve(Link, 'name', ['HTTPS://example.com'])
+
+        self.assertEqual(first, second)
+        self.assertEqual(list(first), ['https://example.com'])
+
+    def test_flush_inserts_queued_rows(self):
+        """Test queued relation rows are inserted in one statement."""
+        note = Note.objects.create(
+            user=self.user, title='Note', description='Something',
+        )
+        tags = self.unit.resolve(Tag, 'name', ['A', 'B'])
+        through = Note.tags.through
+        self.unit.add(through, [
+            through(note_id=note.id, tag_id=tag.id) for tag in tags.values()
+        ])
+        self.assertEqual(note.tags.count(), 0)
+
+        with self.assertNumQueries(1):
+            self.unit.flush()
+
+        self.assertEqual(note.tags.count(), 2)
+        with self.assertNumQueries(0):
+            self.unit.flush()
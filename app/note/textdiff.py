@@ -0,0 +1,56 @@
+"""
+Helpers for editing notations with text patches.
+
+A patch is a list of edits ``{'start': i, 'end': j, 'text': s}`` that
+replace ``base[i:j]`` with ``s``. Offsets always refer to the base text,
+so edits must be sorted and must not overlap.
+"""
+from difflib import SequenceMatcher
+from itertools import accumulate
+
+
+def check_patch(ops, length=None):
+    """Raise ValueError if `ops` is not a valid patch."""
+    position = 0
+    for op in ops:
+        if op['start'] < position or op['end'] < op['start']:
+            raise ValueError('Edits must be sorted and must not overlap.')
+        position = op['end']
+
+    if length is not None and position > length:
+        raise ValueError('Edit is out of range of the base text.')
+
+
+def apply_patch(text, ops):
+    """Return `text` with the patch applied."""
+    check_patch(ops, len(text))
+    pieces = []
+    position = 0
+    for op in ops:
+        pieces.append(text[position:op['start']])
+        pieces.append(op['text'])
+        position = op['end']
+    pieces.append(text[position:])
+
+    return ''.join(pieces)
+
+
+def make_patch(old, new):
+    """Return a patch turning `old` into `new`, diffed line by line."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    old_offsets = [0, *accumulate(len(line) for line in old_lines)]
+    new_offsets = [0, *accumulate(len(line) for line in new_lines)]
+
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        ops.append({
+            'start': old_offsets[i1],
+            'end': old_offsets[i2],
+            'text': new[new_offsets[j1]:new_offsets[j2]],
+        })
+
+    return ops
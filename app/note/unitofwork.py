@@ -0,0 +1,81 @@
+"""
+Request scoped identity map and pending relation writes for notes.
+
+Tags, todos and links are resolved by name at most once per request,
+and the relation rows added while saving are inserted together when
+the unit of work is flushed.
+"""
+from collections import defaultdict
+
+from core.links import canonical_url
+from core.models import Link, names_created
+
+
+def get_or_create_named(model, user, field, values):
+    """Return a mapping of value to object, creating missing ones in bulk."""
+    values = set(values)
+    if not values:
+        return {}
+
+    lookup = {f'{field}__in': values}
+    queryset = model.objects.filter(user=user, **lookup)
+    objs = {getattr(obj, field): obj for obj in queryset}
+    missing = values - set(objs)
+    if missing:
+        model.objects.bulk_create(
+            model(user=user, **{field: value}) for value in missing
+        )
+        names_created.send(sender=model, user_id=user.pk)
+        objs = {getattr(obj, field): obj for obj in queryset.all()}
+
+    return objs
+
+
+class UnitOfWork:
+    """Objects loaded and relation rows queued during one request."""
+
+    def __init__(self, user):
+        self.user = user
+        self._objects = {}
+        self._pending = defaultdict(list)
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the unit of work of `request`, creating it once."""
+        unit = getattr(request, '_unit_of_work', None)
+        if unit is None:
+            unit = cls(request.user)
+            request._unit_of_work = unit
+
+        return unit
+
+    def resolve(self, model, field, values):
+        """Return a mapping of value to object of the user.
+
+        Only values not seen before in this unit of work are looked up,
+        missing objects are created. Link values are canonical urls.
+        """
+        if model is Link:
+            values = map(canonical_url, values)
+        keys = set(values)
+        objects = self._objects.setdefault(model, {})
+        unknown = keys - objects.keys()
+        if unknown:
+            if model is Link:
+                found = Link.objects.get_or_create_urls(self.user, unknown)
+            else:
+                found = get_or_create_named(model, self.user, field, unknown)
+            objects.update(found)
+
+        return {key: objects[key] for key in keys}
+
+    def add(self, through, rows):
+        """Queue relation rows of `through` to be inserted on flush."""
+        self._pending[through].extend(rows)
+
+    def flush(self):
+        """Insert the queued relation rows, one statement per table."""
+        pending, self._pending = self._pending, defaultdict(list)
+        for through, rows in pending.items():
+            if rows:
+                through.objects.bulk_create(rows, ignore_conflicts=True)
@@ -1,18 +1,45 @@
 """
 Views for the note APIs.
 """
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import (mixins,
+                            status,
                             viewsets)
-from drf_spectacular.utils import (OpenApiParameter,
-                                   OpenApiTypes,
-                                   extend_schema,
-                                   extend_schema_view)
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from note import serializers
+from note.autocomplete import autocomplete
+from user.authentication import (ExpiringTokenAuthentication,
+                                 SignedTokenAuthentication)
+from note.parsers import MergePatchParser, StreamingJSONParser
+from note.revisions import rebuild, record_revision, snapshot
+from note.textdiff import apply_patch
+from note.unitofwork import UnitOfWork
 
+from core.links import canonical_url
 from core.models import Note, Tag, Todo, Link
+from core.db_routers import current_shard
+from core.schema import (OpenApiParameter,
+                         OpenApiTypes,
+                         extend_schema,
+                         extend_schema_view)
+from core.views import ReplicaReadMixin, ShardRoutingMixin
+from ops.views import ProfiledViewMixin
+
+
+class RevisionPagination(PageNumberPagination):
+    """Pages of the revision list of a note."""
+    page_size = settings.NOTE_REVISION_PAGE_SIZE
 
 
 @extend_schema_view(
@@ -26,12 +53,22 @@ from core.models import Note, Tag, Todo, Link
         ]
     )
 )
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(ProfiledViewMixin,
+                  ShardRoutingMixin,
+                  ReplicaReadMixin,
+                  viewsets.ModelViewSet):
     """View for manage note APIs."""
     serializer_class = serializers.NoteDetailSerializer
     queryset = Note.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    parser_classes = [StreamingJSONParser] + [
+        parser for parser in api_settings.DEFAULT_PARSER_CLASSES
+        if parser.media_type != StreamingJSONParser.media_type
+    ] + [MergePatchParser]
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
@@ -46,6 +83,9 @@ class NoteViewSet(viewsets.ModelViewSet):
             tag_ids = self._params_to_ints(tags)
             queryset = queryset.filter(tags__id__in=tag_ids)
 
+        if self.action in ('revisions', 'revision_detail'):
+            queryset = queryset.defer('notation')
+
         return queryset.filter(
             user=self.request.user).order_by('-id').distinct()
 
@@ -53,12 +93,230 @@ class NoteViewSet(viewsets.ModelViewSet):
         """Return the serializer class for request."""
         if self.action == 'list':
             return serializers.NoteSerializer
+        elif self.action == 'bulk_delete':
+            return serializers.NoteBulkDeleteSerializer
+        elif self.action == 'bulk_tags':
+            return serializers.NoteBulkTagSerializer
+        elif self.action == 'notation':
+            return serializers.NotationPatchSerializer
+        elif self.action == 'revisions':
+            return serializers.NoteRevisionSerializer
+        elif self.action == 'revision_detail':
+            return serializers.NoteRevisionDetailSerializer
 
         return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new note."""
-        serializer.save(user=self.request.user)
+        with transaction.atomic(using=current_shard()):
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        """Update a note together with its revision history.
+
+        The row is locked and reloaded first, so a concurrent edit like a
+        notation patch cannot lose its version bump.
+        """
+        with transaction.atomic(using=current_shard()):
+            serializer.instance = Note.objects.select_for_update().get(
+                pk=serializer.instance.pk
+            )
+            serializer.save()
+
+    def _merge_patch_to_data(self, note, patch):
+        """Translate a JSON merge patch into serializer input.
+
+        Relations may be sent as objects keyed by name, where a null
+        value removes the item and any other value adds it. Link names
+        are compared in canonical form.
+        """
+        if not isinstance(patch, dict):
+            raise ParseError('Merge patch must be a JSON object.')
+
+        blank_fields = {f.name for f in Note._meta.fields if f.blank}
+        data = {}
+        for attr, value in patch.items():
+            if attr in serializers.NoteSerializer.related_fields:
+                model, field = serializers.NoteSerializer.related_fields[attr]
+                if isinstance(value, dict):
+                    if model is Link:
+                        value = {
+                            canonical_url(k): v for k, v in value.items()
+                        }
+                    names = set(
+                        getattr(note, attr).values_list(field, flat=True)
+                    )
+                    names |= {k for k, v in value.items() if v is not None}
+                    names -= {k for k, v in value.items() if v is None}
+                    value = [{field: name} for name in sorted(names)]
+                elif value is None:
+                    value = []
+            elif value is None and attr in blank_fields:
+                value = ''
+            data[attr] = value
+
+        return data
+
+    def partial_update(self, request, *args, **kwargs):
+        """Partially update a note, accepting JSON merge patches."""
+        if request.content_type.split(';')[0] != MergePatchParser.media_type:
+            return super().partial_update(request, *args, **kwargs)
+
+        instance = self.get_object()
+        data = self._merge_patch_to_data(instance, request.data)
+        serializer = self.get_serializer(instance, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        return Response(serializer.data)
+
+    @action(methods=['PATCH'], detail=True, url_path='notation')
+    def notation(self, request, pk=None):
+        """Apply a text patch to the notation of a note."""
+        note = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        base_version = serializer.validated_data['base_version']
+
+        if note.version != base_version:
+            return self._version_conflict(note)
+        try:
+            notation = apply_patch(
+                note.notation, serializer.validated_data['edits']
+            )
+        except ValueError as exc:
+            return Response(
+                {'edits': [str(exc)]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        previous = snapshot(note)
+        edited_at = timezone.now()
+        with transaction.atomic(using=current_shard()):
+            updated = Note.objects.filter(
+                id=note.id,
+                user=request.user,
+                version=base_version,
+            ).update(
+                notation=notation,
+                version=F('version') + 1,
+                edited_at=edited_at,
+            )
+            if updated:
+                note.notation = notation
+                note.version = base_version + 1
+                record_revision(
+                    note,
+                    previous,
+                    {'notation': serializer.validated_data['edits']},
+                )
+        if not updated:
+            note.refresh_from_db(fields=['version'])
+            return self._version_conflict(note)
+
+        return Response({
+            'id': note.id,
+            'version': base_version + 1,
+            'edited_at': edited_at,
+        })
+
+    @action(
+        methods=['GET'],
+        detail=True,
+        pagination_class=RevisionPagination,
+    )
+    def revisions(self, request, pk=None):
+        """List the stored revisions of a note, newest first."""
+        note = self.get_object()
+        revisions = note.revisions.defer('data').order_by('-version')
+        page = self.paginate_queryset(revisions)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['GET'],
+        detail=True,
+        url_path=r'revisions/(?P<version>\d+)',
+        url_name='revision-detail',
+    )
+    def revision_detail(self, request, pk=None, version=None):
+        """Return the content of a note at a revision."""
+        note = self.get_object()
+        revision = get_object_or_404(note.revisions, version=version)
+        revision.fields = rebuild(revision)
+        serializer = self.get_serializer(revision)
+
+        return Response(serializer.data)
+
+    def _version_conflict(self, note):
+        """Return the response for a patch against a stale version."""
+        return Response(
+            {
+                'detail': 'Notation was changed since the base version.',
+                'version': note.version,
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    def _user_note_ids(self, ids=None, tags=None):
+        """Return ids of the user's notes matching the given filters."""
+        queryset = Note.objects.filter(user=self.request.user)
+        if ids:
+            queryset = queryset.filter(id__in=ids)
+        if tags:
+            queryset = queryset.filter(tags__id__in=tags)
+
+        return list(queryset.values_list('id', flat=True).distinct())
+
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete every selected note of the user."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic(using=current_shard()):
+            note_ids = self._user_note_ids(**serializer.validated_data)
+            # The collector deletes the relations and revisions with one
+            # query per table.
+            _, deleted = Note.objects.filter(
+                user=request.user,
+                id__in=note_ids,
+            ).delete()
+
+        return Response(
+            {'deleted': deleted.get(Note._meta.label, 0)},
+            status=status.HTTP_200_OK,
+        )
+
+    @action(methods=['POST'], detail=False, url_path='bulk-tags')
+    def bulk_tags(self, request):
+        """Add and remove tags on every selected note of the user."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add = serializer.validated_data.get('add', [])
+        remove = serializer.validated_data.get('remove', [])
+        through = Note.tags.through
+
+        with transaction.atomic(using=current_shard()):
+            note_ids = self._user_note_ids(serializer.validated_data['ids'])
+            if remove:
+                through.objects.filter(
+                    note_id__in=note_ids,
+                    tag__user=request.user,
+                    tag__name__in=remove,
+                ).delete()
+            if add and note_ids:
+                unit = UnitOfWork.for_request(request)
+                tags = unit.resolve(Tag, 'name', add)
+                unit.add(through, [
+                    through(note_id=note_id, tag_id=tag.id)
+                    for note_id in note_ids
+                    for tag in tags.values()
+                ])
+                unit.flush()
+
+        return Response({'updated': len(note_ids)}, status=status.HTTP_200_OK)
 
 
 @extend_schema_view(
@@ -72,12 +330,18 @@ class NoteViewSet(viewsets.ModelViewSet):
         ]
     )
 )
-class BaseNoteAttrViewSet(mixins.DestroyModelMixin,
+class BaseNoteAttrViewSet(ProfiledViewMixin,
+                          ShardRoutingMixin,
+                          ReplicaReadMixin,
+                          mixins.DestroyModelMixin,
                           mixins.UpdateModelMixin,
                           mixins.ListModelMixin,
                           viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -94,13 +358,51 @@ class BaseNoteAttrViewSet(mixins.DestroyModelMixin,
             user=self.request.user).order_by('-name').distinct()
 
 
-class LinkViewSet(BaseNoteAttrViewSet):
+class AutocompleteMixin:
+    """Add a prefix search over the names of the user's items."""
+    autocomplete_field = 'name'
+    replica_actions = ReplicaReadMixin.replica_actions + ['autocomplete']
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Prefix of the names to match.',
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Number of matches to return.',
+            ),
+        ],
+        responses=serializers.AutocompleteSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return the most used items whose name starts with `q`."""
+        query = serializers.AutocompleteQuerySerializer(
+            data=request.query_params
+        )
+        query.is_valid(raise_exception=True)
+        items = autocomplete(
+            self.queryset,
+            request.user,
+            self.autocomplete_field,
+            query.validated_data['q'],
+            query.validated_data['limit'],
+        )
+
+        return Response(items)
+
+
+class LinkViewSet(AutocompleteMixin, BaseNoteAttrViewSet):
     """Manage refs in the database."""
     serializer_class = serializers.LinkSerializer
     queryset = Link.objects.all()
 
 
-class TagViewSet(BaseNoteAttrViewSet):
+class TagViewSet(AutocompleteMixin, BaseNoteAttrViewSet):
     """Manage tags in the database."""
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
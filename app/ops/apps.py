@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.contrib.auth.signals import user_login_failed
+from django.core.checks import Tags, register
+from django.db.backends.signals import connection_created
+
+
+class OpsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ops'
+
+    def ready(self):
+        from ops.checks import check_metrics_token
+        from ops.metrics import login_failed
+        from ops.querylog import install_query_logger
+
+        connection_created.connect(install_query_logger)
+        user_login_failed.connect(login_failed)
+        register(check_metrics_token, Tags.security)
@@ -0,0 +1,17 @@
+"""
+System checks of the operational endpoints.
+"""
+from django.conf import settings
+from django.core.checks import Error
+
+
+def check_metrics_token(app_configs, **kwargs):
+    """/metrics must not be left without a token outside development."""
+    if not settings.METRICS_TOKEN and not settings.METRICS_PUBLIC:
+        return [Error(
+            'METRICS_TOKEN is not set, /metrics refuses every request.',
+            hint='Set METRICS_TOKEN to the bearer token of the scraper.',
+            id='ops.E001',
+        )]
+
+    return []
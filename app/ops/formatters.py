@@ -0,0 +1,25 @@
+"""
+Log formatters.
+"""
+import json
+import logging
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line.
+
+    The `data` dict passed through `extra` is merged into the object.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **getattr(record, 'data', {}),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
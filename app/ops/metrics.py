@@ -0,0 +1,113 @@
+"""
+Prometheus metrics of the API.
+
+When the PROMETHEUS_MULTIPROC_DIR environment variable points to an
+empty directory shared by the workers of a pre-fork server, each worker
+writes its values to memory mapped files there and /metrics adds up
+the files of every worker. The server calls `mark_worker_started` in
+each new worker and `mark_worker_dead` with the pid of each worker that
+exits, as the hooks of gunicorn.conf.py do.
+"""
+import os
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST,
+                               REGISTRY,
+                               CollectorRegistry,
+                               Counter,
+                               Gauge,
+                               Histogram,
+                               generate_latest,
+                               multiprocess)
+
+METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+
+REQUESTS = Counter(
+    'api_requests_total',
+    'Requests by URL name, method and status.',
+    ['view', 'method', 'status'],
+)
+REQUEST_DURATION = Histogram(
+    'api_request_duration_seconds',
+    'Request latency by URL name and method.',
+    ['view', 'method'],
+)
+DB_QUERIES = Counter(
+    'api_db_queries_total',
+    'Database queries run by requests, by URL name.',
+    ['view'],
+)
+DB_QUERY_DURATION = Counter(
+    'api_db_query_duration_seconds_total',
+    'Time spent in database queries by requests, by URL name.',
+    ['view'],
+)
+CACHE_REQUESTS = Counter(
+    'api_cache_requests_total',
+    'Cache lookups by cache and result.',
+    ['cache', 'result'],
+)
+AUTH_FAILURES = Counter(
+    'api_auth_failures_total',
+    'Failed logins and rejected credentials.',
+    ['kind'],
+)
+WORKERS = Gauge(
+    'api_workers',
+    'Worker processes serving the API.',
+    multiprocess_mode='livesum',
+)
+WORKER_START_TIME = Gauge(
+    'api_worker_start_time_seconds',
+    'Start time of each worker process.',
+    multiprocess_mode='liveall',
+)
+
+
+def record_request(view, method, status, duration, queries, query_time):
+    """Record a finished request."""
+    if method not in METHODS:
+        method = 'other'
+    REQUESTS.labels(view, method, status).inc()
+    REQUEST_DURATION.labels(view, method).observe(duration)
+    if queries:
+        DB_QUERIES.labels(view).inc(queries)
+        DB_QUERY_DURATION.labels(view).inc(query_time)
+
+
+def record_cache(cache, hit):
+    """Record a cache lookup."""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_auth_failure(kind):
+    """Record a failed authentication."""
+    AUTH_FAILURES.labels(kind).inc()
+
+
+def login_failed(sender, **kwargs):
+    """Record a failed login, connected to `user_login_failed`."""
+    record_auth_failure('login')
+
+
+def mark_worker_started():
+    """Count the current process as a live worker."""
+    WORKERS.inc()
+    WORKER_START_TIME.set(time.time())
+
+
+def mark_worker_dead(pid):
+    """Drop the live gauges of a worker that exited."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+def render():
+    """Return the metrics of all workers in the text format."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,84 @@
+"""
+Middleware for the operational tooling.
+"""
+import random
+import time
+
+from django.conf import settings
+
+from ops.metrics import record_auth_failure, record_request
+from ops.profiler import sampler
+from ops.querylog import query_totals, start_request, stop_request
+
+
+class QueryContextMiddleware:
+    """Make the request available to the query logger."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tokens = start_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            stop_request(tokens)
+
+
+class MetricsMiddleware:
+    """Record the count, latency and queries of each request.
+
+    Requests are labelled with their URL name, so the number of series
+    does not grow with the number of objects.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        if response.status_code == 401:
+            record_auth_failure('credentials')
+        record_request(
+            view,
+            request.method,
+            response.status_code,
+            duration,
+            *query_totals(),
+        )
+
+        return response
+
+
+class ProfilerMiddleware:
+    """Sample the stacks of some requests into per view profiles.
+
+    A PROFILE_SAMPLE_RATE fraction of the requests is profiled here.
+    Views with ProfiledViewMixin also profile requests of staff users
+    sending an `X-Profile` header, once the user is authenticated.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PROFILE_SAMPLE_RATE
+        request.profiled = bool(rate) and random.random() < rate
+        if request.profiled:
+            sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if request.profiled:
+                samples = sampler.stop()
+                match = request.resolver_match
+                sampler.add(
+                    match.view_name if match else 'unresolved', samples
+                )
+
+        return response
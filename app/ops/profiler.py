@@ -0,0 +1,107 @@
+"""
+Sampling profiler for requests.
+
+While a profiled request runs, one background thread records the stack
+of the request thread every PROFILE_INTERVAL seconds. The samples are
+counted per view in the collapsed stack format read by flamegraph.pl
+and speedscope: one line per stack, frames separated by `;`, followed
+by the number of samples.
+"""
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+MAX_DEPTH = 100
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+
+def collapse(frame):
+    """Return the stack ending at `frame`, root first."""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '?')
+        names.append(f'{module}:{code.co_name}')
+        frame = frame.f_back
+
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stacks of the threads serving profiled requests."""
+    max_stacks = 5000
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+        self._profiles = defaultdict(Counter)
+
+    def start(self):
+        """Start sampling the current thread."""
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='stack-sampler', daemon=True,
+                )
+                self._thread.start()
+
+    def stop(self):
+        """Stop sampling the current thread, return its samples."""
+        with self._lock:
+            return self._active.pop(threading.get_ident(), Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[collapse(frame)] += 1
+            del frames
+
+    def add(self, view, samples):
+        """Add the samples of a request to the profile of `view`."""
+        with self._lock:
+            profile = self._profiles[view]
+            for stack, count in samples.items():
+                if stack in profile or len(profile) < self.max_stacks:
+                    profile[stack] += count
+
+    def collapsed(self, view=None):
+        """Return the profiles in collapsed stack format."""
+        with self._lock:
+            lines = [
+                f'{name};{stack} {count}'
+                for name, profile in self._profiles.items()
+                if view is None or name == view
+                for stack, count in profile.items()
+            ]
+
+        return ''.join(f'{line}\n' for line in sorted(lines))
+
+    def views(self):
+        """Return the number of samples per profiled view."""
+        with self._lock:
+            return {
+                name: sum(profile.values())
+                for name, profile in self._profiles.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+sampler = StackSampler(settings.PROFILE_INTERVAL)
@@ -0,0 +1,164 @@
+"""
+Slow query logging.
+
+Every query is timed by a database execute wrapper, and the number and
+time of the queries of the current request are summed for the metrics.
+Queries taking at least SLOW_QUERY_MS are logged to the `ops.queries`
+logger with the view, the user and a fingerprint of the SQL, and
+aggregated per fingerprint in the memory of the process. Faster queries
+only pay for reading the clock.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.functional import empty
+
+logger = logging.getLogger('ops.queries')
+
+_current_request = contextvars.ContextVar('current_request', default=None)
+_query_totals = contextvars.ContextVar('query_totals', default=None)
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Return `sql` with literals and placeholder lists normalized."""
+    sql = _STRING.sub('%s', sql)
+    sql = _NUMBER.sub('%s', sql)
+    sql = _IN_LIST.sub('(...)', sql).replace('%s', '?')
+
+    return _SPACE.sub(' ', sql).strip()
+
+
+def start_request(request):
+    """Make `request` the context of the following queries."""
+    return _current_request.set(request), _query_totals.set([0, 0.0])
+
+
+def stop_request(tokens):
+    request_token, totals_token = tokens
+    _current_request.reset(request_token)
+    _query_totals.reset(totals_token)
+
+
+def query_totals():
+    """Return the number and seconds of the queries of the request."""
+    totals = _query_totals.get()
+    return (0, 0.0) if totals is None else tuple(totals)
+
+
+def request_context():
+    """Return the view name and user id of the current request.
+
+    Never loads a lazy user, that would run a query.
+    """
+    request = _current_request.get()
+    if request is None:
+        return None, None
+    match = getattr(request, 'resolver_match', None)
+    user = request.__dict__.get('user')
+    if getattr(user, '_wrapped', None) is empty:
+        user = None
+
+    return (
+        match.view_name if match is not None else None,
+        getattr(user, 'pk', None),
+    )
+
+
+class QueryStats:
+    """Slow query totals per fingerprint, kept in process memory."""
+    max_fingerprints = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, fingerprint, duration, view):
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    smallest = min(
+                        self._stats, key=lambda key: self._stats[key][1]
+                    )
+                    del self._stats[smallest]
+                stats = self._stats[fingerprint] = [0, 0.0, 0.0, None]
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            stats[3] = view
+
+    def snapshot(self):
+        """Return the stats sorted by total time, slowest first."""
+        with self._lock:
+            items = list(self._stats.items())
+
+        rows = [
+            {
+                'fingerprint': fingerprint,
+                'count': count,
+                'total_ms': round(total * 1000, 3),
+                'max_ms': round(longest * 1000, 3),
+                'last_view': view,
+            }
+            for fingerprint, (count, total, longest, view) in items
+        ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+
+def log_slow_query(sql, duration, alias):
+    """Log and aggregate a query slower than the threshold."""
+    view, user_id = request_context()
+    key = fingerprint(sql)
+    query_stats.record(key, duration, view)
+    logger.warning(
+        'Slow query (%.1f ms) in %s',
+        duration * 1000,
+        view,
+        extra={'data': {
+            'duration_ms': round(duration * 1000, 3),
+            'database': alias,
+            'view': view,
+            'user_id': user_id,
+            'fingerprint': key,
+        }},
+    )
+
+
+def query_logger(execute, sql, params, many, context):
+    """Database execute wrapper timing each query."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        totals = _query_totals.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += duration
+        threshold = settings.SLOW_QUERY_MS
+        if threshold and duration * 1000 >= threshold:
+            log_slow_query(sql, duration, context['connection'].alias)
+
+
+def install_query_logger(sender, connection, **kwargs):
+    """Add the query logger to a new database connection."""
+    if query_logger not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_logger)
@@ -0,0 +1,211 @@
+"""
+Tests for the Prometheus metrics.
+"""
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from note.autocomplete import prefix_cache
+from ops.checks import check_metrics_token
+from ops.metrics import render
+
+METRICS_URL = reverse('metrics')
+NOTES_URL = reverse('note:note-list')
+TOKEN_URL = reverse('user:token')
+TAG_AUTOCOMPLETE_URL = reverse('note:tag-autocomplete')
+
+
+def sample(name, **labels):
+    """Return the current value of a metric sample."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsApiTests(TestCase):
+    """Test the metrics recorded by requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+
+    def test_request_recorded_by_url_name(self):
+        """Test requests are counted and timed per URL name."""
+        labels = {'view': 'note:note-list', 'method': 'GET'}
+        before = sample('api_requests_total', status='200', **labels)
+        count = sample('api_request_duration_seconds_count', **labels)
+        queries = sample('api_db_queries_total', view='note:note-list')
+        self.client.force_authenticate(self.user)
+
+        self.client.get(NOTES_URL)
+
+        self.assertEqual(
+            sample('api_requests_total', status='200', **labels),
+            before + 1,
+        )
+        self.assertEqual(
+            sample('api_request_duration_seconds_count', **labels),
+            count + 1,
+        )
+        self.assertGreater(
+            sample('api_db_queries_total', view='note:note-list'), queries,
+        )
+
+    def test_unresolved_requests_share_label(self):
+        """Test unknown paths do not create a series each."""
+        labels = {'view': 'unresolved', 'method': 'GET', 'status': '404'}
+        before = sample('api_requests_total', **labels)
+
+        self.client.get('/no/such/path/1/')
+        self.client.get('/no/such/path/2/')
+
+        self.assertEqual(sample('api_requests_total', **labels), before + 2)
+
+    def test_auth_failures_recorded(self):
+        """Test rejected credentials and failed logins are counted."""
+        credentials = sample('api_auth_failures_total', kind='credentials')
+        login = sample('api_auth_failures_total', kind='login')
+
+        self.client.get(NOTES_URL, HTTP_AUTHORIZATION='Token invalid')
+        self.client.post(
+            TOKEN_URL, {'email': 'user@example.com', 'password': 'wrong'},
+        )
+
+        self.assertEqual(
+            sample('api_auth_failures_total', kind='credentials'),
+            credentials + 1,
+        )
+        self.assertEqual(
+            sample('api_auth_failures_total', kind='login'), login + 1,
+        )
+
+    def test_cache_lookups_recorded(self):
+        """Test cache hits and misses are counted."""
+        prefix_cache.clear()
+        labels = {'cache': 'autocomplete'}
+        hits = sample('api_cache_requests_total', result='hit', **labels)
+        misses = sample('api_cache_requests_total', result='miss', **labels)
+        self.client.force_authenticate(self.user)
+
+        self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'a'})
+        self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'a'})
+
+        self.assertEqual(
+            sample('api_cache_requests_total', result='hit', **labels),
+            hits + 1,
+        )
+        self.assertEqual(
+            sample('api_cache_requests_total', result='miss', **labels),
+            misses + 1,
+        )
+
+    def test_metrics_endpoint(self):
+        """Test the metrics are served in the Prometheus text format."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'api_requests_total', res.content)
+        self.assertIn(b'api_workers', res.content)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Test the metrics token is required when configured."""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN='', METRICS_PUBLIC=False)
+    def test_metrics_refused_without_token(self):
+        """Test private metrics are refused until a token is set."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        errors = check_metrics_token(None)
+        self.assertEqual([error.id for error in errors], ['ops.E001'])
+
+    @override_settings(METRICS_TOKEN='secret', METRICS_PUBLIC=False)
+    def test_private_metrics_with_token(self):
+        """Test private metrics are served with the token."""
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(check_metrics_token(None), [])
+
+
+class GunicornHooksTests(SimpleTestCase):
+    """Test the gunicorn hooks keeping the worker metrics."""
+
+    def setUp(self):
+        self.config = runpy.run_path(
+            os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        )
+
+    def test_post_fork_counts_worker(self):
+        """Test a forked worker counts itself."""
+        before = sample('api_workers')
+
+        self.config['post_fork'](MagicMock(), MagicMock())
+
+        self.assertEqual(sample('api_workers'), before + 1)
+
+    @patch('ops.metrics.mark_worker_dead')
+    def test_child_exit_marks_worker_dead(self, patched):
+        """Test an exited worker stops counting as live."""
+        self.config['child_exit'](MagicMock(), MagicMock(pid=1234))
+
+        patched.assert_called_once_with(1234)
+
+    def test_on_starting_empties_directory(self):
+        """Test the metrics files of a previous run are removed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'counter_1.db')
+            open(path, 'wb').close()
+            env = {'PROMETHEUS_MULTIPROC_DIR': directory}
+            with patch.dict(os.environ, env):
+                self.config['on_starting'](MagicMock())
+
+            self.assertEqual(os.listdir(directory), [])
+
+
+class MultiProcessMetricsTests(SimpleTestCase):
+    """Test aggregating the metrics of several processes."""
+
+    def test_workers_added_up(self):
+        """Test values written by each worker are summed."""
+        script = (
+            'from ops.metrics import record_request; '
+            'record_request("note:note-list", "GET", 200, 0.1, 2, 0.01)'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            env = {'PROMETHEUS_MULTIPROC_DIR': directory}
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, '-c', script],
+                    cwd=settings.BASE_DIR, env={**os.environ, **env},
+                    check=True,
+                )
+            with patch.dict(os.environ, env):
+                body, _ = render()
+
+        lines = body.decode().splitlines()
+        self.assertIn(
+            'api_requests_total{method="GET",status="200",'
+            'view="note:note-list"} 2.0',
+            lines,
+        )
+        self.assertIn('api_db_queries_total{view="note:note-list"} 4.0', lines)
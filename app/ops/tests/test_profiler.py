@@ -0,0 +1,157 @@
+"""
+Tests for the sampling profiler.
+"""
+import os
+import sys
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ops.profiler import StackSampler, collapse, sampler
+
+PROFILE_URL = reverse('ops:profile')
+NOTES_URL = reverse('note:note-list')
+
+
+def create_user(email='user@example.com', **extra):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email, 'testpass123', **extra)
+
+
+def busy(seconds):
+    """Keep the CPU busy for `seconds`."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class StackSamplerTests(SimpleTestCase):
+    """Test sampling and aggregating stacks."""
+
+    def test_collapse_root_first(self):
+        """Test stacks are collapsed from the root to the frame."""
+        def inner():
+            return collapse(sys._getframe())
+
+        stack = inner().split(';')
+
+        self.assertEqual(stack[-1], f'{__name__}:inner')
+        self.assertEqual(stack[-2], f'{__name__}:test_collapse_root_first')
+
+    def test_samples_current_thread(self):
+        """Test the running thread is sampled until stopped."""
+        stack_sampler = StackSampler(0.001)
+
+        stack_sampler.start()
+        busy(0.05)
+        samples = stack_sampler.stop()
+
+        self.assertTrue(samples)
+        self.assertTrue(any(':busy' in stack for stack in samples))
+        time.sleep(0.05)
+        self.assertIsNone(stack_sampler._thread)
+
+    def test_collapsed_per_view(self):
+        """Test profiles are written in collapsed format per view."""
+        stack_sampler = StackSampler(0.001)
+        stack_sampler.add('note:note-list', Counter({'a:f;a:g': 2}))
+        stack_sampler.add('note:note-list', Counter({'a:f;a:g': 1}))
+        stack_sampler.add('user:me', Counter({'a:h': 1}))
+
+        self.assertEqual(
+            stack_sampler.collapsed(),
+            'note:note-list;a:f;a:g 3\nuser:me;a:h 1\n',
+        )
+        self.assertEqual(stack_sampler.collapsed('user:me'), 'user:me;a:h 1\n')
+        self.assertEqual(
+            stack_sampler.views(), {'note:note-list': 3, 'user:me': 1},
+        )
+
+    def test_stacks_bounded(self):
+        """Test new stacks are dropped once a profile is full."""
+        stack_sampler = StackSampler(0.001)
+        stack_sampler.max_stacks = 1
+        stack_sampler.add('view', Counter({'a': 1, 'b': 1}))
+
+        self.assertEqual(stack_sampler.views(), {'view': 1})
+
+
+@patch.object(sampler, 'start')
+@patch.object(sampler, 'stop', return_value=Counter({'m:f': 2}))
+class ProfilerMiddlewareTests(TestCase):
+    """Test choosing and recording profiled requests."""
+
+    def setUp(self):
+        sampler.clear()
+        self.client = APIClient()
+
+    def test_not_profiled_by_default(self, stop, start):
+        """Test requests are not profiled without sampling or header."""
+        self.client.force_authenticate(create_user())
+
+        self.client.get(NOTES_URL)
+
+        start.assert_not_called()
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_request_recorded(self, stop, start):
+        """Test sampled requests are recorded under their view."""
+        self.client.force_authenticate(create_user())
+
+        self.client.get(NOTES_URL)
+
+        self.assertEqual(sampler.collapsed(), 'note:note-list;m:f 2\n')
+
+    def test_header_requires_staff(self, stop, start):
+        """Test the profile header does not start sampling for others."""
+        self.client.force_authenticate(create_user())
+
+        self.client.get(NOTES_URL, HTTP_X_PROFILE='1')
+
+        start.assert_not_called()
+        self.assertEqual(sampler.collapsed(), '')
+
+    def test_header_ignored_for_anonymous(self, stop, start):
+        """Test anonymous clients cannot start the sampler."""
+        self.client.get(NOTES_URL, HTTP_X_PROFILE='1')
+
+        start.assert_not_called()
+
+    def test_header_from_staff_recorded(self, stop, start):
+        """Test staff requests with the header are recorded."""
+        self.client.force_authenticate(create_user(is_staff=True))
+
+        self.client.get(NOTES_URL, HTTP_X_PROFILE='1')
+
+        start.assert_called_once()
+        self.assertEqual(sampler.collapsed(), 'note:note-list;m:f 2\n')
+
+    def test_profile_endpoint(self, stop, start):
+        """Test staff can read and reset the profiles."""
+        self.client.force_authenticate(create_user(is_staff=True))
+        sampler.add('user:me', Counter({'m:f': 1}))
+
+        res = self.client.get(PROFILE_URL, {'view': 'user:me'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/plain')
+        self.assertEqual(res.content, b'user:me;m:f 1\n')
+        self.assertEqual(res['X-Worker-Pid'], str(os.getpid()))
+        res = self.client.delete(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(sampler.collapsed(), '')
+
+    def test_profile_endpoint_staff_only(self, stop, start):
+        """Test the profiles are only listed for staff."""
+        self.client.force_authenticate(create_user())
+
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,138 @@
+"""
+Tests for the slow query log.
+"""
+import json
+import logging
+import os
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ops.formatters import JsonFormatter
+from ops.querylog import QueryStats, fingerprint, query_stats
+
+QUERIES_URL = reverse('ops:queries')
+NOTES_URL = reverse('note:note-list')
+
+
+def create_user(email='user@example.com', **extra):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email, 'testpass123', **extra)
+
+
+class FingerprintTests(SimpleTestCase):
+    """Test normalizing queries."""
+
+    def test_literals_replaced(self):
+        """Test string and number literals become placeholders."""
+        sql = "SELECT * FROM t WHERE a = 'x''y' AND b > 10 LIMIT 21"
+
+        self.assertEqual(
+            fingerprint(sql),
+            'SELECT * FROM t WHERE a = ? AND b > ? LIMIT ?',
+        )
+
+    def test_in_lists_collapsed(self):
+        """Test lists of any length give the same fingerprint."""
+        short = 'SELECT * FROM "core_tag" WHERE "id" IN (%s, %s)'
+        long = 'SELECT *\n FROM "core_tag" WHERE "id" IN (%s, %s, %s, %s)'
+
+        self.assertEqual(fingerprint(short), fingerprint(long))
+        self.assertIn('IN (...)', fingerprint(short))
+
+    def test_stats_aggregated(self):
+        """Test stats are summed per fingerprint, slowest first."""
+        stats = QueryStats()
+        stats.record('a', 0.1, 'view-a')
+        stats.record('a', 0.3, 'view-a')
+        stats.record('b', 0.2, 'view-b')
+
+        rows = stats.snapshot()
+
+        self.assertEqual([row['fingerprint'] for row in rows], ['a', 'b'])
+        self.assertEqual(rows[0]['count'], 2)
+        self.assertEqual(rows[0]['total_ms'], 400)
+        self.assertEqual(rows[0]['max_ms'], 300)
+
+    def test_stats_bounded(self):
+        """Test the cheapest fingerprint is dropped when full."""
+        stats = QueryStats()
+        stats.max_fingerprints = 2
+        stats.record('a', 0.1, None)
+        stats.record('b', 0.5, None)
+        stats.record('c', 0.2, None)
+
+        self.assertEqual(
+            {row['fingerprint'] for row in stats.snapshot()}, {'b', 'c'},
+        )
+
+    def test_json_formatter(self):
+        """Test records are formatted as JSON with their data."""
+        record = logging.LogRecord(
+            'ops.queries', logging.WARNING, __file__, 1, 'Slow %s', ('x',),
+            None,
+        )
+        record.data = {'user_id': 1}
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(entry['message'], 'Slow x')
+        self.assertEqual(entry['user_id'], 1)
+
+
+class SlowQueryApiTests(TestCase):
+    """Test capturing and listing slow queries."""
+
+    def setUp(self):
+        query_stats.clear()
+        self.client = APIClient()
+
+    def test_slow_query_logged_with_context(self):
+        """Test slow queries are logged with the view and user."""
+        user = create_user()
+        self.client.force_authenticate(user)
+
+        with self.assertLogs('ops.queries', 'WARNING') as logs, \
+                override_settings(SLOW_QUERY_MS=0.000001):
+            self.client.get(NOTES_URL)
+
+        data = [record.data for record in logs.records]
+        self.assertIn('note:note-list', {entry['view'] for entry in data})
+        self.assertIn(user.pk, {entry['user_id'] for entry in data})
+        self.assertTrue(query_stats.snapshot())
+
+    def test_fast_query_not_logged(self):
+        """Test queries under the threshold are not captured."""
+        self.client.force_authenticate(create_user())
+
+        with patch('ops.querylog.log_slow_query') as log_slow_query:
+            self.client.get(NOTES_URL)
+
+        log_slow_query.assert_not_called()
+
+    def test_staff_required(self):
+        """Test the query stats are only listed for staff."""
+        self.client.force_authenticate(create_user())
+
+        res = self.client.get(QUERIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_list_and_reset(self):
+        """Test staff can list and reset the query stats."""
+        self.client.force_authenticate(create_user(is_staff=True))
+        query_stats.record('SELECT ?', 0.5, 'note:note-list')
+
+        res = self.client.get(QUERIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['fingerprint'], 'SELECT ?')
+        self.assertEqual(res['X-Worker-Pid'], str(os.getpid()))
+        res = self.client.delete(QUERIES_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(query_stats.snapshot(), [])
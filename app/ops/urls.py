@@ -0,0 +1,12 @@
+"""
+URL mappings for the operational APIs.
+"""
+from django.urls import path
+from ops import views
+
+app_name = 'ops'
+
+urlpatterns = [
+    path('queries/', views.SlowQueryView.as_view(), name='queries'),
+    path('profile/', views.ProfileView.as_view(), name='profile'),
+]
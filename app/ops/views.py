@@ -0,0 +1,126 @@
+"""
+Views for the operational APIs.
+"""
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.schema import extend_schema
+from ops.metrics import render
+from ops.profiler import PROFILE_HEADER, sampler
+from ops.querylog import query_stats
+from user.authentication import (ExpiringTokenAuthentication,
+                                 SignedTokenAuthentication)
+
+# Response header naming the worker process that answered, for the views
+# returning stats kept in the memory of one worker.
+WORKER_PID_HEADER = 'X-Worker-Pid'
+
+
+def metrics_view(request):
+    """Return the Prometheus metrics of all workers.
+
+    When METRICS_TOKEN is set, scrapers send it as a bearer token.
+    Without a token the metrics are only served when METRICS_PUBLIC is
+    set.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.METRICS_PUBLIC:
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and not constant_time_compare(header, f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    body, content_type = render()
+
+    return HttpResponse(body, content_type=content_type)
+
+
+class ProfiledViewMixin:
+    """Profile requests of staff users sending an `X-Profile` header.
+
+    Sampling starts only once the user is authenticated, so other
+    clients cannot make the server profile their requests.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        http_request = request._request
+        if PROFILE_HEADER in request.META and request.user.is_staff and \
+                not getattr(http_request, 'profiled', False):
+            sampler.start()
+            http_request.profiled = True
+
+
+class StaffAPIView(APIView):
+    """Base view for APIs restricted to staff users."""
+    authentication_classes = [
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+
+
+class SlowQueryView(StaffAPIView):
+    """Slow queries seen by this worker process.
+
+    The stats are not shared: each request reads or resets the worker
+    named in the `X-Worker-Pid` header. The slow query log and the
+    `api_db_query_duration_seconds_total` metric cover all workers.
+    """
+
+    @extend_schema(responses={200: None})
+    def get(self, request):
+        """Return the slow query stats per fingerprint."""
+        return Response(
+            query_stats.snapshot(),
+            headers={WORKER_PID_HEADER: str(os.getpid())},
+        )
+
+    @extend_schema(request=None, responses={204: None})
+    def delete(self, request):
+        """Reset the slow query stats of this worker."""
+        query_stats.clear()
+
+        return Response(
+            status=status.HTTP_204_NO_CONTENT,
+            headers={WORKER_PID_HEADER: str(os.getpid())},
+        )
+
+
+class ProfileView(StaffAPIView):
+    """Stack sample profiles collected by this worker process.
+
+    The profiles are not shared: each request reads or resets the worker
+    named in the `X-Worker-Pid` header, and profiled requests served by
+    other workers are missing from it.
+    """
+
+    @extend_schema(responses={(200, 'text/plain'): str})
+    def get(self, request):
+        """Return the profiles in collapsed stack format.
+
+        The `view` parameter selects the profile of one URL name.
+        """
+        content = sampler.collapsed(request.query_params.get('view'))
+        response = HttpResponse(content, content_type='text/plain')
+        response[WORKER_PID_HEADER] = str(os.getpid())
+
+        return response
+
+    @extend_schema(request=None, responses={204: None})
+    def delete(self, request):
+        """Reset the profiles of this worker."""
+        sampler.clear()
+
+        return Response(
+            status=status.HTTP_204_NO_CONTENT,
+            headers={WORKER_PID_HEADER: str(os.getpid())},
+        )
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from core.models import RevokedUser
+        from user.authentication import user_deleted, user_revoked
+
+        post_save.connect(user_revoked, sender=RevokedUser)
+        post_delete.connect(user_deleted, sender=settings.AUTH_USER_MODEL)
@@ -0,0 +1,248 @@
+"""
+Authentication classes for the APIs.
+"""
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import (BaseAuthentication,
+                                           TokenAuthentication,
+                                           get_authorization_header)
+
+from core.models import AuthToken, RevokedToken, RevokedUser
+from ops.metrics import record_cache
+
+SIGNED_TOKEN_SALT = 'user.authentication.signed-token'
+
+
+def token_cache_key(key):
+    """Return the cache key of a token."""
+    return f'auth-token:{key}'
+
+
+def issue_token(user):
+    """Create and return a new expiring token for `user`."""
+    return AuthToken.objects.create(
+        user=user,
+        expires_at=timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL),
+    )
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """Token authentication with expiry and sliding renewal.
+
+    A token is checked with one primary key lookup, or none while it is
+    cached. The cache keeps only the user id and the expiry; like with
+    signed tokens, the request user then has only its id loaded.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        entry = cache.get(cache_key)
+        cached = entry is not None
+        record_cache('auth_token', cached)
+        if cached:
+            user_id, expires_at = entry
+            user = get_user_model().from_db(
+                DEFAULT_DB_ALIAS, ['id'], [user_id]
+            )
+        else:
+            token = (
+                AuthToken.objects.select_related('user')
+                .filter(key=key)
+                .first()
+            )
+            if token is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user, expires_at = token.user, token.expires_at
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed(
+                    _('User inactive or deleted.')
+                )
+
+        now = timezone.now()
+        if expires_at <= now:
+            cache.delete(cache_key)
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        ttl = timedelta(seconds=settings.AUTH_TOKEN_TTL)
+        if expires_at - now < ttl * settings.AUTH_TOKEN_RENEW_AFTER:
+            expires_at = now + ttl
+            AuthToken.objects.filter(key=key).update(expires_at=expires_at)
+            cached = False
+
+        if not cached:
+            remaining = (expires_at - now).total_seconds()
+            cache.set(
+                cache_key,
+                (user.pk, expires_at),
+                timeout=min(settings.AUTH_TOKEN_CACHE_SECONDS, remaining),
+            )
+
+        return (user, AuthToken(key=key, user_id=user.pk,
+                                expires_at=expires_at))
+
+
+class SignedToken:
+    """Claims of a verified signed token."""
+
+    def __init__(self, user_id, expires_at, jti):
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.jti = jti
+
+    @property
+    def key(self):
+        return self.jti
+
+
+def issue_signed_token(user):
+    """Return a signed token for `user` and its expiry."""
+    issued_at = round(time.time(), 3)
+    expires_at = int(issued_at) + settings.SIGNED_TOKEN_TTL
+    claims = {
+        'uid': user.pk,
+        'iat': issued_at,
+        'exp': expires_at,
+        'jti': secrets.token_hex(8),
+    }
+    token = signing.dumps(claims, salt=SIGNED_TOKEN_SALT)
+
+    return token, datetime.fromtimestamp(expires_at, tz=timezone.utc)
+
+
+class RevocationList:
+    """Ids of revoked signed tokens and revoked users, reloaded from the
+    database periodically."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = frozenset()
+        self._users = {}
+        self._loaded_at = None
+
+    def refresh(self):
+        now = timezone.now()
+        jtis = RevokedToken.objects.filter(
+            expires_at__gt=now
+        ).values_list('jti', flat=True)
+        # Older revocations only cover tokens that have expired since.
+        users = RevokedUser.objects.filter(
+            revoked_before__gt=now - timedelta(
+                seconds=settings.SIGNED_TOKEN_TTL
+            )
+        ).values_list('user_id', 'revoked_before')
+        self._jtis = frozenset(jtis)
+        self._users = {
+            user_id: revoked_before.timestamp()
+            for user_id, revoked_before in users
+        }
+        self._loaded_at = time.monotonic()
+
+    def _refresh_if_stale(self):
+        age = settings.SIGNED_TOKEN_REVOCATION_REFRESH
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > age:
+            with self._lock:
+                self.refresh()
+
+    def __contains__(self, jti):
+        self._refresh_if_stale()
+        return jti in self._jtis
+
+    def is_user_revoked(self, user_id, issued_at):
+        """Return whether tokens of the user issued at `issued_at` are
+        revoked."""
+        self._refresh_if_stale()
+        revoked_before = self._users.get(user_id)
+        return revoked_before is not None and issued_at < revoked_before
+
+    def revoke(self, token):
+        """Revoke `token` and apply it to this process right away."""
+        RevokedToken.objects.get_or_create(
+            jti=token.jti,
+            defaults={'expires_at': token.expires_at},
+        )
+        with self._lock:
+            self._jtis = self._jtis | {token.jti}
+
+    def revoke_user(self, revoked):
+        """Apply a user revocation to this process right away."""
+        with self._lock:
+            self._users = {
+                **self._users,
+                revoked.user_id: revoked.revoked_before.timestamp(),
+            }
+
+
+revocation_list = RevocationList()
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate with self contained HMAC signed tokens.
+
+    Clients send `Authorization: Bearer <token>`. The request user has
+    only its id loaded; other fields are fetched on first access.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header.')
+            )
+
+        try:
+            claims = signing.loads(
+                auth[1].decode(),
+                salt=SIGNED_TOKEN_SALT,
+            )
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if claims['exp'] <= time.time():
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        issued_at = claims.get(
+            'iat', claims['exp'] - settings.SIGNED_TOKEN_TTL
+        )
+        if claims['jti'] in revocation_list or \
+                revocation_list.is_user_revoked(claims['uid'], issued_at):
+            raise exceptions.AuthenticationFailed(_('Token was revoked.'))
+
+        user = get_user_model().from_db(
+            DEFAULT_DB_ALIAS, ['id'], [claims['uid']]
+        )
+        token = SignedToken(
+            claims['uid'],
+            datetime.fromtimestamp(claims['exp'], tz=timezone.utc),
+            claims['jti'],
+        )
+
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+def user_revoked(sender, instance, **kwargs):
+    """Apply a stored user revocation to this process."""
+    revocation_list.revoke_user(instance)
+
+
+def user_deleted(sender, instance, using, **kwargs):
+    """Revoke the signed tokens of a user deleted from the primary."""
+    if using == DEFAULT_DB_ALIAS:
+        RevokedUser.revoke(instance.pk)
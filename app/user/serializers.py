@@ -2,9 +2,24 @@
 Serializers for the user API View.
 """
 from django.utils.translation import gettext as _
+from django.utils.translation import gettext_lazy
 from django.contrib.auth import get_user_model, authenticate
 
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import Throttled
+from rest_framework.validators import UniqueValidator
+
+from core.hashers import HashingBusy, hashing_slot
+
+
+class UniqueEmailValidator(UniqueValidator):
+    """Unique check that skips the query when the email is unchanged."""
+
+    def __call__(self, value, serializer_field):
+        instance = getattr(serializer_field.parent, 'instance', None)
+        if instance is not None and instance.email == value:
+            return
+        super().__call__(value, serializer_field)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,21 +28,42 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ['email', 'password', 'name']
-        extra_kwargs = {'password': {'write_only': True, 'min_length': 5}}
+        extra_kwargs = {
+            'email': {
+                'validators': [
+                    UniqueEmailValidator(queryset=get_user_model().objects),
+                ],
+            },
+            'password': {'write_only': True, 'min_length': 5},
+        }
 
     def create(self, validated_data):
         """Create and return a user with encrypted password."""
         return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        """Update and return user."""
+        """Update and return user, saving only the changed fields."""
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
+        changed = [
+            attr for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
 
         if password:
-            user.set_password(password)
-            user.save()
-        return user
+            instance.set_password(password)
+            changed.append('password')
+        if changed:
+            instance.save(update_fields=changed)
+        return instance
+
+
+class LoginBusy(Throttled):
+    """Raised for logins while every hashing slot is taken."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = gettext_lazy('Server is busy, please retry shortly.')
+    default_code = 'login_busy'
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -42,11 +78,15 @@ class AuthTokenSerializer(serializers.Serializer):
         """Validate and authenticate the user."""
         email = attrs.get('email')
         password = attrs.get('password')
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+        try:
+            with hashing_slot():
+                user = authenticate(
+                    request=self.context.get('request'),
+                    username=email,
+                    password=password,
+                )
+        except HashingBusy:
+            raise LoginBusy(wait=1)
         if not user:
             msg = _('Unable to authenticate with provided crendentials.')
             raise serializers.ValidationError(msg, code='authorization')
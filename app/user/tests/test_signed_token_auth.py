@@ -0,0 +1,167 @@
+"""
+Tests for signed token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import RevokedToken, RevokedUser
+from user.authentication import (SIGNED_TOKEN_SALT,
+                                 issue_signed_token,
+                                 revocation_list)
+
+SIGNED_TOKEN_URL = reverse('user:signed-token')
+REVOKE_URL = reverse('user:revoke-signed-token')
+ME_URL = reverse('user:me')
+NOTES_URL = reverse('note:note-list')
+
+
+class SignedTokenAuthTests(TestCase):
+    """Test authenticating with signed tokens."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.client = APIClient()
+        revocation_list.refresh()
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_issue_signed_token(self):
+        """Test logging in returns a signed token."""
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        res = self.client.post(SIGNED_TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+        self.assertIn('expires_at', res.data)
+
+    def test_signed_token_needs_no_query(self):
+        """Test listing notes authenticates without touching the user."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate(token)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(NOTES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_signed_token_profile(self):
+        """Test the profile is loaded for signed token requests."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate(token)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_tampered_token_rejected(self):
+        """Test a token with a modified payload is refused."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate('x' + token)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SIGNED_TOKEN_TTL=-1)
+    def test_expired_token_rejected(self):
+        """Test an expired signed token is refused."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate(token)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_token_rejected(self):
+        """Test a revoked token stops working."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate(token)
+
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SIGNED_TOKEN_REVOCATION_REFRESH=0)
+    def test_revocations_from_other_processes_loaded(self):
+        """Test revocations stored elsewhere are picked up on refresh."""
+        token, expires_at = issue_signed_token(self.user)
+        self.authenticate(token)
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        claims = signing.loads(token, salt=SIGNED_TOKEN_SALT)
+        RevokedToken.objects.create(jti=claims['jti'], expires_at=expires_at)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test tokens stop working once the user is deactivated."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate(token)
+        self.assertEqual(self.client.get(NOTES_URL).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(NOTES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.post(
+            NOTES_URL, {'title': 'Note', 'description': 'Something'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_older_tokens(self):
+        """Test a password change revokes the tokens issued before it."""
+        old_token, _ = issue_signed_token(self.user)
+
+        self.user.set_password('newpass123')
+        self.user.save()
+        new_token, _ = issue_signed_token(self.user)
+
+        self.authenticate(old_token)
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+        self.authenticate(new_token)
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+    def test_deleted_user_rejected(self):
+        """Test tokens of a deleted user are refused."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate(token)
+        user_id = self.user.id
+
+        self.user.delete()
+
+        res = self.client.post(
+            NOTES_URL, {'title': 'Note', 'description': 'Something'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(RevokedUser.objects.filter(user_id=user_id).exists())
+
+    @override_settings(SIGNED_TOKEN_REVOCATION_REFRESH=0)
+    def test_user_revocations_from_other_processes_loaded(self):
+        """Test user revocations stored elsewhere are picked up."""
+        token, _ = issue_signed_token(self.user)
+        self.authenticate(token)
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        RevokedUser.objects.bulk_create([
+            RevokedUser(user_id=self.user.id, revoked_before=timezone.now())
+        ])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
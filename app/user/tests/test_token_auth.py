@@ -0,0 +1,121 @@
+"""
+Tests for expiring token authentication.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import AuthToken
+from user.authentication import issue_token, token_cache_key
+
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+class TokenAuthTests(TestCase):
+    """Test authenticating with expiring tokens."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.client = APIClient()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_token_issued_with_expiry(self):
+        """Test logging in returns a token and its expiry."""
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        token = AuthToken.objects.get(key=res.data['token'])
+        self.assertEqual(token.user, self.user)
+        self.assertEqual(res.data['expires_at'], token.expires_at)
+
+    def test_valid_token_authenticates(self):
+        """Test a valid token gives access."""
+        token = issue_token(self.user)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_expired_token_rejected(self):
+        """Test an expired token is refused."""
+        token = AuthToken.objects.create(
+            user=self.user,
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_token_skips_database(self):
+        """Test repeated requests validate the token from the cache."""
+        token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get(ME_URL)
+
+        # Only the view loads the user.
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_cached_token_holds_no_user(self):
+        """Test the token cache keeps only the user id and expiry."""
+        token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get(ME_URL)
+
+        self.assertEqual(
+            cache.get(token_cache_key(token.key)),
+            (self.user.pk, token.expires_at),
+        )
+
+    @override_settings(AUTH_TOKEN_TTL=1000)
+    def test_token_renewed_when_used(self):
+        """Test a token close to expiry is extended on use."""
+        token = AuthToken.objects.create(
+            user=self.user,
+            expires_at=timezone.now() + timedelta(seconds=100),
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get(ME_URL)
+
+        token.refresh_from_db()
+        remaining = token.expires_at - timezone.now()
+        self.assertGreater(remaining, timedelta(seconds=900))
+
+    def test_clear_expired_tokens_command(self):
+        """Test the cleanup command only deletes expired tokens."""
+        valid = issue_token(self.user)
+        for _ in range(3):
+            AuthToken.objects.create(
+                user=self.user,
+                expires_at=timezone.now() - timedelta(days=1),
+            )
+
+        out = StringIO()
+        call_command('clear_expired_tokens', batch_size=2, stdout=out)
+
+        self.assertEqual(list(AuthToken.objects.all()), [valid])
+        self.assertIn('Deleted 3', out.getvalue())
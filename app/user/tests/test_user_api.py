@@ -1,7 +1,9 @@
 """
 Tests for the user API.
 """
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -146,3 +148,24 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_user_profile_single_update(self):
+        """Test updating the profile writes the user with one UPDATE."""
+        payload = {
+            'email': self.user.email,
+            'name': 'Update Name',
+            'password': 'newpassword123',
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(ME_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(
+            len([sql for sql in statements if sql.startswith('UPDATE')]), 1
+        )
+        self.assertFalse(any(
+            sql.startswith('SELECT') and '"email"' in sql.split('WHERE')[-1]
+            for sql in statements
+        ))
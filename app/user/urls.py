@@ -9,5 +9,15 @@ app_name = 'user'
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path(
+        'token/signed/',
+        views.CreateSignedTokenView.as_view(),
+        name='signed-token',
+    ),
+    path(
+        'token/signed/revoke/',
+        views.RevokeSignedTokenView.as_view(),
+        name='revoke-signed-token',
+    ),
     path('me/', views.ManageUserView.as_view(), name='me'),
 ]
@@ -1,11 +1,22 @@
 """
 Views for the user API.
 """
+from django.contrib.auth import get_user_model
+
+from core.schema import extend_schema
+from core.views import ReplicaReadMixin
+from ops.views import ProfiledViewMixin
+from user.authentication import (ExpiringTokenAuthentication,
+                                 SignedTokenAuthentication,
+                                 issue_signed_token,
+                                 issue_token,
+                                 revocation_list)
 from user.serializers import (UserSerializer,
                               AuthTokenSerializer)
 
-from rest_framework import generics, permissions, authentication
+from rest_framework import generics, permissions, status, views
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
 
@@ -19,13 +30,57 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        """Issue a new expiring token."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = issue_token(serializer.validated_data['user'])
+
+        return Response({'token': token.key, 'expires_at': token.expires_at})
+
+
+class CreateSignedTokenView(CreateTokenView):
+    """Create a new signed auth token for user."""
+
+    def post(self, request, *args, **kwargs):
+        """Issue a new signed token."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, expires_at = issue_signed_token(
+            serializer.validated_data['user']
+        )
+
+        return Response({'token': token, 'expires_at': expires_at})
+
+
+class RevokeSignedTokenView(views.APIView):
+    """Revoke the signed token used for the request."""
+    authentication_classes = [SignedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request, *args, **kwargs):
+        """Revoke the current signed token."""
+        revocation_list.revoke(request.auth)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ProfiledViewMixin,
+                     ReplicaReadMixin,
+                     generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return the authenticated user."""
-        return self.request.user
+        user = self.request.user
+        if user.get_deferred_fields():
+            # Signed and cached tokens only carry the user id.
+            user = get_user_model().objects.get(pk=user.pk)
+        return user